@@ -1,9 +1,12 @@
 import numpy as np
 import torch
 import torch.nn as nn
-import torch.optim as optim
 import random
-from collections import deque
+import logging
+from inference import InferenceEngine, quantize_model, save_checkpoint
+from model_registry import get_registry, write_metadata
+from replay_memory import ReplayMemory
+from train_step import TrainStep, make_adam
 
 # Define discrete actions: 0=Hold, 1=Buy, 2=Sell
 DISCRETE_ACTIONS = [
@@ -13,96 +16,125 @@ DISCRETE_ACTIONS = [
 ]
 NUM_ACTIONS = len(DISCRETE_ACTIONS)
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_HIDDEN_SIZES = (256, 128, 64)
+
 class QNetwork(nn.Module):
-    def __init__(self, input_shape, action_space):
+    def __init__(self, input_shape, action_space, hidden_sizes=DEFAULT_HIDDEN_SIZES, dropout=0.2):
         super(QNetwork, self).__init__()
-        self.model = nn.Sequential(
-            nn.Linear(input_shape[0], 256),
-            nn.ReLU(),
-            nn.Dropout(0.2),
-            nn.Linear(256, 128),
-            nn.ReLU(),
-            nn.Dropout(0.2),
-            nn.Linear(128, 64),
-            nn.ReLU(),
-            nn.Dropout(0.2),
-            nn.Linear(64, action_space)
-        )
+        # Every hidden layer is Linear, ReLU, Dropout so state_dict keys keep the same layout
+        layers = []
+        width = input_shape[0]
+        for hidden in hidden_sizes:
+            layers += [nn.Linear(width, hidden), nn.ReLU(), nn.Dropout(dropout)]
+            width = hidden
+        layers.append(nn.Linear(width, action_space))
+        self.model = nn.Sequential(*layers)
 
     def forward(self, x):
         return self.model(x)
 
-def create_q_model(input_shape, action_space):
-    return QNetwork(input_shape, action_space)
+def hidden_sizes_from_state_dict(state_dict):
+    """Hidden widths of a saved QNetwork, read from the shapes of its Linear weights."""
+    weights = sorted(
+        (int(key.split(".")[1]), tensor) for key, tensor in state_dict.items()
+        if key.startswith("model.") and key.endswith(".weight")
+    )
+    return tuple(tensor.shape[0] for _, tensor in weights[:-1])
+
+def create_q_model(input_shape, action_space, hidden_sizes=DEFAULT_HIDDEN_SIZES):
+    return QNetwork(input_shape, action_space, hidden_sizes)
 
 class DQNAgent:
-    def __init__(self, input_shape, action_space, gamma=0.95, epsilon=1.0, epsilon_min=0.05, epsilon_decay=0.995, learning_rate=0.001):
+    def __init__(self, input_shape, action_space, gamma=0.95, epsilon=1.0, epsilon_min=0.05, epsilon_decay=0.995, learning_rate=0.001, inference_precision="fp32", observations=None, n_step=1,
+                 train_backend="eager", train_precision="fp32", fused_adam=False, memory_size=10000):
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.input_shape = input_shape
         self.action_space = action_space
-        self.memory = deque(maxlen=10000)
+        # With an observation source (e.g. a FeatureSet) transitions hold row indices instead of states
+        self.observations = observations
+        self.memory = ReplayMemory(capacity=memory_size, n_step=n_step, gamma=gamma, compact=observations is not None)
         self.gamma = gamma
         self.epsilon = epsilon
         self.epsilon_min = epsilon_min
         self.epsilon_decay = epsilon_decay
         self.model = create_q_model(input_shape, action_space).to(self.device)
         self.target_model = create_q_model(input_shape, action_space).to(self.device)
-        self.optimizer = optim.Adam(self.model.parameters(), lr=learning_rate)
-        self.loss_fn = nn.MSELoss()
+        self.optimizer = make_adam(self.model.parameters(), learning_rate, fused=fused_adam)
+        self.train_step = TrainStep(self.model, self.optimizer, train_backend, train_precision, self.device)
+        self.last_q_values = None
+        self.last_loss = None
+        self.inference_precision = inference_precision
+        self.engine = InferenceEngine.from_module(self.model, self.device)
+        self._quantized_engine = None
         self.update_target_model()
 
     def update_target_model(self):
         self.target_model.load_state_dict(self.model.state_dict())
 
     def act(self, state):
-        state = torch.FloatTensor(state).to(self.device)
         if np.random.rand() < self.epsilon:
             action_idx = random.randrange(self.action_space)
+            self.last_q_values = None
         else:
-            self.model.eval()
-            with torch.no_grad():
-                q_values = self.model(state).cpu().numpy()[0]
-            action_idx = np.argmax(q_values)
-        print(f"Action chosen: {action_idx} (Epsilon: {self.epsilon:.3f})")
+            action_idx, self.last_q_values = self.policy_engine().act(state)
+        logger.debug("Action chosen: %s (Epsilon: %.3f)", action_idx, self.epsilon)
         return action_idx, DISCRETE_ACTIONS[action_idx]
 
+    def policy_engine(self):
+        if self.inference_precision != "int8":
+            return self.engine
+        # The quantized snapshot is rebuilt lazily after each training update
+        if self._quantized_engine is None:
+            self._quantized_engine = InferenceEngine(module=quantize_model(self.model))
+        return self._quantized_engine
+
     def remember(self, state, action_idx, reward, next_state, done):
-        self.memory.append((state, action_idx, reward, next_state, done))
-        print(f"Memory size: {len(self.memory)}")
+        self.memory.push(state, action_idx, reward, next_state, done)
+        logger.debug("Memory size: %d", len(self.memory))
+
+    def set_observations(self, observations):
+        """Switch to a new observation source (e.g. the next chunk of a streamed history).
+
+        Compact transitions index rows of the old source, so they are dropped.
+        """
+        self.observations = observations
+        if self.memory.compact:
+            self.memory.clear()
+
+    def end_episode(self):
+        # Pending n-step windows must not run into the next episode
+        self.memory.flush()
 
     def replay(self, batch_size):
         if len(self.memory) < batch_size // 2:
-            print(f"Replay skipped: Insufficient memory ({len(self.memory)} < {batch_size // 2})")
+            logger.debug("Replay skipped: Insufficient memory (%d < %d)", len(self.memory), batch_size // 2)
             return
-        minibatch = random.sample(self.memory, min(batch_size, len(self.memory)))
-        states = np.array([m[0] for m in minibatch])
-        next_states = np.array([m[3] for m in minibatch])
-        if states.ndim == 3:
-            states = states.reshape(states.shape[0], states.shape[-1])
-        if next_states.ndim == 3:
-            next_states = next_states.reshape(next_states.shape[0], next_states.shape[-1])
-
-        states = torch.FloatTensor(states).to(self.device)
-        next_states = torch.FloatTensor(next_states).to(self.device)
-
-        self.model.train()
-        targets = self.model(states)
-        next_q = self.target_model(next_states).detach()
-
-        for i, (s, a, r, s_next, done) in enumerate(minibatch):
-            target = r
-            if not done:
-                target += self.gamma * torch.max(next_q[i]).item()
-            targets[i][a] = target
-
-        self.optimizer.zero_grad()
-        loss = self.loss_fn(targets, self.model(states))
-        loss.backward()
-        self.optimizer.step()
+        states, actions, returns, next_states, dones, discounts = self.memory.sample(batch_size)
+        states = torch.from_numpy(self._observe(states)).to(self.device)
+        next_states = torch.from_numpy(self._observe(next_states)).to(self.device)
+        actions = torch.from_numpy(actions).to(self.device)
+
+        # n-step target: R + gamma^k * max_a Q_target(s_{t+k}, a), without bootstrapping past done
+        with torch.no_grad():
+            next_q = self.target_model(next_states).max(dim=1).values
+            bootstrap = torch.from_numpy(discounts * (1.0 - dones)).to(self.device)
+            targets = torch.from_numpy(returns).to(self.device) + bootstrap * next_q
+
+        self.last_loss = float(self.train_step(states, actions, targets))
+        self._quantized_engine = None
 
         if self.epsilon > self.epsilon_min:
             self.epsilon *= self.epsilon_decay
-            print(f"Epsilon updated to {self.epsilon:.3f}")
+            logger.debug("Epsilon updated to %.3f", self.epsilon)
+        return self.last_loss
+
+    def _observe(self, states):
+        if self.observations is not None:
+            return self.observations.gather(states)
+        states = np.asarray(states, dtype=np.float32)
+        return states.reshape(states.shape[0], -1)
 
     def get_valuable_memories(self, n=3, profit=0):
         if not self.memory:
@@ -114,5 +146,10 @@ class DQNAgent:
         )
         return sorted_memories[:n]
 
-    def save_model(self, path="dqn_model_final.pt"):
-        torch.save(self.model.state_dict(), path)
\ No newline at end of file
+    def save_model(self, path="dqn_model_final.pt", metadata=None):
+        save_checkpoint(self.model.state_dict(), path)
+        write_metadata(path, dict(
+            metadata or {}, input_shape=list(self.input_shape), action_space=self.action_space,
+            hidden_sizes=hidden_sizes_from_state_dict(self.model.state_dict())
+        ))
+        get_registry().put(path, self.model, self.input_shape[0])
\ No newline at end of file
@@ -0,0 +1,143 @@
+import os
+import json
+import atexit
+import asyncio
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, wait
+
+ARTIFACT_FORMATS = ("png", "svg", "data")
+
+ARTIFACT_SETTINGS = {
+    "artifact_format": "png",
+    "artifact_dpi": 400,
+    "artifact_workers": 2
+}
+
+
+def _render_series(path_base, series, title, xlabel, ylabel, fmt, dpi, figsize):
+    if fmt == "data":
+        path = path_base + ".npz"
+        arrays = {}
+        for i, (x, y, label, color) in enumerate(series):
+            arrays[f"x_{i}"] = np.asarray(x)
+            arrays[f"y_{i}"] = np.asarray(y)
+        arrays["labels"] = np.array([s[2] for s in series])
+        np.savez(path, **arrays)
+        return path
+
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=figsize)
+    for x, y, label, color in series:
+        ax.plot(x, y, label=label, color=color)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.legend()
+    ax.grid(True)
+    path = f"{path_base}.{fmt}"
+    fig.savefig(path, dpi=dpi)
+    plt.close(fig)
+    return path
+
+
+def _write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=4)
+    return path
+
+
+def _write_text(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+
+class ArtifactPipeline:
+    """Queues figure rendering and log writes on a process pool instead of the UI thread.
+
+    callback(result, error) runs on the event loop that submitted the job (the UI loop in the GUI), or
+    on the pool's result thread when there is none. It is skipped for jobs cancelled at shutdown.
+    """
+
+    def __init__(self, max_workers=2, fmt="png", dpi=400, figsize=(16, 9)):
+        if fmt not in ARTIFACT_FORMATS:
+            raise ValueError(f"Unknown artifact format: {fmt}")
+        self.fmt = fmt
+        self.dpi = dpi
+        self.figsize = figsize
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+        self.pending = set()
+
+    def render_series(self, path_base, series, title="", xlabel="", ylabel="", fmt=None, dpi=None, callback=None):
+        os.makedirs(os.path.dirname(path_base) or ".", exist_ok=True)
+        series = [(np.asarray(x), np.asarray(y), label, color) for x, y, label, color in series]
+        return self._submit(
+            _render_series, path_base, series, title, xlabel, ylabel,
+            fmt or self.fmt, dpi or self.dpi, self.figsize, callback=callback
+        )
+
+    def write_json(self, path, data, callback=None):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        return self._submit(_write_json, path, data, callback=callback)
+
+    def write_text(self, path, text, callback=None):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        return self._submit(_write_text, path, text, callback=callback)
+
+    def _submit(self, fn, *args, callback=None):
+        future = self.executor.submit(fn, *args)
+        self.pending.add(future)
+        future.add_done_callback(self.pending.discard)
+        if callback:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+
+            def done(f):
+                if f.cancelled():
+                    return
+                error = f.exception()
+                result = None if error else f.result()
+                if loop is None:
+                    callback(result, error)
+                    return
+                try:
+                    # Controls may only be touched from the UI loop, not the pool's result thread
+                    loop.call_soon_threadsafe(callback, result, error)
+                except RuntimeError:
+                    pass  # The loop has closed, e.g. the window was shut
+            future.add_done_callback(done)
+        return future
+
+    def wait(self, timeout=None):
+        return wait(list(self.pending), timeout=timeout)
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+
+_pipeline = None
+
+
+def get_pipeline(settings_file="learning_settings.json"):
+    global _pipeline
+    if _pipeline is None:
+        settings = dict(ARTIFACT_SETTINGS)
+        if os.path.exists(settings_file):
+            try:
+                with open(settings_file, "r") as f:
+                    loaded = json.load(f)
+                settings.update({k: loaded[k] for k in ARTIFACT_SETTINGS if k in loaded})
+            except (OSError, ValueError):
+                pass
+        _pipeline = ArtifactPipeline(
+            max_workers=int(settings["artifact_workers"]),
+            fmt=settings["artifact_format"],
+            dpi=int(settings["artifact_dpi"])
+        )
+        atexit.register(_pipeline.shutdown)
+    return _pipeline
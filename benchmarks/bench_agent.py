@@ -0,0 +1,43 @@
+import numpy as np
+from common import measure
+from Q import DQNAgent, NUM_ACTIONS
+
+REPLAY_BATCH_SIZES = (32, 128, 512)
+REPLAY_BUFFER_SIZES = (1000, 10000)
+
+
+def make_agent(ctx, epsilon=0.0):
+    X = ctx["X"]
+    return DQNAgent(input_shape=(X.shape[1],), action_space=NUM_ACTIONS, epsilon=epsilon)
+
+
+def fill_memory(agent, X, size, seed):
+    rng = np.random.default_rng(seed)
+    rows = X.values.astype(np.float32)
+    for i in range(size):
+        t = i % (len(rows) - 1)
+        agent.remember(rows[t:t + 1], int(rng.integers(NUM_ACTIONS)), float(rng.normal()), rows[t + 1:t + 2], False)
+
+
+def bench_act(ctx):
+    agent = make_agent(ctx)
+    state = ctx["X"].values[:1].astype(np.float32)
+    return {"agent_act_greedy": measure(lambda: agent.act(state), repeats=ctx["repeats"], number=200)}
+
+
+def bench_replay(ctx):
+    results = {}
+    for buffer_size in REPLAY_BUFFER_SIZES:
+        agent = make_agent(ctx, epsilon=1.0)
+        fill_memory(agent, ctx["X"], buffer_size, ctx["seed"])
+        for batch_size in REPLAY_BATCH_SIZES:
+            results[f"agent_replay_b{batch_size}_m{buffer_size}"] = measure(
+                lambda: agent.replay(batch_size), repeats=ctx["repeats"], number=5
+            )
+    return results
+
+
+CASES = {
+    "agent_act": bench_act,
+    "agent_replay": bench_replay,
+}
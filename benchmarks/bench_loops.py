@@ -0,0 +1,72 @@
+import os
+import time
+import tempfile
+from common import measure
+from Q import DQNAgent, NUM_ACTIONS
+from execution import CancellationToken, null_emit
+from training import LEARNING_SETTINGS, training_worker
+from model_loader import backtest_worker
+from model_registry import get_registry
+
+TRAINING_STEPS = 500
+
+
+def bench_settings():
+    return dict(LEARNING_SETTINGS, trajectory_chunk_size=1024)
+
+
+def bench_training_loop(ctx):
+    """One episode of the headless training worker; the UI is replaced by an emit stub."""
+    steps = min(TRAINING_STEPS, len(ctx["df"]) - 1)
+    per_step = []
+    for _ in range(ctx["repeats"]):
+        token = CancellationToken()
+
+        def emit(kind, payload=None):
+            if kind == "log" and "completed" in payload:
+                token.cancel()
+
+        with tempfile.TemporaryDirectory() as workdir:
+            cwd = os.getcwd()
+            os.chdir(workdir)
+            try:
+                start = time.perf_counter()
+                result = training_worker(
+                    token, emit, steps, 0, ctx["df"], ctx["X"], ctx["Y"], 1000.0, "Medium Risk", bench_settings()
+                )
+                per_step.append((time.perf_counter() - start) / max(result["steps"], 1))
+            finally:
+                os.chdir(cwd)
+    per_step.sort()
+    return {"training_loop_per_step": {
+        "median_s": per_step[len(per_step) // 2], "min_s": per_step[0], "repeats": len(per_step), "steps": steps
+    }}
+
+
+def bench_backtest(ctx):
+    X = ctx["X"]
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            agent = DQNAgent(input_shape=(X.shape[1],), action_space=NUM_ACTIONS)
+            agent.save_model("bench_model.pt")
+            counter = {"run": 0}
+
+            def run():
+                get_registry().clear()
+                counter["run"] += 1
+                backtest_worker(
+                    CancellationToken(), null_emit, "bench_model.pt", ctx["df"], X, ctx["Y"],
+                    1000.0, "Medium Risk", f"backtest_{counter['run']}", bench_settings()
+                )
+
+            return {"backtest_end_to_end": measure(run, repeats=ctx["repeats"], warmup=0)}
+        finally:
+            os.chdir(cwd)
+
+
+CASES = {
+    "training_loop": bench_training_loop,
+    "backtest": bench_backtest,
+}
@@ -0,0 +1,75 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+import statistics
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each case runs in a fresh interpreter so module caches do not hide cold-start cost.
+STARTUP_CASES = {
+    "import_gui": "import gui",
+    "import_setting_page": "import setting_page",
+    "load_data": "from strategy import load_data; load_data()",
+    "create_charts": "from strategy import load_data; from components import create_charts; "
+                     "create_charts(load_data()[0], {'start': '2024-01-01', 'end': '2025-01-01'})",
+    "import_training": "import training",
+    "import_model_loader": "import model_loader",
+}
+
+
+def time_case(code, repeats):
+    script = (
+        "import time, warnings\n"
+        "warnings.filterwarnings('ignore')\n"
+        "_t = time.perf_counter()\n"
+        f"{code}\n"
+        "print(time.perf_counter() - _t)\n"
+    )
+    samples = []
+    for _ in range(repeats):
+        out = subprocess.run(
+            [sys.executable, "-c", script], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True
+        )
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def run(repeats=3, cases=None):
+    results = {}
+    for name, code in STARTUP_CASES.items():
+        if cases and name not in cases:
+            continue
+        samples = time_case(code, repeats)
+        results[name] = {
+            "min_s": min(samples),
+            "median_s": statistics.median(samples),
+            "samples": samples,
+        }
+    return results
+
+
+CASES = {
+    "startup": lambda ctx: {f"startup_{name}": stats for name, stats in run(ctx["repeats"]).items()},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start cost of the GUI entry point.")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--case", action="append", help="Only run the named case (repeatable)")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    results = run(args.repeats, args.case)
+    text = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import os
+from common import REPO_ROOT, measure
+from bench_startup import time_case
+from strategy import load_data, money_management
+
+RISK_LEVELS = ["Very High Risk", "High Risk", "Medium Risk", "Low Risk", "Very Low Risk"]
+
+
+def bench_money_management(ctx):
+    prices = ctx["df"]["priceClose"].values
+    calls = {"i": 0}
+
+    def step():
+        i = calls["i"]
+        calls["i"] += 1
+        price = prices[i % len(prices)]
+        money_management(1000, i % 3, RISK_LEVELS[i % 5], price, 1000.0, 2.0, predicted_price=price * 1.01)
+
+    return {"money_management": measure(step, repeats=ctx["repeats"], number=10000)}
+
+
+def bench_load_data(ctx):
+    samples = time_case("from strategy import load_data; load_data()", ctx["repeats"])
+    cold = {"median_s": sorted(samples)[len(samples) // 2], "min_s": min(samples), "repeats": len(samples)}
+
+    cwd = os.getcwd()
+    os.chdir(REPO_ROOT)
+    try:
+        warm = measure(load_data, repeats=ctx["repeats"])
+    finally:
+        os.chdir(cwd)
+    return {"load_data_cold": cold, "load_data_warm": warm}
+
+
+CASES = {
+    "money_management": bench_money_management,
+    "load_data": bench_load_data,
+}
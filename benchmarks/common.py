@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+import random
+import statistics
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+FEATURE_COLUMNS = ["priceOpen", "priceHigh", "priceLow", "priceClose", "volume"]
+
+
+def seed_everything(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    try:
+        import torch
+        torch.manual_seed(seed)
+    except ImportError:
+        pass
+
+
+def synthetic_market(rows=2000, seed=0, start_price=80.0):
+    """GBM candles shaped like the frames load_data() returns."""
+    rng = np.random.default_rng(seed)
+    log_returns = rng.normal(0.0002, 0.02, rows)
+    close = start_price * np.exp(np.cumsum(log_returns))
+    open_ = np.concatenate([[start_price], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.01, rows)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.lognormal(15, 0.5, rows)
+    index = pd.date_range("2020-01-01", periods=rows, freq="D", name="timeClose")
+    df = pd.DataFrame({
+        "priceOpen": open_, "priceHigh": high, "priceLow": low, "priceClose": close, "volume": volume
+    }, index=index)
+    X_raw = df[FEATURE_COLUMNS].values
+    X = pd.DataFrame((X_raw - X_raw.mean(0)) / (X_raw.std(0) + 1e-5), index=df.index, columns=FEATURE_COLUMNS)
+    Y = df[["priceClose"]].rename(columns={"priceClose": "LTC"})
+    return df, X, Y
+
+
+def market_data(source, rows, seed):
+    if source == "litecoin":
+        from strategy import load_data
+        cwd = os.getcwd()
+        os.chdir(REPO_ROOT)
+        try:
+            return load_data()
+        finally:
+            os.chdir(cwd)
+    return synthetic_market(rows, seed)
+
+
+def measure(fn, repeats=5, warmup=1, number=1):
+    """Time fn() and return per-call statistics in seconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "mean_s": statistics.fmean(samples),
+        "repeats": repeats,
+        "number": number,
+    }
@@ -0,0 +1,118 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import importlib
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+if BENCH_DIR not in sys.path:
+    sys.path.insert(0, BENCH_DIR)
+
+from common import REPO_ROOT, market_data, seed_everything
+
+CASE_MODULES = ["bench_agent", "bench_strategy", "bench_loops", "bench_startup"]
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+
+def collect_cases(selected=None):
+    cases = {}
+    for module_name in CASE_MODULES:
+        module = importlib.import_module(module_name)
+        for name, fn in module.CASES.items():
+            if not selected or any(pattern in name for pattern in selected):
+                cases[name] = fn
+    return cases
+
+
+def environment_info():
+    info = {"python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine()}
+    for module_name in ("numpy", "pandas", "torch"):
+        try:
+            info[module_name] = importlib.import_module(module_name).__version__
+        except ImportError:
+            info[module_name] = None
+    try:
+        import torch
+        info["torch_threads"] = torch.get_num_threads()
+    except ImportError:
+        pass
+    return info
+
+
+def compare(results, baseline, tolerance):
+    comparison = {}
+    for name, stats in results.items():
+        reference = baseline.get("results", {}).get(name)
+        if not reference:
+            continue
+        ratio = stats["median_s"] / reference["median_s"] if reference["median_s"] else float("inf")
+        if ratio > 1 + tolerance:
+            verdict = "regression"
+        elif ratio < 1 - tolerance:
+            verdict = "improvement"
+        else:
+            verdict = "ok"
+        comparison[name] = {
+            "baseline_median_s": reference["median_s"],
+            "median_s": stats["median_s"],
+            "ratio": ratio,
+            "verdict": verdict,
+        }
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the hot-path benchmark suite headless.")
+    parser.add_argument("--data", choices=["synthetic", "litecoin"], default="synthetic")
+    parser.add_argument("--rows", type=int, default=2000, help="Rows of synthetic data")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--case", action="append", help="Only run cases whose name contains this (repeatable)")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Relative slowdown allowed before flagging")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    os.chdir(REPO_ROOT)
+    seed_everything(args.seed)
+    df, X, Y = market_data(args.data, args.rows, args.seed)
+    ctx = {"df": df, "X": X, "Y": Y, "seed": args.seed, "repeats": args.repeats}
+
+    results = {}
+    for name, fn in collect_cases(args.case).items():
+        seed_everything(args.seed)
+        print(f"Running {name}...", file=sys.stderr)
+        results.update(fn(ctx))
+
+    report = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "config": {"data": args.data, "rows": len(df), "seed": args.seed, "repeats": args.repeats},
+        "environment": environment_info(),
+        "results": results,
+    }
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r") as f:
+            report["comparison"] = compare(results, json.load(f), args.tolerance)
+
+    text = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            f.write(text)
+    print(text)
+
+    regressions = [name for name, c in report.get("comparison", {}).items() if c["verdict"] == "regression"]
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}", file=sys.stderr)
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,6 @@
 import flet as ft
-from flet.matplotlib_chart import MatplotlibChart
-import matplotlib.pyplot as plt
-import matplotlib
 import asyncio
 
-matplotlib.use('Agg')
-
 def create_metrics():
     return {
         "Buys": ft.TextField(label="Buys", read_only=True, hint_text="تعداد خرید", width=150),
@@ -42,6 +37,12 @@ def create_metrics_container(metrics):
     )
 
 def create_charts(df, current_period):
+    # matplotlib is imported here so building the window does not pay for it
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from flet.matplotlib_chart import MatplotlibChart
+
     fig_all, ax_all = plt.subplots()
     fig_dynamic, ax_dynamic = plt.subplots()
     fig_pred, ax_pred = plt.subplots()
@@ -153,6 +154,26 @@ def create_training_controls(initial_cash, update_mode, update_initial_cash, upd
     
     return status, log_text, ai_notes_text, lessons_text, start_btn, pause_btn, end_btn, clear_notes_btn, clear_lessons_btn, mode_dropdown, initial_cash_field, risk_dropdown, select_model_btn, model_name_field
 
+def create_profiler_panel():
+    return ft.TextField(
+        multiline=True,
+        read_only=True,
+        expand=True,
+        min_lines=6,
+        max_lines=6,
+        label="Profiler",
+        hint_text="Enable 'profiling' in learning_settings.json to see per-phase timings",
+        text_style=ft.TextStyle(font_family="monospace", size=11)
+    )
+
+def append_text(field: ft.TextField, text: str, max_lines: int = None):
+    field.value += text
+    if max_lines:
+        lines = field.value.split("\n")
+        if len(lines) > max_lines:
+            field.value = "\n".join(lines[-max_lines:])
+    field.update()
+
 def highlight_metric(field: ft.TextField, color: ft.Colors, duration: float = 1.0):
     field.border_color = color
     field.border_width = 2
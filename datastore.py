@@ -0,0 +1,252 @@
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+
+FEATURE_COLUMNS = ["priceOpen", "priceHigh", "priceLow", "priceClose", "volume"]
+DEFAULT_STORE = "data_cache"
+NORMALIZATION_MODES = ("global", "online")
+SYMBOL_SOURCES = {"LTC": "litecoin.xlsx"}
+DATA_DIR = "data"
+
+
+def row_range(times, start_date=None, end_date=None):
+    """(lo, hi) rows of sorted ms timestamps between two dates, selected like load_data's df.loc slice.
+
+    A date string covers its whole resolution, as in pandas partial-date slicing: an end date of
+    "2025-01-01" includes every candle of that day.
+    """
+    lo = 0 if start_date is None else int(np.searchsorted(times, pd.Timestamp(start_date).value // 10**6, "left"))
+    if end_date is None:
+        return lo, len(times)
+    end = pd.Period(end_date).end_time if isinstance(end_date, str) else pd.Timestamp(end_date)
+    return lo, int(np.searchsorted(times, end.value // 10**6, "right"))
+
+
+class RunningStats:
+    """Per-column mean/variance updated online: Welford by default, exponential when ema_alpha is set."""
+
+    def __init__(self, num_features, ema_alpha=None):
+        self.ema_alpha = ema_alpha
+        self.count = 0
+        self.mean = np.zeros(num_features)
+        self.m2 = np.zeros(num_features)
+
+    @property
+    def var(self):
+        if self.ema_alpha:
+            return self.m2
+        return self.m2 / self.count if self.count else np.zeros_like(self.m2)
+
+    @property
+    def std(self):
+        return np.sqrt(self.var) + 1e-5
+
+    def update(self, batch):
+        """Fold batch into the statistics and return each row normalized with the stats up to and including it."""
+        batch = np.asarray(batch, dtype=np.float64)
+        if not len(batch):
+            return batch.astype(np.float32)
+        if self.ema_alpha:
+            return self._update_ema(batch)
+        # Chan/Welford merge of (count, mean, m2) with every prefix of the batch, shifted by the old mean
+        k = np.arange(1, len(batch) + 1)[:, None]
+        shifted = batch - self.mean
+        s1 = np.cumsum(shifted, axis=0)
+        s2 = np.cumsum(shifted ** 2, axis=0)
+        n = self.count + k
+        means = self.mean + s1 / n
+        m2s = self.m2 + (s2 - s1 ** 2 / k) + (s1 / k) ** 2 * (self.count * k / n)
+        stds = np.sqrt(np.maximum(m2s, 0) / n) + 1e-5
+        self.count += len(batch)
+        self.mean = means[-1]
+        self.m2 = np.maximum(m2s[-1], 0)
+        return ((batch - means) / stds).astype(np.float32)
+
+    def _update_ema(self, batch):
+        alpha = self.ema_alpha
+        out = np.empty(batch.shape, dtype=np.float32)
+        for i, row in enumerate(batch):
+            if self.count == 0:
+                self.mean = row.copy()
+            else:
+                delta = row - self.mean
+                self.mean = self.mean + alpha * delta
+                self.m2 = (1 - alpha) * (self.m2 + alpha * delta ** 2)
+            self.count += 1
+            out[i] = (row - self.mean) / self.std
+        return out
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self.mean.tolist(), "m2": self.m2.tolist(), "ema_alpha": self.ema_alpha}
+
+    @classmethod
+    def from_dict(cls, state):
+        stats = cls(len(state["mean"]), state.get("ema_alpha"))
+        stats.count = state["count"]
+        stats.mean = np.array(state["mean"], dtype=np.float64)
+        stats.m2 = np.array(state["m2"], dtype=np.float64)
+        return stats
+
+
+def symbol_source(symbol, data_dir=DATA_DIR):
+    """Candle file for a symbol: a known source, else data/<SYMBOL>.parquet|csv|xlsx."""
+    if symbol in SYMBOL_SOURCES:
+        return SYMBOL_SOURCES[symbol]
+    for ext in (".parquet", ".csv", ".xlsx"):
+        path = os.path.join(data_dir, f"{symbol}{ext}")
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No candle file for symbol '{symbol}' in '{data_dir}'")
+
+
+def read_candles(path):
+    """Candles from CSV, Parquet or Excel as a frame indexed by timeClose."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        df = pd.read_parquet(path)
+    elif ext in (".xlsx", ".xls"):
+        df = pd.read_excel(path, engine="openpyxl")
+    else:
+        df = pd.read_csv(path)
+    if pd.api.types.is_numeric_dtype(df["timeClose"]):
+        df["timeClose"] = pd.to_datetime(df["timeClose"], unit="ms")
+    else:
+        df["timeClose"] = pd.to_datetime(df["timeClose"])
+    return df.set_index("timeClose").sort_index()
+
+
+class ColumnStore:
+    """Append-only cache of candles as raw column files, with online-normalized copies alongside.
+
+    Layout: timeClose.i8 (ms since epoch), <column>.f8 (raw), <column>.norm.f4 and meta.json
+    holding the row count and running statistics. Appends only touch the new rows.
+    """
+
+    def __init__(self, folder=DEFAULT_STORE, columns=None, ema_alpha=None):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        meta_file = os.path.join(folder, "meta.json")
+        if os.path.exists(meta_file):
+            with open(meta_file, "r") as f:
+                self.meta = json.load(f)
+            self.stats = RunningStats.from_dict(self.meta["stats"])
+        else:
+            columns = list(columns or FEATURE_COLUMNS)
+            self.stats = RunningStats(len(columns), ema_alpha)
+            self.meta = {"columns": columns, "rows": 0, "last_time": None, "sources": {}}
+
+    @property
+    def columns(self):
+        return self.meta["columns"]
+
+    @property
+    def rows(self):
+        return self.meta["rows"]
+
+    def _path(self, name, suffix):
+        return os.path.join(self.folder, f"{name}.{suffix}")
+
+    def _column(self, name, suffix, dtype):
+        path = self._path(name, suffix)
+        if not self.rows or not os.path.exists(path):
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=(self.rows,))
+
+    def times(self):
+        return self._column("timeClose", "i8", np.int64)
+
+    def raw(self, name):
+        return self._column(name, "f8", np.float64)
+
+    def _discard_partial_append(self):
+        """Cut each column file back to meta["rows"]. Columns are written before meta.json is replaced,
+        so an append interrupted between the two leaves bytes that later rows would land behind."""
+        files = [("timeClose", "i8", 8)]
+        for name in self.columns:
+            files += [(name, "f8", 8), (name, "norm.f4", 4)]
+        for name, suffix, itemsize in files:
+            path = self._path(name, suffix)
+            if os.path.exists(path) and os.path.getsize(path) > self.rows * itemsize:
+                os.truncate(path, self.rows * itemsize)
+
+    def append(self, frame, source=None):
+        """Append rows newer than the last stored candle. Returns the number of rows written."""
+        times = frame.index.values.astype("datetime64[ms]").astype(np.int64)
+        if self.meta["last_time"] is not None:
+            keep = times > self.meta["last_time"]
+            frame, times = frame[keep], times[keep]
+        if source:
+            self.meta["sources"][os.path.abspath(source)] = os.path.getmtime(source)
+        if not len(frame):
+            if source:
+                self._write_meta()
+            return 0
+        raw = frame[self.columns].values.astype(np.float64)
+        normalized = self.stats.update(raw)
+
+        self._discard_partial_append()
+        with open(self._path("timeClose", "i8"), "ab") as f:
+            f.write(times.tobytes())
+        for i, name in enumerate(self.columns):
+            with open(self._path(name, "f8"), "ab") as f:
+                f.write(np.ascontiguousarray(raw[:, i]).tobytes())
+            with open(self._path(name, "norm.f4"), "ab") as f:
+                f.write(np.ascontiguousarray(normalized[:, i]).tobytes())
+
+        self.meta["rows"] += len(frame)
+        self.meta["last_time"] = int(times[-1])
+        self._write_meta()
+        return len(frame)
+
+    def is_current(self, source):
+        """True when source has not changed since it was last ingested."""
+        seen = self.meta["sources"].get(os.path.abspath(source))
+        return seen is not None and os.path.getmtime(source) <= seen
+
+    def _write_meta(self):
+        self.meta["stats"] = self.stats.to_dict()
+        meta_file = os.path.join(self.folder, "meta.json")
+        tmp = meta_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f, indent=4)
+        os.replace(tmp, meta_file)
+
+    def frame(self, start_date=None, end_date=None):
+        """(df, X, Y) in the shape load_data() returns, with X normalized causally."""
+        times = self.times()
+        lo, hi = row_range(times, start_date, end_date)
+        index = pd.DatetimeIndex(np.asarray(times[lo:hi]).astype("datetime64[ms]"), name="timeClose")
+        df = pd.DataFrame({name: np.asarray(self._column(name, "f8", np.float64)[lo:hi]) for name in self.columns}, index=index)
+        X = pd.DataFrame({name: np.asarray(self._column(name, "norm.f4", np.float32)[lo:hi]) for name in self.columns}, index=index)
+        Y = df[["priceClose"]].rename(columns={"priceClose": "LTC"})
+        return df, X, Y
+
+
+def symbol_store(symbol):
+    return ColumnStore(os.path.join(DEFAULT_STORE, symbol))
+
+
+def ingest_file(path, store=None):
+    store = store if store is not None else symbol_store("LTC")
+    if store.is_current(path):
+        return 0
+    return store.append(read_candles(path), source=path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append candles to the cached dataset without reprocessing history.")
+    parser.add_argument("files", nargs="+", help="CSV, Parquet or Excel files with a timeClose column")
+    parser.add_argument("--store", default=os.path.join(DEFAULT_STORE, "LTC"))
+    parser.add_argument("--ema-alpha", type=float, help="Exponential statistics instead of Welford (new stores only)")
+    args = parser.parse_args()
+
+    store = ColumnStore(args.store, ema_alpha=args.ema_alpha)
+    for path in args.files:
+        added = ingest_file(path, store)
+        print(f"{path}: {added} new rows ({store.rows} total)")
+
+
+if __name__ == "__main__":
+    main()
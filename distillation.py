@@ -0,0 +1,126 @@
+import os
+import time
+import json
+import argparse
+import numpy as np
+import torch
+import torch.nn.functional as F
+from Q import QNetwork, NUM_ACTIONS
+from inference import InferenceEngine, save_checkpoint, strip_dropout
+from model_registry import read_metadata, write_metadata
+from policy_eval import action_agreement, measure_latency, run_backtest, compare_summaries, write_report
+from strategy import build_features, uses_feature_pipeline
+from training import load_learning_settings
+
+
+def teacher_states(teacher_path, df, X, learning_settings):
+    """Market states in the layout the teacher was trained on."""
+    meta = read_metadata(teacher_path)
+    feature_settings = {
+        key: meta.get(key, learning_settings[key]) for key in ("feature_window", "indicators", "compact_replay")
+    }
+    if uses_feature_pipeline(feature_settings):
+        features = build_features(df, X, feature_settings["feature_window"], feature_settings["indicators"])
+        return features.gather(np.arange(len(features)))
+    return np.ascontiguousarray(X.values, dtype=np.float32)
+
+
+def distill(teacher_path, states, student_path, hidden_sizes=(64, 32), epochs=30, batch_size=512,
+            learning_rate=1e-3, action_weight=1.0, noise=0.05, seed=0):
+    """Fit a dropout-free student to the teacher's Q-values (MSE) and greedy actions (cross-entropy).
+
+    noise adds Gaussian jitter to each minibatch so the student also matches the teacher near the data.
+    """
+    torch.manual_seed(seed)
+    rng = np.random.default_rng(seed)
+    teacher = InferenceEngine.load(teacher_path, states.shape[1], action_space=NUM_ACTIONS)
+    student = QNetwork((states.shape[1],), NUM_ACTIONS, hidden_sizes=hidden_sizes, dropout=0.0)
+    optimizer = torch.optim.Adam(student.parameters(), lr=learning_rate)
+
+    history = []
+    for epoch in range(epochs):
+        order = rng.permutation(len(states))
+        total = 0.0
+        for start in range(0, len(order), batch_size):
+            batch = states[order[start:start + batch_size]]
+            if noise:
+                batch = batch + rng.normal(0, noise, batch.shape).astype(np.float32)
+            target_q = torch.from_numpy(teacher.predict(batch))
+            q_values = student(torch.from_numpy(np.ascontiguousarray(batch, dtype=np.float32)))
+            loss = F.mse_loss(q_values, target_q) + action_weight * F.cross_entropy(q_values, target_q.argmax(dim=1))
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total += loss.item() * len(batch)
+        history.append(total / len(states))
+
+    save_checkpoint(student.state_dict(), student_path)
+    metadata = dict(read_metadata(teacher_path), distilled_from=teacher_path, distillation_loss=history)
+    metadata.pop("content_hash", None)
+    metadata.pop("saved_at", None)
+    write_metadata(student_path, dict(metadata, hidden_sizes=list(hidden_sizes)))
+    return student, history
+
+
+def parameter_count(module):
+    return sum(p.numel() for p in module.parameters())
+
+
+def distillation_report(teacher_path, df, X, Y, student_path=None, hidden_sizes=(64, 32), epochs=30,
+                        initial_cash=1000, risk_level="Medium Risk", folder=None):
+    settings = load_learning_settings()
+    folder = folder or os.path.join("reports", f"distill_{int(time.time())}")
+    student_path = student_path or os.path.splitext(teacher_path)[0] + "_student.pt"
+    states = teacher_states(teacher_path, df, X, settings)
+    student, history = distill(teacher_path, states, student_path, hidden_sizes, epochs)
+
+    engines = {
+        "teacher": InferenceEngine.load(teacher_path, states.shape[1], action_space=NUM_ACTIONS),
+        "student": InferenceEngine(module=strip_dropout(student)),
+    }
+    latency = {name: measure_latency(engine, states) for name, engine in engines.items()}
+    run_settings = dict(settings, inference_backend="eager", inference_precision="fp32")
+    backtests = {
+        name: run_backtest(path, df, X, Y, initial_cash, risk_level, os.path.join(folder, name), run_settings)
+        for name, path in (("teacher", teacher_path), ("student", student_path))
+    }
+    report = {
+        "teacher": teacher_path,
+        "student": student_path,
+        "hidden_sizes": list(hidden_sizes),
+        "parameters": {"teacher": parameter_count(engines["teacher"].module), "student": parameter_count(student)},
+        "final_loss": history[-1],
+        "action_agreement": action_agreement(engines["teacher"], engines["student"], states),
+        "latency": latency,
+        "single_decision_speedup": latency["teacher"]["single_p50_us"] / latency["student"]["single_p50_us"],
+        "batch_throughput_speedup": latency["student"]["batch_rows_per_s"] / latency["teacher"]["batch_rows_per_s"],
+        "backtest": compare_summaries(backtests["teacher"], backtests["student"]),
+    }
+    report["path"] = write_report(report, folder)
+    return report
+
+
+def main():
+    from strategy import load_data
+
+    parser = argparse.ArgumentParser(description="Distill a trained QNetwork into a smaller student.")
+    parser.add_argument("teacher")
+    parser.add_argument("--student")
+    parser.add_argument("--hidden", default="64,32", help="Comma-separated hidden layer sizes")
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--start", default="2024-01-01")
+    parser.add_argument("--end", default="2025-01-01")
+    parser.add_argument("--cash", type=float, default=1000)
+    parser.add_argument("--risk", default="Medium Risk")
+    args = parser.parse_args()
+
+    hidden_sizes = tuple(int(size) for size in args.hidden.split(",") if size)
+    df, X, Y = load_data(args.start, args.end)
+    report = distillation_report(
+        args.teacher, df, X, Y, args.student, hidden_sizes, args.epochs, args.cash, args.risk
+    )
+    print(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    main()
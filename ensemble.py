@@ -0,0 +1,66 @@
+import copy
+import numpy as np
+import torch
+from torch.func import functional_call, stack_module_state, vmap
+from inference import load_checkpoint, strip_dropout
+
+ENSEMBLE_POLICIES = ("mean_q", "majority")
+
+
+class EnsembleEngine:
+    """K same-shape policies evaluated in one vmapped call over stacked parameters.
+
+    predict() returns per-action scores for the ensemble policy: the mean Q-value for "mean_q",
+    or vote counts for "majority" (ties broken by mean Q, which adds less than one vote).
+    """
+
+    def __init__(self, modules, device=None, policy="mean_q"):
+        if policy not in ENSEMBLE_POLICIES:
+            raise ValueError(f"Unknown ensemble policy: {policy}")
+        self.device = device or torch.device("cpu")
+        self.policy = policy
+        self.module = None
+        members = [strip_dropout(m).to(self.device) for m in modules]
+        self.size = len(members)
+        self.params, self.buffers = stack_module_state(members)
+        base = copy.deepcopy(members[0]).to("meta")
+
+        def call(params, buffers, states):
+            return functional_call(base, (params, buffers), (states,))
+
+        self._forward = vmap(call, in_dims=(0, 0, None))
+
+    @classmethod
+    def from_paths(cls, paths, input_dim, action_space=3, device=None, policy="mean_q"):
+        return cls([load_checkpoint(path, input_dim, action_space) for path in paths], device, policy)
+
+    def predict_all(self, states):
+        """(K, N, A) Q-values of every member for a batch of states."""
+        states = np.asarray(states, dtype=np.float32)
+        states = states.reshape(1, -1) if states.ndim == 1 else states.reshape(states.shape[0], -1)
+        with torch.inference_mode():
+            q_values = self._forward(self.params, self.buffers, torch.from_numpy(states).to(self.device))
+        return q_values.float().cpu().numpy()
+
+    def member_actions(self, states):
+        """(K, N) greedy action of every member, e.g. for checkpoint tournaments."""
+        return self.predict_all(states).argmax(axis=2)
+
+    def agreement(self, states):
+        """(K, K) fraction of states on which each pair of members picks the same action."""
+        actions = self.member_actions(states)
+        return (actions[:, None, :] == actions[None, :, :]).mean(axis=2)
+
+    def predict(self, states):
+        q_values = self.predict_all(states)
+        mean_q = q_values.mean(axis=0)
+        if self.policy == "mean_q":
+            return mean_q
+        votes = np.zeros_like(mean_q)
+        np.add.at(votes, (np.arange(mean_q.shape[0])[None, :], q_values.argmax(axis=2)), 1)
+        spread = mean_q.max(axis=1, keepdims=True) - mean_q.min(axis=1, keepdims=True)
+        return votes + 0.5 * (mean_q - mean_q.min(axis=1, keepdims=True)) / (spread + 1e-8)
+
+    def act(self, state):
+        q_values = self.predict(state)[0]
+        return int(np.argmax(q_values)), q_values
@@ -0,0 +1,144 @@
+import os
+import asyncio
+import queue
+import threading
+
+TEXT_EVENTS = ("log", "lesson", "note")
+LATEST_ONLY_EVENTS = ("metrics", "chart")
+
+
+class CancellationToken:
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._running.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def pause(self):
+        if not self.cancelled:
+            self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def wait_if_paused(self):
+        """Block while paused. Returns False once the token has been cancelled."""
+        self._running.wait()
+        return not self.cancelled
+
+    def sleep(self, seconds):
+        """Sleep that returns early (with False) when the token is cancelled."""
+        if seconds > 0:
+            self._cancelled.wait(seconds)
+        return not self.cancelled
+
+
+def null_emit(kind, payload=None):
+    pass
+
+
+def process_alive(pid):
+    """Whether a local process exists. Always True on Windows, where os.kill(pid, 0) would terminate it."""
+    if os.name == "nt":
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class LogChannel:
+    """Stands in for a Flet text control inside a worker: text appended to value is sent on update()."""
+
+    def __init__(self, emit, kind="log"):
+        self.emit = emit
+        self.kind = kind
+        self.value = ""
+
+    def update(self):
+        if self.value:
+            self.emit(self.kind, self.value)
+            self.value = ""
+
+
+class BackgroundTask:
+    """Runs target(token, emit, *args, **kwargs) on a worker thread and streams its events back."""
+
+    def __init__(self, target, *args, token=None, **kwargs):
+        self.token = token or CancellationToken()
+        self.events = queue.Queue()
+        self.result = None
+        self.error = None
+        self._thread = threading.Thread(target=self._run, args=(target, args, kwargs), daemon=True)
+
+    def emit(self, kind, payload=None):
+        self.events.put((kind, payload))
+
+    def _run(self, target, args, kwargs):
+        try:
+            self.result = target(self.token, self.emit, *args, **kwargs)
+        except Exception as e:
+            self.error = e
+            self.emit("error", f"{type(e).__name__}: {e}")
+        finally:
+            self.events.put(("finished", None))
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def join(self, timeout=None):
+        """Wait for the worker to return; True when it has."""
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _drain(self):
+        batch = []
+        finished = False
+        while True:
+            try:
+                kind, payload = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "finished":
+                finished = True
+                break
+            if kind in TEXT_EVENTS and batch and batch[-1][0] == kind:
+                batch[-1] = (kind, batch[-1][1] + payload)
+            else:
+                batch.append((kind, payload))
+        latest = {}
+        for i, (kind, _) in enumerate(batch):
+            if kind in LATEST_ONLY_EVENTS:
+                latest[kind] = i
+        batch = [event for i, event in enumerate(batch) if event[0] not in latest or latest[event[0]] == i]
+        return batch, finished
+
+    async def consume(self, handler, interval=0.05):
+        """Deliver queued events to handler(kind, payload) from the UI event loop until the worker ends."""
+        finished = False
+        while not finished:
+            batch, finished = self._drain()
+            for kind, payload in batch:
+                handler(kind, payload)
+            if not finished:
+                await asyncio.sleep(interval)
+        return self.result
@@ -0,0 +1,98 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+INDICATOR_COLUMNS = ["return", "log_return", "volatility", "rsi", "sma_ratio_fast", "sma_ratio_slow"]
+# TradingEnvXY's default observation clip
+OBSERVATION_CLIP = 5.0
+
+
+def rolling_mean(values, window):
+    """Causal rolling mean; the first window-1 rows use the expanding mean."""
+    csum = np.concatenate([[0.0], np.cumsum(values, dtype=np.float64)])
+    n = np.arange(1, len(values) + 1)
+    counts = np.minimum(n, window)
+    return (csum[n] - csum[n - counts]) / counts
+
+
+def observation_matrix(X, clip=OBSERVATION_CLIP):
+    """X as TradingEnvXY(transformer="z-score") observes it: standardized over all rows, gaps forward-filled
+    (zero before the first value), then clipped."""
+    values = np.asarray(X, dtype=np.float64)
+    mean = np.nanmean(values, axis=0)
+    std = np.nanstd(values, axis=0)
+    # StandardScaler leaves constant columns unscaled
+    std[std == 0] = 1.0
+    values = (values - mean) / std
+    missing = np.isnan(values)
+    if missing.any():
+        last = np.maximum.accumulate(np.where(missing, 0, np.arange(len(values))[:, None]), axis=0)
+        values = np.nan_to_num(np.take_along_axis(values, last, axis=0), nan=0.0)
+    return np.clip(values, -clip, clip)
+
+
+def compute_indicators(close, vol_window=20, rsi_window=14, fast_window=10, slow_window=50):
+    close = np.asarray(close, dtype=np.float64)
+    prev = np.concatenate([close[:1], close[:-1]])
+    returns = close / prev - 1
+    log_returns = np.log(close / prev)
+    variance = rolling_mean(log_returns ** 2, vol_window) - rolling_mean(log_returns, vol_window) ** 2
+    volatility = np.sqrt(np.maximum(variance, 0))
+
+    diff = close - prev
+    avg_gain = rolling_mean(np.maximum(diff, 0), rsi_window)
+    avg_loss = rolling_mean(np.maximum(-diff, 0), rsi_window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(avg_loss > 0, 100 - 100 / (1 + avg_gain / avg_loss), 100.0)
+    rsi = np.where((avg_gain == 0) & (avg_loss == 0), 50.0, rsi)
+
+    sma_fast = close / rolling_mean(close, fast_window) - 1
+    sma_slow = close / rolling_mean(close, slow_window) - 1
+    return np.column_stack([returns, log_returns, volatility, rsi / 50 - 1, sma_fast, sma_slow])
+
+
+class FeatureSet:
+    """Per-row features stored once as contiguous float32, with zero-copy window views over them."""
+
+    def __init__(self, matrix, window=1, columns=None):
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.window = max(int(window), 1)
+        self.columns = list(columns) if columns is not None else None
+        # Pad with copies of the first row so the window ending at row t exists for every t
+        pad = np.repeat(self.matrix[:1], self.window - 1, axis=0)
+        self._padded = np.ascontiguousarray(np.concatenate([pad, self.matrix]))
+        self.windows = sliding_window_view(self._padded, (self.window, self.matrix.shape[1]))[:, 0]
+
+    @classmethod
+    def from_frame(cls, df, X, window=1, indicators=False):
+        # The same rows the environment returns as observations, so both state paths match
+        matrix = observation_matrix(X.values).astype(np.float32)
+        columns = list(X.columns)
+        if indicators:
+            extra = compute_indicators(df["priceClose"].values)
+            extra = (extra - extra.mean(0)) / (extra.std(0) + 1e-5)
+            matrix = np.concatenate([matrix, extra.astype(np.float32)], axis=1)
+            columns += INDICATOR_COLUMNS
+        return cls(matrix, window, columns)
+
+    def __len__(self):
+        return len(self.matrix)
+
+    @property
+    def num_features(self):
+        return self.matrix.shape[1]
+
+    @property
+    def state_dim(self):
+        return self.window * self.num_features
+
+    def state(self, t):
+        """Window ending at row t, flattened to (1, state_dim)."""
+        t = min(max(int(t), 0), len(self.matrix) - 1)
+        # One row is copied so the caller gets a writeable array and the shared windows stay read-only
+        return self.windows[t].reshape(1, -1).copy()
+
+    def gather(self, indices):
+        """Flattened windows for a batch of row indices, as a new writeable array."""
+        indices = np.clip(np.asarray(indices, dtype=np.int64), 0, len(self.matrix) - 1)
+        # Fancy indexing copies, so the batch does not alias the read-only windows
+        return self.windows[indices].reshape(len(indices), -1)
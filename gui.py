@@ -1,21 +1,37 @@
 import flet as ft
-from flet.matplotlib_chart import MatplotlibChart
-import matplotlib.pyplot as plt
 import warnings
 import asyncio
+import importlib
+import json
 from setting_page import create_settings_page  
+from jobs_page import create_jobs_page
+from runs_page import create_runs_page
 from components import (
     create_metrics,
     create_metrics_container,
-    create_charts,
     create_training_controls,
+    create_profiler_panel,
 )
-from strategy import load_data
-from training import run_training
-from model_loader import load_and_test_model
+from execution import CancellationToken
+
+# Heavy modules (pandas, torch, matplotlib, tradingenv) are imported on first use
+# so the window can render before they are loaded.
+DEFERRED_MODULES = ["strategy", "training", "model_loader"]
 
 warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
 
+def data_settings(settings_file="learning_settings.json"):
+    # Read directly so the data can load before training (and torch) is imported
+    try:
+        with open(settings_file, "r") as f:
+            settings = json.load(f)
+    except (OSError, ValueError):
+        settings = {}
+    return {
+        "normalization": settings.get("normalization", "global"),
+        "timeframe": settings.get("timeframe", "native"),
+    }
+
 METRIC_KEYS = [
     "Buys", "Sells", "Hold", "Profit", "% Success",
     "Current Money in Wallet", "Assets",
@@ -30,13 +46,7 @@ def main(page: ft.Page):
     page.scroll = "auto"
 
     page.agent = None
-
-    try:
-        df, X, Y = load_data()
-        page.df, page.X, page.Y = df, X, Y
-    except Exception as e:
-        page.add(ft.Text(f"Error loading data: {e}", color=ft.Colors.RED))
-        return
+    workspace = {"ready": False}
 
     current_period = {"start": "2024-01-01", "end": "2025-01-01"}
 
@@ -46,8 +56,6 @@ def main(page: ft.Page):
         run_spacing=10, spacing=10, controls=list(metrics.values())
     )
 
-    chart_all, chart_dynamic, chart_pred, ax_all, ax_dynamic, ax_pred = create_charts(df, current_period)
-
     status, log_text, ai_notes_text, lessons_text, \
     start_btn, pause_btn, end_btn, clear_notes_btn, clear_lessons_btn, \
     mode_dropdown, initial_cash_field, risk_dropdown, select_model_btn, model_name_field = create_training_controls(
@@ -59,6 +67,8 @@ def main(page: ft.Page):
         clear_lessons=lambda: None
     )
 
+    profile_text = create_profiler_panel()
+
     count_field = ft.TextField(label="Training Count", value="10", width=120, hint_text="تعداد epoch‌ها")
     speed_field = ft.TextField(label="Training Speed (s/step)", value="0.1", width=120, hint_text="سرعت آموزش")
 
@@ -71,7 +81,9 @@ def main(page: ft.Page):
         "clear_ai_notes": None,
         "clear_lessons": None,
         "pause_requested": False,
-        "training_active": True
+        "training_active": True,
+        "token": None,
+        "task": None
     }
 
     page.controls_dict = {
@@ -81,8 +93,7 @@ def main(page: ft.Page):
         "mode_dropdown": mode_dropdown, "initial_cash_field": initial_cash_field,
         "risk_dropdown": risk_dropdown, "select_model_btn": select_model_btn,
         "model_name_field": model_name_field, "count_field": count_field, "speed_field": speed_field,
-        "metrics": metrics, "chart_all": chart_all, "chart_dynamic": chart_dynamic,
-        "chart_pred": chart_pred, "ax_all": ax_all, "ax_dynamic": ax_dynamic, "ax_pred": ax_pred
+        "metrics": metrics, "profile_text": profile_text
     }
 
     page.training_manager = training_manager
@@ -93,21 +104,30 @@ def main(page: ft.Page):
 
     settings_btn = ft.ElevatedButton("Learning Settings", width=150, on_click=open_settings)
 
+    def open_jobs(e):
+        page.views.append(create_jobs_page(page))
+        page.update()
+
+    jobs_btn = ft.ElevatedButton("Job Queue", width=150, on_click=open_jobs)
+
+    def open_runs(e):
+        page.views.append(create_runs_page(page))
+        page.update()
+
+    runs_btn = ft.ElevatedButton("Run History", width=150, on_click=open_runs)
+
     def handle_model_selection(e):
         if e.files:
-            model_path = e.files[0].path
-            model_name_field.value = model_path
+            # Selecting several checkpoints tests them as an ensemble
+            paths = [f.path for f in e.files]
+            model_path = paths[0] if len(paths) == 1 else paths
+            model_name_field.value = ", ".join(paths)
             model_name_field.update()
-            status.value = f"Testing model: {model_path}"
+            status.value = f"Testing model: {model_name_field.value}"
             status.color = ft.Colors.BLUE
             status.update()
-            load_and_test_model(
-                model_path, log_text, metrics,
-                chart_all, chart_dynamic, chart_pred,
-                ax_all, ax_dynamic, ax_pred,
-                lessons_text, ai_notes_text,
-                df, X, Y,
-                initial_cash_field.value, risk_dropdown.value
+            page.run_task(
+                run_model_test, model_path, initial_cash_field.value, risk_dropdown.value
             )
         else:
             model_name_field.value = ""
@@ -116,6 +136,35 @@ def main(page: ft.Page):
             status.color = ft.Colors.RED
             status.update()
 
+    async def run_model_test(model_path, initial_cash, risk_level):
+        from model_loader import load_and_test_model
+
+        token = CancellationToken()
+        training_manager["token"] = token
+        start_btn.disabled = True
+        select_model_btn.disabled = True
+        pause_btn.disabled = False
+        end_btn.disabled = False
+        page.update()
+        try:
+            await load_and_test_model(
+                model_path, log_text, metrics,
+                workspace["chart_all"], workspace["chart_dynamic"], workspace["chart_pred"],
+                workspace["ax_all"], workspace["ax_dynamic"], workspace["ax_pred"],
+                lessons_text, ai_notes_text,
+                workspace["df"], workspace["X"], workspace["Y"],
+                initial_cash, risk_level,
+                token=token
+            )
+        finally:
+            start_btn.disabled = False
+            select_model_btn.disabled = False
+            pause_btn.disabled = True
+            end_btn.disabled = True
+            status.value = "Model test finished."
+            status.color = ft.Colors.BLUE
+            page.update()
+
     def update_mode(mode):
         log_text.value += f"Mode updated to {mode}\n"
         log_text.update()
@@ -141,11 +190,15 @@ def main(page: ft.Page):
         lessons_text.update()
 
     def start_click(e):
+        from training import run_training
+
         start_btn.disabled = True
         pause_btn.disabled = False
         end_btn.disabled = False
         select_model_btn.disabled = True
         training_manager["training_active"] = True
+        training_manager["pause_requested"] = False
+        training_manager["token"] = CancellationToken()
 
         try:
             count = int(count_field.value)
@@ -173,25 +226,35 @@ def main(page: ft.Page):
         page.run_task(
             run_training,
             page, status, log_text, ai_notes_text, lessons_text,
-            metrics, chart_all, chart_dynamic, chart_pred,
-            ax_all, ax_dynamic, ax_pred,
+            metrics, workspace["chart_all"], workspace["chart_dynamic"], workspace["chart_pred"],
+            workspace["ax_all"], workspace["ax_dynamic"], workspace["ax_pred"],
             count, delay, training_manager,
-            df, X, Y, initial_cash_field.value, risk_dropdown.value,
-            set_agent=lambda agent: setattr(page, 'agent', agent)
+            workspace["df"], workspace["X"], workspace["Y"], initial_cash_field.value, risk_dropdown.value,
+            set_agent=lambda agent: setattr(page, 'agent', agent),
+            profile_text=profile_text
         )
 
     def pause_click(e):
         training_manager["pause_requested"] = not training_manager["pause_requested"]
+        token = training_manager["token"]
+        if token is not None:
+            if training_manager["pause_requested"]:
+                token.pause()
+            else:
+                token.resume()
         status.value = "Training Paused" if training_manager["pause_requested"] else "Training Resumed"
         status.color = ft.Colors.YELLOW if training_manager["pause_requested"] else ft.Colors.BLUE
         status.update()
 
     def end_click(e):
         training_manager["training_active"] = False
+        training_manager["pause_requested"] = False
+        if training_manager["token"] is not None:
+            training_manager["token"].cancel()
         start_btn.disabled = False
         pause_btn.disabled = True
         end_btn.disabled = True
-        select_model_btn.disabled = False
+        select_model_btn.disabled = not workspace["ready"]
         status.value = "Training Stopped."
         status.color = ft.Colors.RED
         status.update()
@@ -199,11 +262,21 @@ def main(page: ft.Page):
     def select_model_click(e):
         page.overlay.append(model_file_picker)
         model_file_picker.on_result = handle_model_selection
-        model_file_picker.pick_files()
+        model_file_picker.pick_files(allow_multiple=True)
         page.update()
 
     def on_window_close(e):
-        if e.data == "close" and page.agent is not None:
+        if e.data == "close" and training_manager["token"] is not None:
+            training_manager["token"].cancel()
+        if e.data == "close" and getattr(page, "job_scheduler", None) is not None:
+            page.job_scheduler.stop()
+            page.job_scheduler_thread.join(timeout=30)
+        task = training_manager["task"]
+        if e.data == "close" and task is not None and not task.join(timeout=30):
+            # The worker is still inside replay(); saving now could capture a half-applied update
+            log_text.value += "Training did not stop in time; skipping the auto-save.\n"
+            log_text.update()
+        elif e.data == "close" and page.agent is not None:
             try:
                 page.agent.save_model("dqn_model_auto_save.pt")
                 log_text.value += "Model auto-saved as 'dqn_model_auto_save.pt' on window close.\n"
@@ -213,6 +286,51 @@ def main(page: ft.Page):
                 log_text.update()
         page.close()
 
+    async def load_workspace():
+        from strategy import load_data
+        from components import create_charts
+
+        try:
+            df, X, Y = await asyncio.to_thread(load_data, **data_settings())
+        except Exception as e:
+            chart_row.controls = [ft.Text(f"Error loading data: {e}", color=ft.Colors.RED)]
+            status.value = "Data could not be loaded."
+            status.color = ft.Colors.RED
+            page.update()
+            return
+        page.df, page.X, page.Y = df, X, Y
+        workspace.update({"df": df, "X": X, "Y": Y})
+
+        chart_all, chart_dynamic, chart_pred, ax_all, ax_dynamic, ax_pred = create_charts(df, current_period)
+        charts = {
+            "chart_all": chart_all, "chart_dynamic": chart_dynamic, "chart_pred": chart_pred,
+            "ax_all": ax_all, "ax_dynamic": ax_dynamic, "ax_pred": ax_pred
+        }
+        workspace.update(charts)
+        page.controls_dict.update(charts)
+        chart_row.controls = [
+            ft.Container(chart_all, expand=True),
+            ft.Container(chart_dynamic, expand=True),
+            ft.Container(chart_pred, expand=True),
+        ]
+        workspace["ready"] = True
+        start_btn.disabled = False
+        select_model_btn.disabled = False
+        status.value = "Press Start to begin training."
+        status.color = ft.Colors.BLUE
+        page.update()
+
+        # Warm the torch-backed modules while the user looks at the charts.
+        for name in DEFERRED_MODULES:
+            await asyncio.to_thread(importlib.import_module, name)
+
+    chart_row = ft.Row([
+        ft.Row([ft.ProgressRing(width=24, height=24), ft.Text("Loading market data...")]),
+    ], expand=True)
+    start_btn.disabled = True
+    select_model_btn.disabled = True
+    status.value = "Loading market data..."
+
     start_btn.on_click = start_click
     pause_btn.on_click = pause_click
     end_btn.on_click = end_click
@@ -221,12 +339,8 @@ def main(page: ft.Page):
 
     page.add(
         ft.Column([
-            ft.Row([settings_btn]),
-            ft.Row([
-                ft.Container(chart_all, expand=True),
-                ft.Container(chart_dynamic, expand=True),
-                ft.Container(chart_pred, expand=True),
-            ], expand=True),
+            ft.Row([settings_btn, jobs_btn, runs_btn]),
+            chart_row,
             ft.Row([
                 ft.Column([
                     status,
@@ -239,13 +353,15 @@ def main(page: ft.Page):
             ft.Row([ft.Text("Lessons & Notes:", weight="bold")]),
             ft.Row([
                 ft.Container(lessons_text, expand=True),
-                ft.Container(ai_notes_text, expand=True)
+                ft.Container(ai_notes_text, expand=True),
+                ft.Container(profile_text, expand=True)
             ], expand=True)
         ], scroll="auto", expand=True)
     )
 
     page.overlay.append(model_file_picker)
     page.update()
+    page.run_task(load_workspace)
 
 if __name__ == "__main__":
     ft.app(target=main, view=ft.AppView.FLET_APP)
\ No newline at end of file
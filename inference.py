@@ -0,0 +1,173 @@
+import os
+import copy
+import argparse
+import numpy as np
+import torch
+import torch.nn as nn
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+INFERENCE_BACKENDS = ("eager", "torchscript", "onnx")
+INFERENCE_PRECISIONS = ("fp32", "int8")
+EXPORT_SUFFIXES = {"torchscript": ".ts", "onnx": ".onnx"}
+
+
+def set_inference_threads(num_threads):
+    if num_threads and num_threads > 0:
+        torch.set_num_threads(int(num_threads))
+
+
+def strip_dropout(model, copy_weights=True):
+    """Return an eval-mode QNetwork (or Sequential) without its Dropout layers."""
+    layers = model.model if hasattr(model, "model") else model
+    kept = [copy.deepcopy(m) if copy_weights else m for m in layers if not isinstance(m, nn.Dropout)]
+    return nn.Sequential(*kept).cpu().eval()
+
+
+def save_checkpoint(state_dict, path):
+    """Write a state dict to a temporary file and move it into place.
+
+    Loaded engines may memory-map the previous checkpoint; replacing the file leaves their inode intact,
+    where rewriting it in place would change their weights underneath them (or SIGBUS if it shrank).
+    """
+    tmp = path + ".tmp"
+    torch.save(state_dict, tmp)
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path, input_dim, action_space=3):
+    """Build a QNetwork whose parameters point at a memory-mapped state dict where torch supports it.
+
+    The hidden layer sizes are taken from the checkpoint, so distilled students load like any other model.
+    """
+    from Q import QNetwork, hidden_sizes_from_state_dict
+
+    try:
+        state_dict = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    except (TypeError, RuntimeError):
+        # Older torch releases and legacy (non-zip) checkpoints cannot be memory-mapped
+        state_dict = torch.load(path, map_location="cpu")
+    model = QNetwork(
+        input_shape=(input_dim,), action_space=action_space, hidden_sizes=hidden_sizes_from_state_dict(state_dict)
+    )
+    try:
+        model.load_state_dict(state_dict, assign=True)
+    except TypeError:
+        model.load_state_dict(state_dict)
+    return model.eval()
+
+
+def quantize_model(model):
+    """Dynamically quantized (int8 nn.Linear) CPU copy of a trained QNetwork."""
+    quantization = getattr(torch, "ao", torch).quantization
+    return quantization.quantize_dynamic(strip_dropout(model), {nn.Linear}, dtype=torch.qint8).eval()
+
+
+def export_model(model, path, input_dim, fmt="torchscript"):
+    stripped = strip_dropout(model)
+    example = torch.zeros(1, input_dim)
+    if fmt == "torchscript":
+        with torch.no_grad():
+            traced = torch.jit.trace(stripped, example)
+        traced.eval()
+        frozen = torch.jit.freeze(traced)
+        torch.jit.save(frozen, path)
+    elif fmt == "onnx":
+        torch.onnx.export(
+            stripped, example, path,
+            input_names=["state"], output_names=["q_values"],
+            dynamic_axes={"state": {0: "batch"}, "q_values": {0: "batch"}},
+            opset_version=17
+        )
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return path
+
+
+def export_checkpoint(checkpoint_path, input_dim, fmt="torchscript", action_space=3, path=None):
+    """Export a saved state dict next to the checkpoint, reusing an existing export that is newer."""
+    path = path or os.path.splitext(checkpoint_path)[0] + EXPORT_SUFFIXES[fmt]
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(checkpoint_path):
+        return path
+    model = load_checkpoint(checkpoint_path, input_dim, action_space)
+    return export_model(model, path, input_dim, fmt)
+
+
+class InferenceEngine:
+    """Greedy-policy forward passes behind one predict() call, whatever the backing runtime."""
+
+    def __init__(self, module=None, session=None, device=None, live=False, num_threads=None):
+        self.module = module
+        self.session = session
+        self.device = device or torch.device("cpu")
+        self.live = live
+        set_inference_threads(num_threads)
+
+    @classmethod
+    def from_module(cls, module, device=None):
+        """Wrap a module that is still being trained; it is switched to eval mode on every call."""
+        return cls(module=module, device=device, live=True)
+
+    @classmethod
+    def load(cls, path, input_dim, backend="eager", action_space=3, device=None, num_threads=None, precision="fp32"):
+        device = device or torch.device("cpu")
+        if precision not in INFERENCE_PRECISIONS:
+            raise ValueError(f"Unknown inference precision: {precision}")
+        if precision == "int8" and (backend != "eager" or path.endswith((".ts", ".onnx"))):
+            raise ValueError("int8 inference is only available for the eager backend on .pt checkpoints")
+        if not path.endswith((".ts", ".onnx")) and backend != "eager":
+            path = export_checkpoint(path, input_dim, backend, action_space)
+
+        if path.endswith(".onnx"):
+            if ort is None:
+                raise ImportError("The onnx backend requires onnxruntime")
+            options = ort.SessionOptions()
+            if num_threads and num_threads > 0:
+                options.intra_op_num_threads = int(num_threads)
+            session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+            return cls(session=session, num_threads=num_threads)
+        if path.endswith(".ts"):
+            module = torch.jit.load(path, map_location=device)
+            return cls(module=module, device=device, num_threads=num_threads)
+
+        model = load_checkpoint(path, input_dim, action_space)
+        if precision == "int8":
+            # Quantized kernels only run on CPU
+            return cls(module=quantize_model(model), num_threads=num_threads)
+        return cls(module=strip_dropout(model, copy_weights=False).to(device), device=device, num_threads=num_threads)
+
+    def predict(self, states):
+        states = np.asarray(states, dtype=np.float32)
+        if states.ndim == 1:
+            states = states[None, :]
+        elif states.ndim > 2:
+            states = states.reshape(states.shape[0], -1)
+        if self.session is not None:
+            return self.session.run(None, {"state": states})[0]
+        if self.live:
+            self.module.eval()
+        with torch.inference_mode():
+            q_values = self.module(torch.from_numpy(states).to(self.device))
+        return q_values.float().cpu().numpy()
+
+    def act(self, state):
+        q_values = self.predict(state)[0]
+        return int(np.argmax(q_values)), q_values
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a trained QNetwork checkpoint for inference.")
+    parser.add_argument("checkpoint")
+    parser.add_argument("--format", choices=["torchscript", "onnx"], default="torchscript")
+    parser.add_argument("--input-dim", type=int, default=5)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    path = export_checkpoint(args.checkpoint, args.input_dim, args.format, path=args.output)
+    print(f"Exported {args.checkpoint} to {path}")
+
+
+if __name__ == "__main__":
+    main()
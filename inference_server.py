@@ -0,0 +1,290 @@
+import os
+import json
+import time
+import socket
+import asyncio
+import argparse
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from model_registry import get_registry
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+
+class MicroBatcher:
+    """Coalesce concurrent predict requests for one engine into a single forward pass.
+
+    The first waiting request opens a batch; it closes when max_batch rows are collected or
+    max_delay_ms has passed, whichever comes first.
+    """
+
+    def __init__(self, engine, max_batch=64, max_delay_ms=2.0, executor=None):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.executor = executor
+        self.queue = asyncio.Queue()
+        self.requests = self.batches = self.rows = 0
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def predict(self, states):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((states, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            rows = len(pending[0][0])
+            deadline = loop.time() + self.max_delay
+            while rows < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                rows += len(item[0])
+
+            batch = np.concatenate([states for states, _ in pending])
+            try:
+                # Off the event loop so connections keep being accepted during the forward pass
+                q_values = await loop.run_in_executor(self.executor, self.engine.predict, batch)
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.requests += len(pending)
+            self.batches += 1
+            self.rows += len(batch)
+            offset = 0
+            for states, future in pending:
+                if not future.done():
+                    future.set_result(q_values[offset:offset + len(states)])
+                offset += len(states)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_rows": self.rows / self.batches if self.batches else 0.0,
+        }
+
+
+class InferenceServer:
+    """Localhost JSON-over-HTTP service hosting registered policies (TCP or Unix socket).
+
+    GET /health, GET /models, POST /predict/<name> with {"states": [[...], ...]}
+    -> {"q_values": [[...]], "actions": [...]}.
+    """
+
+    def __init__(self, learning_settings, max_batch=64, max_delay_ms=2.0):
+        self.learning_settings = learning_settings
+        self.max_batch = max_batch
+        self.max_delay_ms = max_delay_ms
+        self.models = {}
+        # One inference thread: torch already parallelizes inside each forward pass
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.server = None
+        self.started = time.time()
+
+    def register(self, name, path, input_dim=None):
+        registry = get_registry(self.learning_settings["model_cache_mb"])
+        meta = registry.metadata(path)
+        input_dim = input_dim or (meta.get("input_shape") or [5])[0]
+        engine = registry.get(
+            path, input_dim, backend=self.learning_settings["inference_backend"],
+            precision=self.learning_settings["inference_precision"],
+            num_threads=self.learning_settings["inference_threads"]
+        )
+        batcher = MicroBatcher(engine, self.max_batch, self.max_delay_ms, self.executor)
+        self.models[name] = {"path": path, "input_dim": input_dim, "batcher": batcher}
+        if self.server is not None:
+            batcher.start()
+        return batcher
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        for entry in self.models.values():
+            entry["batcher"].start()
+        if unix_path:
+            if os.path.exists(unix_path):
+                os.remove(unix_path)
+            self.server = await asyncio.start_unix_server(self._handle_connection, path=unix_path)
+        else:
+            self.server = await asyncio.start_server(self._handle_connection, host, port)
+        return self.server
+
+    async def serve_forever(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        server = await self.start(host, port, unix_path)
+        async with server:
+            await server.serve_forever()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        for entry in self.models.values():
+            await entry["batcher"].stop()
+        self.executor.shutdown(wait=False)
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, payload = await self._route(method, target, body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, target, body):
+        if method == "GET" and target == "/health":
+            return 200, {"status": "ok", "uptime_s": time.time() - self.started}
+        if method == "GET" and target == "/models":
+            return 200, {
+                name: {"path": entry["path"], "input_dim": entry["input_dim"], **entry["batcher"].stats()}
+                for name, entry in self.models.items()
+            }
+        if method == "POST" and target.startswith("/predict/"):
+            entry = self.models.get(target[len("/predict/"):])
+            if entry is None:
+                return 404, {"error": f"Unknown model: {target[len('/predict/'):]}"}
+            try:
+                states = np.asarray(json.loads(body)["states"], dtype=np.float32).reshape(-1, entry["input_dim"])
+            except (KeyError, ValueError, TypeError) as e:
+                return 400, {"error": f"Invalid states: {e}"}
+            try:
+                q_values = await entry["batcher"].predict(states)
+            except Exception as e:
+                return 500, {"error": str(e)}
+            return 200, {"q_values": q_values.tolist(), "actions": q_values.argmax(axis=1).tolist()}
+        return 404, {"error": f"No route for {method} {target}"}
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class InferenceClient:
+    """Blocking client over one keep-alive connection. Not thread-safe; use one per thread."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None, timeout=10):
+        if unix_path:
+            self.connection = _UnixHTTPConnection(unix_path, timeout=timeout)
+        else:
+            self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _request(self, method, path, payload=None):
+        body = json.dumps(payload) if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body else {}
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        data = json.loads(response.read())
+        if response.status != 200:
+            raise RuntimeError(f"Inference server error {response.status}: {data.get('error')}")
+        return data
+
+    def models(self):
+        return self._request("GET", "/models")
+
+    def predict(self, name, states):
+        states = np.asarray(states, dtype=np.float32)
+        states = states.reshape(1, -1) if states.ndim == 1 else states.reshape(len(states), -1)
+        data = self._request("POST", f"/predict/{name}", {"states": states.tolist()})
+        return np.asarray(data["q_values"], dtype=np.float32), np.asarray(data["actions"], dtype=np.int64)
+
+    def engine(self, name):
+        return RemoteEngine(self, name)
+
+    def close(self):
+        self.connection.close()
+
+
+class RemoteEngine:
+    """InferenceEngine stand-in backed by a served model, for backtests and paper traders."""
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.module = None
+
+    def predict(self, states):
+        return self.client.predict(self.name, states)[0]
+
+    def act(self, state):
+        q_values, actions = self.client.predict(self.name, state)
+        return int(actions[0]), q_values[0]
+
+
+def main():
+    from training import load_learning_settings
+
+    parser = argparse.ArgumentParser(description="Serve QNetwork policies on localhost with micro-batching.")
+    parser.add_argument("models", nargs="+", help="name=path.pt (or just path.pt, named after the file)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="Serve on a Unix socket instead of TCP")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-delay-ms", type=float, default=2.0, help="Latency budget for filling a batch")
+    args = parser.parse_args()
+
+    server = InferenceServer(load_learning_settings(), args.max_batch, args.max_delay_ms)
+    for spec in args.models:
+        name, _, path = spec.rpartition("=")
+        name = name or os.path.splitext(os.path.basename(path))[0]
+        server.register(name, path)
+        print(f"Registered '{name}' from {path}")
+    print(f"Serving on {args.unix or f'http://{args.host}:{args.port}'}")
+    try:
+        asyncio.run(server.serve_forever(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+import os
+import json
+import time
+import uuid
+import signal
+import socket
+import sqlite3
+import argparse
+import itertools
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from execution import process_alive
+
+DEFAULT_DB = "jobs.db"
+JOB_KINDS = ("train", "backtest", "sweep")
+JOB_STATES = ("queued", "running", "done", "failed", "cancelled")
+# A running job whose scheduler has not refreshed its heartbeat for this long is considered orphaned
+HEARTBEAT_TIMEOUT = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    cores INTEGER NOT NULL DEFAULT 1,
+    memory_mb INTEGER NOT NULL DEFAULT 1024,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_retries INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    parent INTEGER,
+    submitted_at REAL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT,
+    owner TEXT,
+    heartbeat REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, priority DESC, id);
+"""
+
+
+def total_memory_mb():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 2**20
+    except (AttributeError, ValueError, OSError):
+        return 4096
+
+
+def owner_alive(owner, heartbeat, now=None):
+    """Whether the scheduler that claimed a job still runs: a fresh heartbeat, and on this host a live pid."""
+    now = now or time.time()
+    if not owner or heartbeat is None or heartbeat < now - HEARTBEAT_TIMEOUT:
+        return False
+    host, pid, _ = owner.split(":", 2)
+    return host != socket.gethostname() or process_alive(pid)
+
+
+def _row(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+class JobQueue:
+    """Persistent job queue in SQLite. Every call opens its own connection, so the queue can be shared
+    between the scheduler thread, the GUI and the job processes themselves."""
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+            # Queues created before jobs were owned by a scheduler
+            columns = {row["name"] for row in db.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("owner", "TEXT"), ("heartbeat", "REAL")):
+                if column not in columns:
+                    db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def submit(self, kind, params=None, priority=0, cores=1, memory_mb=1024, max_retries=0, parent=None):
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind} (expected one of {', '.join(JOB_KINDS)})")
+        with self._connect() as db:
+            cursor = db.execute(
+                "INSERT INTO jobs (kind, params, priority, cores, memory_mb, max_retries, parent, submitted_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (kind, json.dumps(params or {}), int(priority), max(int(cores), 1), int(memory_mb),
+                 int(max_retries), parent, time.time())
+            )
+            return cursor.lastrowid
+
+    def get(self, job_id):
+        with self._connect() as db:
+            return _row(db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def list(self, status=None, limit=200):
+        query = "SELECT * FROM jobs"
+        args = ()
+        if status:
+            query += " WHERE status = ?"
+            args = (status,)
+        with self._connect() as db:
+            rows = db.execute(query + " ORDER BY id DESC LIMIT ?", args + (limit,)).fetchall()
+        return [_row(row) for row in rows]
+
+    def counts(self):
+        with self._connect() as db:
+            rows = db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def cancel(self, job_id):
+        """Cancel a queued job at once; a running job is flagged and stopped by its scheduler."""
+        with self._connect() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+            if cursor.rowcount:
+                return True
+            cursor = db.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+            return bool(cursor.rowcount)
+
+    def cancel_requests(self):
+        with self._connect() as db:
+            rows = db.execute("SELECT id FROM jobs WHERE status = 'running' AND cancel_requested = 1").fetchall()
+        return [row[0] for row in rows]
+
+    def claim(self, owner, free_cores, free_memory_mb, idle=False):
+        """Mark the highest-priority queued job that fits the free resources as running under owner and return it.
+
+        Lower-priority jobs may start ahead of one that does not fit yet. A job larger than the whole
+        pool only starts when the pool is idle.
+        """
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = db.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY priority DESC, id").fetchall()
+                for row in rows:
+                    if idle or (row["cores"] <= free_cores and row["memory_mb"] <= free_memory_mb):
+                        now = time.time()
+                        db.execute(
+                            "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, error = NULL, "
+                            "owner = ?, heartbeat = ? WHERE id = ?", (now, owner, now, row["id"])
+                        )
+                        db.execute("COMMIT")
+                        return dict(_row(row), owner=owner, heartbeat=now)
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        return None
+
+    # Outcomes are only recorded by the owner that claimed the job, so a job reclaimed from a
+    # scheduler presumed dead is not finished or requeued by that scheduler later
+
+    def finish(self, job_id, owner, result=None):
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = 'done', finished_at = ?, result = ? "
+                "WHERE id = ? AND status = 'running' AND owner = ?",
+                (time.time(), json.dumps(result, default=str), job_id, owner)
+            )
+
+    def fail(self, job_id, owner, error):
+        """Record a failure: cancelled if requested, queued again while retries remain, else failed."""
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET error = ?, finished_at = ?, status = CASE "
+                "WHEN cancel_requested THEN 'cancelled' "
+                "WHEN attempts <= max_retries THEN 'queued' "
+                "ELSE 'failed' END WHERE id = ? AND status = 'running' AND owner = ?",
+                (error, time.time(), job_id, owner)
+            )
+
+    def requeue(self, job_id, owner):
+        """Return an interrupted job to the queue without counting the attempt."""
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0) "
+                "WHERE id = ? AND status = 'running' AND owner = ?",
+                (job_id, owner)
+            )
+
+    def heartbeat(self, owner):
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET heartbeat = ? WHERE status = 'running' AND owner = ?", (time.time(), owner))
+
+    def recover(self):
+        """Requeue running jobs whose scheduler is gone (crashed, killed, or stopped without cleaning up)."""
+        now = time.time()
+        with self._connect() as db:
+            rows = db.execute("SELECT id, owner, heartbeat FROM jobs WHERE status = 'running'").fetchall()
+            orphaned = [(row["id"], row["owner"]) for row in rows if not owner_alive(row["owner"], row["heartbeat"], now)]
+            for job_id, owner in orphaned:
+                db.execute(
+                    "UPDATE jobs SET status = CASE WHEN cancel_requested THEN 'cancelled' ELSE 'queued' END, "
+                    "attempts = MAX(attempts - 1, 0) WHERE id = ? AND status = 'running' AND owner IS ?",
+                    (job_id, owner)
+                )
+        return [job_id for job_id, _ in orphaned]
+
+
+def _job_data(params):
+    from strategy import load_data
+    from training import load_learning_settings
+
+    settings = dict(load_learning_settings(), **params.get("settings", {}))
+    df, X, Y = load_data(
+        params.get("start", "2024-01-01"), params.get("end", "2025-01-01"), normalization=settings["normalization"],
+        symbol=params.get("symbol", "LTC"), timeframe=settings["timeframe"]
+    )
+    return settings, df, X, Y
+
+
+def run_train(job, queue):
+    from execution import CancellationToken, null_emit
+    from training import training_worker
+
+    params = job["params"]
+    settings, df, X, Y = _job_data(params)
+    summary = training_worker(
+        CancellationToken(), null_emit, params.get("count", 10), 0, df, X, Y,
+        params.get("initial_cash", 1000), params.get("risk_level", "Medium Risk"), settings,
+        max_episodes=params.get("episodes"), model_path=params.get("model_path", f"dqn_model_job{job['id']}.pt")
+    )
+    summary.pop("agent")
+    return summary
+
+
+def run_backtest(job, queue):
+    from execution import CancellationToken, null_emit
+    from model_loader import backtest_worker
+
+    params = job["params"]
+    settings, df, X, Y = _job_data(params)
+    return backtest_worker(
+        CancellationToken(), null_emit, params["model_path"], df, X, Y, params.get("initial_cash", 1000),
+        params.get("risk_level", "Medium Risk"), params.get("folder_name", f"test_job{job['id']}"), settings
+    )
+
+
+def run_sweep(job, queue):
+    """Expand {"grid": {setting: [values]}, "base": {train params}} into one queued train job per combination."""
+    params = job["params"]
+    base = params.get("base", {})
+    grid = params.get("grid", {})
+    names = list(grid)
+    children = []
+    for i, values in enumerate(itertools.product(*(grid[name] for name in names))):
+        overrides = dict(zip(names, values))
+        child = dict(base, settings=dict(base.get("settings", {}), **overrides))
+        child.setdefault("model_path", f"dqn_model_job{job['id']}_{i}.pt")
+        children.append(queue.submit(
+            "train", child, priority=job["priority"], cores=job["cores"], memory_mb=job["memory_mb"],
+            max_retries=job["max_retries"], parent=job["id"]
+        ))
+    return {"jobs": children}
+
+
+RUNNERS = {"train": run_train, "backtest": run_backtest, "sweep": run_sweep}
+
+
+def _terminated(signum, frame):
+    raise SystemExit(128 + signum)
+
+
+def _execute(db_path, job):
+    # Cancellation terminates the process; exiting through SystemExit lets the run registry record it
+    signal.signal(signal.SIGTERM, _terminated)
+    # Runs in a fresh process: cap the math libraries at the job's cores before torch is imported
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[name] = str(job["cores"])
+    queue = JobQueue(db_path)
+    try:
+        result = RUNNERS[job["kind"]](job, queue)
+    except Exception as e:
+        queue.fail(job["id"], job["owner"], f"{type(e).__name__}: {e}")
+        raise SystemExit(1)
+    queue.finish(job["id"], job["owner"], result)
+
+
+class Scheduler:
+    """Runs queued jobs in separate processes while their declared cores and memory fit the limits.
+
+    Cancelling a running job terminates its process. Jobs still running when the scheduler stops are
+    returned to the queue. Several schedulers may share one queue: each claims jobs under its own owner
+    id and keeps their heartbeat fresh, and only jobs of schedulers that have died are reclaimed.
+    """
+
+    def __init__(self, queue, cores=None, memory_mb=None, poll=1.0):
+        self.queue = queue
+        self.cores = cores or os.cpu_count() or 1
+        self.memory_mb = memory_mb or int(total_memory_mb() * 0.8)
+        self.poll = poll
+        self.running = {}
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = threading.Event()
+
+    def free(self):
+        jobs = [job for _, job in self.running.values()]
+        return self.cores - sum(job["cores"] for job in jobs), self.memory_mb - sum(job["memory_mb"] for job in jobs)
+
+    def _reap(self):
+        for job_id, (process, job) in list(self.running.items()):
+            if process.exitcode is None:
+                continue
+            process.join()
+            # A job that was killed or crashed never recorded its outcome
+            self.queue.fail(job_id, self.owner, f"Process exited with code {process.exitcode}")
+            del self.running[job_id]
+
+    def step(self):
+        self._reap()
+        self.queue.heartbeat(self.owner)
+        self.queue.recover()
+        for job_id in self.queue.cancel_requests():
+            if job_id in self.running:
+                self.running[job_id][0].terminate()
+        while True:
+            job = self.queue.claim(self.owner, *self.free(), idle=not self.running)
+            if job is None:
+                break
+            process = self._context.Process(target=_execute, args=(self.queue.path, job), name=f"job-{job['id']}")
+            process.start()
+            self.running[job["id"]] = (process, job)
+
+    def run(self, until_idle=False):
+        from run_registry import RunRegistry
+
+        # Runs left open by job processes that were killed outright
+        RunRegistry().recover()
+        self._stop.clear()
+        try:
+            while not self._stop.is_set():
+                self.step()
+                if until_idle and not self.running and not self.queue.counts().get("queued"):
+                    break
+                self._stop.wait(self.poll)
+        finally:
+            for job_id, (process, _) in self.running.items():
+                process.terminate()
+                process.join()
+                self.queue.requeue(job_id, self.owner)
+            self.running.clear()
+
+    def start(self):
+        """Run in a background thread (as the GUI does)."""
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Persistent queue of training, backtest and sweep jobs.")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="Queue a job")
+    submit.add_argument("kind", choices=JOB_KINDS)
+    submit.add_argument("--params", default="{}", help="Job parameters as JSON")
+    submit.add_argument("--priority", type=int, default=0)
+    submit.add_argument("--cores", type=int, default=1)
+    submit.add_argument("--memory", type=int, default=1024, help="Memory reservation in MB")
+    submit.add_argument("--retries", type=int, default=0)
+
+    listing = commands.add_parser("list", help="Show jobs")
+    listing.add_argument("--status", choices=JOB_STATES)
+
+    cancel = commands.add_parser("cancel", help="Cancel a queued or running job")
+    cancel.add_argument("job_id", type=int)
+
+    run = commands.add_parser("run", help="Run the scheduler")
+    run.add_argument("--cores", type=int, help="Cores to use (default: all)")
+    run.add_argument("--memory", type=int, help="Memory limit in MB (default: 80%% of RAM)")
+    run.add_argument("--until-idle", action="store_true", help="Exit once the queue is empty")
+    args = parser.parse_args()
+
+    queue = JobQueue(args.db)
+    if args.command == "submit":
+        job_id = queue.submit(args.kind, json.loads(args.params), args.priority, args.cores, args.memory, args.retries)
+        print(f"Queued job {job_id}.")
+    elif args.command == "list":
+        for job in queue.list(args.status):
+            print(f"{job['id']:>5}  {job['kind']:<8} {job['status']:<9} priority={job['priority']} "
+                  f"cores={job['cores']} memory={job['memory_mb']}MB attempts={job['attempts']} {job['error'] or ''}")
+    elif args.command == "cancel":
+        print("Cancelled." if queue.cancel(args.job_id) else "Job is not queued or running.")
+    else:
+        scheduler = Scheduler(queue, args.cores, args.memory)
+        print(f"Scheduling on {scheduler.cores} cores and {scheduler.memory_mb} MB.")
+        try:
+            scheduler.run(until_idle=args.until_idle)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
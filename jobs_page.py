@@ -0,0 +1,147 @@
+import flet as ft
+import json
+import asyncio
+from jobs import JOB_KINDS, JobQueue, Scheduler
+
+STATUS_COLORS = {
+    "queued": ft.Colors.GREY,
+    "running": ft.Colors.BLUE,
+    "done": ft.Colors.GREEN,
+    "failed": ft.Colors.RED,
+    "cancelled": ft.Colors.ORANGE,
+}
+
+def default_params(page, kind):
+    controls = page.controls_dict
+    params = {
+        "initial_cash": float(controls["initial_cash_field"].value or 1000),
+        "risk_level": controls["risk_dropdown"].value,
+    }
+    if kind == "train":
+        params["count"] = int(controls["count_field"].value or 10)
+    elif kind == "backtest":
+        params["model_path"] = "dqn_model_final.pt"
+    else:
+        params = {"base": dict(params, count=int(controls["count_field"].value or 10)),
+                  "grid": {"learning_rate": [0.001, 0.0005], "gamma": [0.95, 0.99]}}
+    return json.dumps(params, indent=2)
+
+def create_jobs_page(page):
+    queue = JobQueue()
+    log_text = page.controls_dict["log_text"]
+
+    kind_dropdown = ft.Dropdown(
+        label="Job Type", width=150, value="train",
+        options=[ft.dropdown.Option(kind) for kind in JOB_KINDS]
+    )
+    params_field = ft.TextField(
+        label="Parameters (JSON)", value=default_params(page, "train"),
+        multiline=True, min_lines=4, max_lines=8, width=400
+    )
+    priority_field = ft.TextField(label="Priority", value="0", width=100)
+    cores_field = ft.TextField(label="Cores", value="1", width=100)
+    memory_field = ft.TextField(label="Memory (MB)", value="1024", width=120)
+    retries_field = ft.TextField(label="Retries", value="0", width=100)
+    summary_text = ft.Text()
+    jobs_table = ft.DataTable(columns=[
+        ft.DataColumn(ft.Text(name)) for name in ("ID", "Type", "Status", "Priority", "Cores", "Memory", "Attempts", "Error", "")
+    ])
+
+    def scheduler_label():
+        return "Stop Scheduler" if getattr(page, "job_scheduler", None) else "Start Scheduler"
+
+    def refresh():
+        counts = queue.counts()
+        summary_text.value = ", ".join(f"{status}: {n}" for status, n in sorted(counts.items())) or "No jobs yet."
+        jobs_table.rows = [
+            ft.DataRow(cells=[
+                ft.DataCell(ft.Text(str(job["id"]))),
+                ft.DataCell(ft.Text(job["kind"])),
+                ft.DataCell(ft.Text(job["status"], color=STATUS_COLORS[job["status"]])),
+                ft.DataCell(ft.Text(str(job["priority"]))),
+                ft.DataCell(ft.Text(str(job["cores"]))),
+                ft.DataCell(ft.Text(f"{job['memory_mb']} MB")),
+                ft.DataCell(ft.Text(str(job["attempts"]))),
+                ft.DataCell(ft.Text((job["error"] or "")[:60])),
+                ft.DataCell(ft.TextButton(
+                    "Cancel", disabled=job["status"] not in ("queued", "running"),
+                    on_click=lambda e, job_id=job["id"]: cancel_job(job_id)
+                )),
+            ])
+            for job in queue.list(limit=100)
+        ]
+        page.update()
+
+    def cancel_job(job_id):
+        if queue.cancel(job_id):
+            log_text.value += f"Cancel requested for job {job_id}.\n"
+        refresh()
+
+    def change_kind(e):
+        params_field.value = default_params(page, kind_dropdown.value)
+        params_field.update()
+
+    def submit_job(e):
+        try:
+            job_id = queue.submit(
+                kind_dropdown.value, json.loads(params_field.value or "{}"), int(priority_field.value or 0),
+                int(cores_field.value or 1), int(memory_field.value or 1024), int(retries_field.value or 0)
+            )
+            log_text.value += f"Queued {kind_dropdown.value} job {job_id}.\n"
+        except ValueError as ve:
+            log_text.value += f"Invalid job: {ve}\n"
+        refresh()
+
+    async def toggle_scheduler(e):
+        # The scheduler outlives this view, so jobs keep running after returning to the main page
+        scheduler = getattr(page, "job_scheduler", None)
+        if scheduler is None:
+            page.job_scheduler = Scheduler(queue)
+            page.job_scheduler_thread = page.job_scheduler.start()
+            log_text.value += f"Job scheduler started on {page.job_scheduler.cores} cores.\n"
+        else:
+            # Wait until the old scheduler has returned its jobs, so a new one never claims them twice
+            scheduler_btn.disabled = True
+            scheduler_btn.text = "Stopping..."
+            page.update()
+            scheduler.stop()
+            await asyncio.to_thread(page.job_scheduler_thread.join)
+            page.job_scheduler = None
+            page.job_scheduler_thread = None
+            scheduler_btn.disabled = False
+            log_text.value += "Job scheduler stopped; running jobs were returned to the queue.\n"
+        scheduler_btn.text = scheduler_label()
+        await asyncio.to_thread(refresh)
+
+    def close_jobs(e):
+        view.data = False
+        page.views.pop()
+        page.update()
+
+    async def poll():
+        while view.data:
+            await asyncio.to_thread(refresh)
+            await asyncio.sleep(2)
+
+    kind_dropdown.on_change = change_kind
+    submit_btn = ft.ElevatedButton("Submit Job", width=120, on_click=submit_job)
+    scheduler_btn = ft.ElevatedButton(scheduler_label(), width=150, on_click=toggle_scheduler)
+    back_btn = ft.ElevatedButton("<", width=150, on_click=close_jobs)
+
+    view = ft.View(
+        route="/jobs",
+        controls=[
+            ft.AppBar(title=ft.Text("Job Queue"), leading=back_btn, bgcolor=ft.Colors.BLUE_200,),
+            ft.Column([
+                ft.Row([kind_dropdown, priority_field, cores_field, memory_field, retries_field]),
+                ft.Row([params_field]),
+                ft.Row([submit_btn, scheduler_btn]),
+                summary_text,
+                jobs_table,
+            ], scroll="auto", expand=True),
+        ],
+        padding=20,
+        data=True
+    )
+    page.run_task(poll)
+    return view
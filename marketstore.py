@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+from datastore import FEATURE_COLUMNS, read_candles, row_range, symbol_source
+from timeframes import NATIVE, frame_period, resample_frame
+
+ALIGNMENT = 64
+
+
+def _attach_segment(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before 3.13 attaching registers the segment with this process's resource tracker,
+        # which would unlink it when the attaching process exits
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+class MarketStore:
+    """Candles for many symbols as a time index plus float32 columns, packed into one shared memory segment.
+
+    The publishing process owns the segment; workers attach() to its handle and read the same pages.
+    """
+
+    def __init__(self, shm, layout, columns, owner=False):
+        self.shm = shm
+        self.layout = layout
+        self.columns = list(columns)
+        self.owner = owner
+        self.arrays = {}
+        for symbol, entry in layout.items():
+            rows = entry["rows"]
+            times = np.ndarray((rows,), dtype=np.int64, buffer=shm.buf, offset=entry["times"])
+            values = np.ndarray((rows, len(self.columns)), dtype=np.float32, buffer=shm.buf, offset=entry["values"])
+            self.arrays[symbol] = (times, values)
+
+    @classmethod
+    def publish(cls, frames, columns=None):
+        """Copy {symbol: frame indexed by timeClose} into a new shared memory segment."""
+        columns = list(columns or FEATURE_COLUMNS)
+        layout, offset = {}, 0
+        for symbol, df in frames.items():
+            rows = len(df)
+            # The resolution actually stored, so workers never have to trust a configured timeframe
+            layout[symbol] = {"rows": rows, "times": offset, "values": offset + rows * 8, "period_ms": frame_period(df)}
+            offset += rows * 8 + rows * len(columns) * 4
+            offset = (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+        shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        store = cls(shm, layout, columns, owner=True)
+        for symbol, df in frames.items():
+            times, values = store.arrays[symbol]
+            times[:] = df.index.values.astype("datetime64[ms]").astype(np.int64)
+            values[:] = df[columns].values
+        return store
+
+    @classmethod
+    def load(cls, symbols, columns=None, timeframe=NATIVE):
+        frames = {symbol: resample_frame(read_candles(symbol_source(symbol)), timeframe, symbol) for symbol in symbols}
+        return cls.publish(frames, columns)
+
+    @classmethod
+    def attach(cls, handle):
+        return cls(_attach_segment(handle["name"]), handle["layout"], handle["columns"])
+
+    @property
+    def handle(self):
+        """Picklable description of the segment to pass to worker processes."""
+        return {"name": self.shm.name, "layout": self.layout, "columns": self.columns}
+
+    @property
+    def symbols(self):
+        return list(self.layout)
+
+    @property
+    def nbytes(self):
+        return self.shm.size
+
+    def period_ms(self, symbol):
+        return self.layout[symbol]["period_ms"]
+
+    def arrays_for(self, symbol, start_date=None, end_date=None):
+        """Zero-copy (times, values) views for a symbol, optionally limited to a date range."""
+        times, values = self.arrays[symbol]
+        lo, hi = row_range(times, start_date, end_date)
+        return times[lo:hi], values[lo:hi]
+
+    def frame(self, symbol, start_date=None, end_date=None):
+        """(df, X, Y) for one symbol in the shape load_data() returns. df wraps the shared pages."""
+        times, values = self.arrays_for(symbol, start_date, end_date)
+        index = pd.DatetimeIndex(times.astype("datetime64[ms]"), name="timeClose")
+        df = pd.DataFrame(values, index=index, columns=self.columns, copy=False)
+        mean, std = values.mean(0), values.std(0) + 1e-5
+        X = pd.DataFrame((values - mean) / std, index=index, columns=self.columns)
+        Y = df[["priceClose"]].rename(columns={"priceClose": symbol})
+        return df, X, Y
+
+    def close(self):
+        self.arrays = {}
+        try:
+            self.shm.close()
+        except BufferError:
+            # Frames handed out still view the pages; the mapping goes away with them
+            pass
+
+    def unlink(self):
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        self.unlink()
+        return False
@@ -1,27 +1,93 @@
 import torch
 import numpy as np
-import matplotlib.pyplot as plt
 import os
-import time
+from concurrent.futures import ProcessPoolExecutor
 from Q import QNetwork, DISCRETE_ACTIONS, NUM_ACTIONS
 from tradingenv.env import TradingEnvXY
-from strategy import money_management, calculate_success_percentage, calculate_financial_success
+from strategy import money_management, calculate_success_percentage, calculate_financial_success, build_features, uses_feature_pipeline
+from recorder import TrajectoryRecorder, load_trajectory, run_folder_name
+from model_registry import get_registry
+from ensemble import EnsembleEngine
+from training import load_learning_settings
+from artifacts import get_pipeline
+from execution import BackgroundTask, CancellationToken, LogChannel, null_emit
+from marketstore import MarketStore
+from run_registry import RunRegistry
+from timeframes import TIMEFRAMES, frame_period, timeframe_name
+from components import append_text
 import flet as ft
 
 ACTION_NAMES = {0: "Hold", 1: "Buy", 2: "Sell"}
 
-def load_and_test_model(model_path, log_text, metrics, chart_all, chart_dynamic, chart_pred, ax_all, ax_dynamic, ax_pred, lessons_text, ai_notes_text, df, X, Y, initial_cash, risk_level):
+def model_feature_settings(model_meta, learning_settings):
+    """The state layout a model was trained with, falling back to the current settings for older checkpoints."""
+    return {
+        key: model_meta.get(key, learning_settings[key]) for key in ("feature_window", "indicators", "compact_replay")
+    }
+
+def backtest_worker(token, emit, model_path, df, X, Y, initial_cash, risk_level, folder_name, learning_settings=None):
+    learning_settings = learning_settings or load_learning_settings()
+    if not learning_settings["run_registry"]:
+        return _backtest_worker(token, emit, model_path, df, X, Y, initial_cash, risk_level, folder_name, learning_settings)
+    model_paths = [model_path] if isinstance(model_path, str) else list(model_path)
+    model_meta = get_registry(learning_settings["model_cache_mb"]).metadata(model_paths[0])
+    runs = RunRegistry()
+    run_id = runs.start_run(
+        "backtest", dict(learning_settings, **model_feature_settings(model_meta, learning_settings)),
+        df, Y.columns[0], model_paths[0]
+    )
     try:
-        initial_cash = float(initial_cash)
-    except ValueError:
-        initial_cash = 1000
-        log_text.value += "Invalid portfolio amount. Using default (1000).\n"
-        log_text.update()
+        summary = _backtest_worker(token, emit, model_path, df, X, Y, initial_cash, risk_level, folder_name, learning_settings)
+    except BaseException as e:
+        status = "cancelled" if isinstance(e, (SystemExit, KeyboardInterrupt)) else "failed"
+        runs.finish_run(run_id, status, {"error": f"{type(e).__name__}: {e}"})
+        raise
+    for path in model_paths:
+        runs.add_checkpoint(run_id, path)
+    runs.add_artifact(run_id, summary["trajectory"], "trajectory")
+    runs.finish_run(run_id, "cancelled" if token.cancelled else "done", summary)
+    return summary
 
+def _backtest_worker(token, emit, model_path, df, X, Y, initial_cash, risk_level, folder_name, learning_settings):
+    log_text = LogChannel(emit)
+
+    # Several checkpoints are traded as one ensemble policy; they must share a state layout
+    model_paths = [model_path] if isinstance(model_path, str) else list(model_path)
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    model = QNetwork(input_shape=(X.shape[1],), action_space=NUM_ACTIONS).to(device)
-    model.load_state_dict(torch.load(model_path, map_location=device))
-    model.eval()
+    registry = get_registry(learning_settings["model_cache_mb"])
+    model_meta = registry.metadata(model_paths[0])
+
+    # A policy trained on one candle size is meaningless on another
+    trained_period = model_meta.get("period_ms") or TIMEFRAMES.get(model_meta.get("timeframe"))
+    period = frame_period(df)
+    if trained_period and period and trained_period != period:
+        raise ValueError(
+            f"Model was trained on {timeframe_name(trained_period)} candles ({trained_period} ms) "
+            f"but the test data has {timeframe_name(period)} candles ({period} ms)."
+        )
+
+    # Rebuild the same state layout the model was trained with
+    feature_settings = model_feature_settings(model_meta, learning_settings)
+    features = None
+    if uses_feature_pipeline(feature_settings):
+        features = build_features(df, X, feature_settings["feature_window"], feature_settings["indicators"])
+
+    input_dim = features.state_dim if features is not None else X.shape[1]
+    if len(model_paths) > 1:
+        engine = EnsembleEngine.from_paths(
+            model_paths, input_dim, NUM_ACTIONS, device, policy=learning_settings["ensemble_policy"]
+        )
+        log_text.value += f"Testing an ensemble of {len(model_paths)} models ({learning_settings['ensemble_policy']}).\n"
+        log_text.update()
+    else:
+        engine = registry.get(
+            model_paths[0], input_dim, backend=learning_settings["inference_backend"],
+            precision=learning_settings["inference_precision"], action_space=NUM_ACTIONS,
+            device=device, num_threads=learning_settings["inference_threads"]
+        )
+    if model_meta.get("data_range"):
+        log_text.value += f"Model trained on {model_meta['data_range'][0]} to {model_meta['data_range'][1]} ({model_meta.get('rows', '?')} rows).\n"
+        log_text.update()
 
     env = TradingEnvXY(X=X, Y=Y, transformer="z-score", reward="logret", cash=initial_cash,
                        spread=0.0001, markup=0.002, fee=0.0001, fixed=0.01)
@@ -30,42 +96,37 @@ def load_and_test_model(model_path, log_text, metrics, chart_all, chart_dynamic,
     current_assets = 0
     buys = sells = holds = 0
     successful_trades = failed_trades = 0
-    x_prog = []
-    y_prog = []
-    actual_prices = []
+    recorder = TrajectoryRecorder(os.path.join(folder_name, "trajectory"), num_actions=NUM_ACTIONS)
+    predicted_line = np.full(len(df), np.nan, dtype=np.float32)
     prev_portfolio = initial_cash
     step = 0
     state = env.reset()
     state = np.reshape(state, (1, *X.shape[1:]))
+    # The env starts past the first row; FeatureSet states follow the row it is observing
+    row = X.index.get_loc(env.now())
+    if features is not None:
+        state = features.state(row)
     done = False
     seen_notes = set()
     seen_lessons = set()
     hold_streak = 0
-    financial_successes = []
-
-    # Initialize charts
-    ax_all.clear()
-    ax_all.plot(df.index, df["priceClose"], color="gray", label="Actual Price")
-    ax_all.set_title("Actual Price")
-    ax_all.legend()
-    chart_all.update()
-
-    ax_dynamic.clear()
-    ax_dynamic.set_title("Dynamic Predicted vs Actual Price")
-    ax_dynamic.set_xlabel("Steps")
-    ax_dynamic.set_ylabel("Price")
-    ax_dynamic.grid(True)
-    chart_dynamic.update()
+    financial_success_sum = 0.0
+    profit = success_pct = 0.0
 
-    ax_pred.clear()
-    ax_pred.set_title("Predicted Price (Full Timeline)")
-    chart_pred.update()
+    def add_lesson(lesson):
+        if lesson not in seen_lessons:
+            seen_lessons.add(lesson)
+            emit("lesson", f"{lesson}\n")
+            return True
+        return False
 
     while not done:
-        state_tensor = torch.FloatTensor(state).to(device)
-        with torch.no_grad():
-            q_values = model(state_tensor).cpu().numpy()[0]
-        idx = np.argmax(q_values)
+        if not token.wait_if_paused():
+            log_text.value += f"Test stopped at step {step}.\n"
+            log_text.update()
+            break
+
+        idx, q_values = engine.act(state)
         if idx == 2 and current_assets <= 0:
             idx = 0  # Fallback to Hold
         act = DISCRETE_ACTIONS[idx]
@@ -85,27 +146,13 @@ def load_and_test_model(model_path, log_text, metrics, chart_all, chart_dynamic,
             if predicted_price > current_price:
                 r += 0.1
             else:
-                lesson = f"Step {step}: Buy action predicted price increase ({predicted_price:.2f}) but actual price was {current_price:.2f}. Reason: Incorrect price prediction."
-                if lesson not in seen_lessons:
-                    seen_lessons.add(lesson)
-                    lessons_text.value += f"{lesson}\n"
-                    lines = lessons_text.value.split("\n")
-                    if len(lines) > 100:
-                        lessons_text.value = "\n".join(lines[-100:])
-                    lessons_text.update()
+                add_lesson(f"Step {step}: Buy action predicted price increase ({predicted_price:.2f}) but actual price was {current_price:.2f}. Reason: Incorrect price prediction.")
         elif idx == 2:
             predicted_price *= 0.99
             if predicted_price < current_price:
                 r += 0.1
             else:
-                lesson = f"Step {step}: Sell action predicted price decrease ({predicted_price:.2f}) but actual price was {current_price:.2f}. Reason: Incorrect price prediction."
-                if lesson not in seen_lessons:
-                    seen_lessons.add(lesson)
-                    lessons_text.value += f"{lesson}\n"
-                    lines = lessons_text.value.split("\n")
-                    if len(lines) > 100:
-                        lessons_text.value = "\n".join(lines[-100:])
-                    lessons_text.update()
+                add_lesson(f"Step {step}: Sell action predicted price decrease ({predicted_price:.2f}) but actual price was {current_price:.2f}. Reason: Incorrect price prediction.")
 
         mm_reward, mm_done, trade_amount, units_traded = money_management(
             initial_cash, idx, risk_level, current_price, portfolio, current_assets, log_text
@@ -113,13 +160,7 @@ def load_and_test_model(model_path, log_text, metrics, chart_all, chart_dynamic,
         r += mm_reward
         if mm_done:
             lesson = f"Test Failed: Portfolio depleted at step {step}. Reason: Portfolio reached zero due to excessive losses."
-            if lesson not in seen_lessons:
-                seen_lessons.add(lesson)
-                lessons_text.value += f"{lesson}\n"
-                lines = lessons_text.value.split("\n")
-                if len(lines) > 100:
-                    lessons_text.value = "\n".join(lines[-100:])
-                lessons_text.update()
+            if add_lesson(lesson):
                 log_text.value += f"{lesson}\n"
                 log_text.update()
             break
@@ -137,72 +178,42 @@ def load_and_test_model(model_path, log_text, metrics, chart_all, chart_dynamic,
             profit_delta = portfolio - prev_portfolio
             if profit_delta > 0:
                 successful_trades += 1
-                lesson = f"Step {step}: Successful trade ({ACTION_NAMES[idx]}), Profit={profit_delta:.2f}. Reason: Correct price movement prediction."
-                if lesson not in seen_lessons:
-                    seen_lessons.add(lesson)
-                    lessons_text.value += f"{lesson}\n"
-                    lines = lessons_text.value.split("\n")
-                    if len(lines) > 100:
-                        lessons_text.value = "\n".join(lines[-100:])
-                    lessons_text.update()
+                add_lesson(f"Step {step}: Successful trade ({ACTION_NAMES[idx]}), Profit={profit_delta:.2f}. Reason: Correct price movement prediction.")
             else:
                 failed_trades += 1
-                lesson = f"Step {step}: Failed trade ({ACTION_NAMES[idx]}), Loss={profit_delta:.2f}. Reason: Incorrect price movement or high transaction costs."
-                if lesson not in seen_lessons:
-                    seen_lessons.add(lesson)
-                    lessons_text.value += f"{lesson}\n"
-                    lines = lessons_text.value.split("\n")
-                    if len(lines) > 100:
-                        lessons_text.value = "\n".join(lines[-100:])
-                    lessons_text.update()
+                add_lesson(f"Step {step}: Failed trade ({ACTION_NAMES[idx]}), Loss={profit_delta:.2f}. Reason: Incorrect price movement or high transaction costs.")
 
         if idx == 0:
             hold_streak += 1
             if hold_streak >= 20 and abs(portfolio - initial_cash) > initial_cash * 0.1:
-                lesson = f"Step {step}: Long hold streak (20+ steps). Suggestion: Consider trading to capitalize on market movements."
-                if lesson not in seen_lessons:
-                    seen_lessons.add(lesson)
-                    lessons_text.value += f"{lesson}\n"
-                    lines = lessons_text.value.split("\n")
-                    if len(lines) > 100:
-                        lessons_text.value = "\n".join(lines[-100:])
-                    lessons_text.update()
+                add_lesson(f"Step {step}: Long hold streak (20+ steps). Suggestion: Consider trading to capitalize on market movements.")
                 hold_streak = 0
         else:
             hold_streak = 0
 
         if r < -10:
-            lesson = f"Step {step}: Large negative reward ({r:.3f}) for {ACTION_NAMES[idx]}. Suggestion: Adjust strategy to avoid high-risk trades."
-            if lesson not in seen_lessons:
-                seen_lessons.add(lesson)
-                lessons_text.value += f"{lesson}\n"
-                lines = lessons_text.value.split("\n")
-                if len(lines) > 100:
-                    lessons_text.value = "\n".join(lines[-100:])
-                lessons_text.update()
+            add_lesson(f"Step {step}: Large negative reward ({r:.3f}) for {ACTION_NAMES[idx]}. Suggestion: Adjust strategy to avoid high-risk trades.")
 
         if abs(r) > 0.5 or trade_amount > 0:
             max_q = np.max(q_values)
             note = f"Step {step}: Action={ACTION_NAMES[idx]}, Reward={r:.3f}, Profit={(portfolio - initial_cash):.2f}, Max Q={max_q:.3f}"
             if note not in seen_notes:
                 seen_notes.add(note)
-                ai_notes_text.value += f"{note}\n"
-                lines = ai_notes_text.value.split("\n")
-                if len(lines) > 500:
-                    ai_notes_text.value = "\n".join(lines[-500:])
-                ai_notes_text.update()
+                emit("note", f"{note}\n")
 
-        x_prog.append(step)
-        y_prog.append(predicted_price)
-        actual_prices.append(current_price)
+        recorder.record(
+            step=step, episode=0, action=idx, price=current_price, predicted_price=predicted_price,
+            portfolio=portfolio, assets=current_assets, reward=r, q_values=q_values
+        )
+        predicted_line[min(step, len(df) - 1)] = predicted_price
 
         success_pct = calculate_success_percentage(portfolio, initial_cash, df)
         profit = portfolio - initial_cash
         financial_success = calculate_financial_success(portfolio, initial_cash, df)
-        financial_successes.append(financial_success)
-        avg_financial_success = sum(financial_successes) / len(financial_successes) if financial_successes else 0
+        financial_success_sum += financial_success
+        avg_financial_success = financial_success_sum / (step + 1)
 
-        metrics_values = {
+        emit("metrics", {
             "Buys": str(buys),
             "Sells": str(sells),
             "Hold": str(holds),
@@ -216,24 +227,117 @@ def load_and_test_model(model_path, log_text, metrics, chart_all, chart_dynamic,
             "Epsilon": "0.000",
             "Successful Trades": str(successful_trades),
             "Failed Trades": str(failed_trades)
-        }
-        
-        log_message = (f"Step {step}: Portfolio={portfolio:.2f}, Assets={current_assets:.4f}, "
-                       f"Reward={r:.4f}, Action={ACTION_NAMES[idx]}, TradeAmount={trade_amount:.2f}, "
-                       f"UnitsTraded={units_traded:.4f}, Predicted Price={predicted_price:.2f}, "
-                       f"Actual Price={current_price:.2f}")
-        log_text.value += f"{log_message}\n"
-        lines = log_text.value.split("\n")
-        if len(lines) > 1000:
-            log_text.value = "\n".join(lines[-1000:])
+        })
+
+        log_text.value += (f"Step {step}: Portfolio={portfolio:.2f}, Assets={current_assets:.4f}, "
+                           f"Reward={r:.4f}, Action={ACTION_NAMES[idx]}, TradeAmount={trade_amount:.2f}, "
+                           f"UnitsTraded={units_traded:.4f}, Predicted Price={predicted_price:.2f}, "
+                           f"Actual Price={current_price:.2f}\n")
         log_text.update()
 
-        
-        
         if step % 10 == 0:
+            emit("chart", {"step": step, "predicted_line": predicted_line.copy()})
+
+        state = features.state(row + step + 1) if features is not None else np.reshape(nxt, (1, *X.shape[1:]))
+        prev_portfolio = portfolio
+        step += 1
+        if idx == 0:
+            holds += 1
+        elif idx == 1 and trade_amount > 0:
+            buys += 1
+        elif idx == 2 and trade_amount > 0:
+            sells += 1
+
+    recorder.close()
+    log_text.value += f"Test Result: Profit={profit:.2f}, Success={success_pct:.1f}%, Buys={buys}, Sells={sells}, Holds={holds}\n"
+    log_text.update()
+    return {
+        "profit": profit,
+        "success": success_pct,
+        "portfolio": portfolio,
+        "buys": buys,
+        "sells": sells,
+        "holds": holds,
+        "successful_trades": successful_trades,
+        "failed_trades": failed_trades,
+        "steps": step,
+        "trajectory": recorder.folder,
+    }
+
+def _backtest_symbol(handle, symbol, model_path, initial_cash, risk_level, folder_name, learning_settings, start_date, end_date):
+    market = MarketStore.attach(handle)
+    try:
+        df, X, Y = market.frame(symbol, start_date, end_date)
+        return backtest_worker(
+            CancellationToken(), null_emit, model_path.format(symbol=symbol), df, X, Y,
+            initial_cash, risk_level, os.path.join(folder_name, run_folder_name(symbol)), learning_settings
+        )
+    finally:
+        market.close()
+
+def backtest_symbols(market, symbols, model_path="dqn_model_{symbol}.pt", initial_cash=1000, risk_level="Medium Risk",
+                     folder_name=None, learning_settings=None, start_date=None, end_date=None, max_workers=None):
+    """Backtest each symbol in a worker process attached to the shared market store.
+
+    model_path may contain {symbol} to test a per-symbol model, or name one model for the whole basket.
+    """
+    learning_settings = learning_settings or load_learning_settings()
+    folder_name = folder_name or run_folder_name("test_basket")
+    with ProcessPoolExecutor(max_workers=max_workers or min(len(symbols), os.cpu_count() or 1)) as executor:
+        futures = {
+            symbol: executor.submit(
+                _backtest_symbol, market.handle, symbol, model_path, float(initial_cash), risk_level,
+                folder_name, learning_settings, start_date, end_date
+            )
+            for symbol in symbols
+        }
+        return {symbol: future.result() for symbol, future in futures.items()}
+
+async def load_and_test_model(model_path, log_text, metrics, chart_all, chart_dynamic, chart_pred, ax_all, ax_dynamic, ax_pred, lessons_text, ai_notes_text, df, X, Y, initial_cash, risk_level, token=None):
+    try:
+        initial_cash = float(initial_cash)
+    except ValueError:
+        initial_cash = 1000
+        log_text.value += "Invalid portfolio amount. Using default (1000).\n"
+        log_text.update()
+
+    # Initialize charts
+    ax_all.clear()
+    ax_all.plot(df.index, df["priceClose"], color="gray", label="Actual Price")
+    ax_all.set_title("Actual Price")
+    ax_all.legend()
+    chart_all.update()
+
+    ax_dynamic.clear()
+    ax_dynamic.set_title("Dynamic Predicted vs Actual Price")
+    ax_dynamic.set_xlabel("Steps")
+    ax_dynamic.set_ylabel("Price")
+    ax_dynamic.grid(True)
+    chart_dynamic.update()
+
+    ax_pred.clear()
+    ax_pred.set_title("Predicted Price (Full Timeline)")
+    chart_pred.update()
+
+    def handle_event(kind, payload):
+        if kind == "log":
+            append_text(log_text, payload, max_lines=1000)
+        elif kind == "lesson":
+            append_text(lessons_text, payload, max_lines=100)
+        elif kind == "note":
+            append_text(ai_notes_text, payload, max_lines=500)
+        elif kind == "metrics":
+            for key, value in payload.items():
+                metrics[key].value = value
+                metrics[key].update()
+        elif kind == "chart":
+            step = payload["step"]
+            predicted_line = payload["predicted_line"]
+            steps_so_far = np.arange(min(step + 1, len(df)))
+
             ax_dynamic.clear()
-            ax_dynamic.plot(x_prog, y_prog, label="Predicted Price", color="blue")
-            ax_dynamic.plot(x_prog, actual_prices, label="Actual Price", color="green")
+            ax_dynamic.plot(steps_so_far, predicted_line[:len(steps_so_far)], label="Predicted Price", color="blue")
+            ax_dynamic.plot(steps_so_far, df["priceClose"].values[:len(steps_so_far)], label="Actual Price", color="green")
             ax_dynamic.grid(True)
             ax_dynamic.set_title("Dynamic Predicted vs Actual Price")
             ax_dynamic.set_xlabel("Steps")
@@ -242,9 +346,8 @@ def load_and_test_model(model_path, log_text, metrics, chart_all, chart_dynamic,
             chart_dynamic.update()
 
             ax_pred.clear()
-            if y_prog:
-                ax_pred.plot(df.index[:len(y_prog)], y_prog, label="Predicted Price", color="blue")
-                ax_pred.legend()
+            ax_pred.plot(df.index, predicted_line, label="Predicted Price", color="blue")
+            ax_pred.legend()
             ax_pred.set_title("Predicted Price (Full Timeline)")
             chart_pred.update()
 
@@ -255,39 +358,37 @@ def load_and_test_model(model_path, log_text, metrics, chart_all, chart_dynamic,
             ax_all.axvspan(df.index[start_idx], df.index[end_idx], color="red", alpha=0.3)
             ax_all.legend()
             chart_all.update()
+        elif kind == "error":
+            append_text(log_text, f"Error during test: {payload}\n", max_lines=1000)
 
-        for key, value in metrics_values.items():
-            metrics[key].value = value
-            metrics[key].update()
+    folder_name = run_folder_name("test_model")
+    task = BackgroundTask(
+        backtest_worker, model_path, df, X, Y, initial_cash, risk_level, folder_name,
+        token=token or CancellationToken()
+    ).start()
+    summary = await task.consume(handle_event)
+    if summary is None:
+        return None
 
-        state = np.reshape(nxt, (1, *X.shape[1:]))
-        prev_portfolio = portfolio
-        step += 1
-        if idx == 0:
-            holds += 1
-        elif idx == 1 and trade_amount > 0:
-            buys += 1
-        elif idx == 2 and trade_amount > 0:
-            sells += 1
+    trajectory = load_trajectory(summary["trajectory"])
 
-    log_text.value += f"Test Result: Profit={profit:.2f}, Success={success_pct:.1f}%, Buys={buys}, Sells={sells}, Holds={holds}\n"
-    log_text.update()
+    def artifact_done(path, error):
+        if error:
+            log_text.value += f"Error saving test artifact: {error}\n"
+        else:
+            log_text.value += f"Saved test artifact: {path}\n"
+        log_text.update()
 
-    folder_name = f"test_model_{int(time.time())}"
-    os.makedirs(folder_name, exist_ok=True)
-    plt.figure(figsize=(16, 9))
-    plt.plot(x_prog, actual_prices, label="Actual Price", color="green")
-    plt.plot(x_prog, y_prog, label="Predicted Price", color="blue")
-    plt.title("Test: Actual vs Predicted Prices")
-    plt.xlabel("Steps")
-    plt.ylabel("Price")
-    plt.legend()
-    plt.grid(True)
-    plt.savefig(os.path.join(folder_name, "price_comparison.png"), dpi=400)
-    plt.close()
-
-    with open(os.path.join(folder_name, "test_log.txt"), "w") as f:
-        f.write(log_text.value)
-
-    with open(os.path.join(folder_name, "lessons_learned.txt"), "w") as f:
-        f.write(lessons_text.value)
\ No newline at end of file
+    pipeline = get_pipeline()
+    pipeline.render_series(
+        os.path.join(folder_name, "price_comparison"),
+        [
+            (trajectory["step"], trajectory["price"], "Actual Price", "green"),
+            (trajectory["step"], trajectory["predicted_price"], "Predicted Price", "blue"),
+        ],
+        title="Test: Actual vs Predicted Prices", xlabel="Steps", ylabel="Price",
+        callback=artifact_done
+    )
+    pipeline.write_text(os.path.join(folder_name, "test_log.txt"), log_text.value, callback=artifact_done)
+    pipeline.write_text(os.path.join(folder_name, "lessons_learned.txt"), lessons_text.value, callback=artifact_done)
+    return summary
@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import torch
+from inference import InferenceEngine, strip_dropout
+
+DEFAULT_MEMORY_BUDGET_MB = 256
+
+
+def content_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def metadata_path(path):
+    return path + ".meta.json"
+
+
+def write_metadata(path, metadata):
+    metadata = dict(metadata)
+    metadata["content_hash"] = content_hash(path)
+    metadata.setdefault("saved_at", time.strftime("%Y-%m-%d %H:%M:%S"))
+    with open(metadata_path(path), "w") as f:
+        json.dump(metadata, f, indent=4, default=str)
+    return metadata
+
+
+def read_metadata(path):
+    meta_file = metadata_path(path)
+    if not os.path.exists(meta_file):
+        return {}
+    with open(meta_file, "r") as f:
+        return json.load(f)
+
+
+def module_nbytes(module):
+    tensors = list(module.parameters()) + list(module.buffers())
+    if not tensors:
+        # Dynamically quantized layers keep their weights in packed params
+        tensors = [t for t in module.state_dict().values() if torch.is_tensor(t)]
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class ModelRegistry:
+    """LRU of loaded, eval-mode policies keyed by checkpoint content."""
+
+    def __init__(self, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self._entries = OrderedDict()
+        self._hashes = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def _content_key(self, path):
+        stat = os.stat(path)
+        fingerprint = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        if fingerprint not in self._hashes:
+            self._hashes[fingerprint] = content_hash(path)
+        return self._hashes[fingerprint]
+
+    def get(self, path, input_dim, backend="eager", precision="fp32", action_space=3, device=None, num_threads=None):
+        with self._lock:
+            key = (self._content_key(path), input_dim, backend, precision, str(device or torch.device("cpu")))
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry["engine"]
+            self.misses += 1
+
+        engine = InferenceEngine.load(
+            path, input_dim, backend=backend, action_space=action_space,
+            device=device, num_threads=num_threads, precision=precision
+        )
+        nbytes = module_nbytes(engine.module) if engine.module is not None else os.path.getsize(path)
+        with self._lock:
+            self._store(key, engine, nbytes, path)
+        return engine
+
+    def put(self, path, model, input_dim, device=None):
+        """Register an in-memory model that was just saved to path, so testing it skips the load."""
+        module = strip_dropout(model)
+        engine = InferenceEngine(module=module)
+        with self._lock:
+            key = (self._content_key(path), input_dim, "eager", "fp32", str(device or torch.device("cpu")))
+            self._store(key, engine, module_nbytes(module), path)
+        return engine
+
+    def _store(self, key, engine, nbytes, path):
+        self._entries[key] = {"engine": engine, "nbytes": nbytes, "path": os.path.abspath(path)}
+        self._entries.move_to_end(key)
+        while len(self._entries) > 1 and self.memory_used() > self.memory_budget:
+            self._entries.popitem(last=False)
+
+    def memory_used(self):
+        return sum(entry["nbytes"] for entry in self._entries.values())
+
+    def metadata(self, path):
+        return read_metadata(path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "memory_used": self.memory_used(),
+            "memory_budget": self.memory_budget,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_registry = None
+
+
+def get_registry(memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry(memory_budget_mb)
+    return _registry
@@ -0,0 +1,318 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+import numpy as np
+from datastore import FEATURE_COLUMNS, RunningStats, read_candles
+from execution import CancellationToken, null_emit
+from features import OBSERVATION_CLIP
+from model_registry import get_registry
+from profiling import LatencyHistogram
+from strategy import money_management
+
+ACTION_NAMES = {0: "Hold", 1: "Buy", 2: "Sell"}
+STAGES = ("features", "queue_wait", "inference", "money_management", "broker", "end_to_end")
+# Candles folded into the running statistics before the policy is asked for anything but Hold
+MIN_WARMUP_ROWS = 100
+
+
+def _candle(values, time_ms):
+    candle = {name: float(values[name]) for name in FEATURE_COLUMNS}
+    candle["time"] = int(time_ms)
+    return candle
+
+
+async def replay_source(df, speed=1.0, interval=None):
+    """Stand-in for an exchange feed: emit a frame's candles spaced by their timestamps / speed,
+    or by a fixed interval in seconds (0 for as fast as the pipeline accepts them)."""
+    times = df.index.values.astype("datetime64[ms]").astype(np.int64)
+    rows = df[FEATURE_COLUMNS].to_dict("records")
+    for i, row in enumerate(rows):
+        if i:
+            delay = interval if interval is not None else (times[i] - times[i - 1]) / 1000 / speed
+            if delay > 0:
+                await asyncio.sleep(delay)
+        yield _candle(row, times[i])
+
+
+async def file_tail_source(path, poll=0.5, from_start=False):
+    """Follow a CSV file with a header row and timeClose in ms, yielding candles as lines are appended."""
+    with open(path, "r") as f:
+        header = f.readline().strip().split(",")
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        partial = ""
+        while True:
+            line = f.readline()
+            if not line:
+                await asyncio.sleep(poll)
+                continue
+            partial += line
+            if not partial.endswith("\n"):
+                continue
+            values = dict(zip(header, partial.strip().split(",")))
+            partial = ""
+            yield _candle(values, float(values["timeClose"]))
+
+
+async def socket_source(host="127.0.0.1", port=9000):
+    """Newline-delimited JSON candles ({"timeClose": ms, "priceOpen": ..., ...}) from a TCP feed."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while line := await reader.readline():
+            values = json.loads(line)
+            yield _candle(values, values["timeClose"])
+    finally:
+        writer.close()
+
+
+class SimulatedBroker:
+    """Fills every order at the candle close plus slippage; money_management's trade amount already includes fees."""
+
+    def __init__(self, initial_cash, slippage=0.0):
+        self.cash = float(initial_cash)
+        self.assets = 0.0
+        self.slippage = slippage
+        self.fills = []
+        self.last_price = None
+
+    def submit(self, side, units, price, amount, time_ms):
+        adjust = units * price * self.slippage
+        if side == "Buy":
+            amount += adjust
+            self.cash -= amount
+            self.assets += units
+        else:
+            amount -= adjust
+            self.cash += amount
+            self.assets -= units
+        fill = {"time": time_ms, "side": side, "units": units, "price": price, "amount": amount}
+        self.fills.append(fill)
+        return fill
+
+    def mark(self, price):
+        self.last_price = price
+
+    @property
+    def equity(self):
+        return self.cash + self.assets * (self.last_price or 0.0)
+
+
+class PaperTrader:
+    """Candle source -> online features -> batched inference -> money_management -> simulated broker.
+
+    Stages are connected by bounded queues, so a slow stage holds back the source instead of
+    letting work pile up. Every stage records its latency in a histogram. Until the running
+    statistics hold min_rows candles the z-scores are unreliable, so those candles are held.
+    """
+
+    def __init__(self, engine, initial_cash=1000, risk_level="Medium Risk", window=1, stats=None,
+                 queue_size=256, max_batch=32, broker=None, emit=null_emit, token=None, min_rows=MIN_WARMUP_ROWS):
+        self.engine = engine
+        self.initial_cash = float(initial_cash)
+        self.risk_level = risk_level
+        self.window = max(int(window), 1)
+        self.stats = stats or RunningStats(len(FEATURE_COLUMNS))
+        self.queue_size = queue_size
+        self.max_batch = max_batch
+        self.min_rows = min_rows
+        self.broker = broker or SimulatedBroker(initial_cash)
+        self.emit = emit
+        self.token = token or CancellationToken()
+        self.latency = {stage: LatencyHistogram() for stage in STAGES}
+        self.actions = {name: 0 for name in ACTION_NAMES.values()}
+        self.batches = 0
+        self._history = deque(maxlen=self.window)
+
+    def _features(self, candle):
+        row = np.array([[candle[name] for name in FEATURE_COLUMNS]])
+        # Clipped like the environment's observations during training
+        normalized = np.clip(self.stats.update(row)[0], -OBSERVATION_CLIP, OBSERVATION_CLIP)
+        if not self._history:
+            self._history.extend([normalized] * (self.window - 1))
+        self._history.append(normalized)
+        if self.stats.count < self.min_rows:
+            return None
+        return np.concatenate(self._history)
+
+    async def _ingest(self, source, features_queue):
+        try:
+            async for candle in source:
+                if self.token.cancelled:
+                    break
+                arrived = time.perf_counter_ns()
+                state = self._features(candle)
+                queued = time.perf_counter_ns()
+                self.latency["features"].record(queued - arrived)
+                await features_queue.put((candle, state, arrived, queued))
+        finally:
+            await features_queue.put(None)
+
+    async def _decide(self, features_queue, orders_queue):
+        finished = False
+        while not finished:
+            item = await features_queue.get()
+            if item is None:
+                break
+            # Micro-batch whatever is already waiting, without waiting for more
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    item = features_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is None:
+                    finished = True
+                    break
+                batch.append(item)
+
+            start = time.perf_counter_ns()
+            for _, _, _, queued in batch:
+                self.latency["queue_wait"].record(start - queued)
+            states = [state for _, state, _, _ in batch if state is not None]
+            actions = iter(())
+            if states:
+                actions = iter(self.engine.predict(np.stack(states)).argmax(axis=1))
+                self.latency["inference"].record(time.perf_counter_ns() - start)
+                self.batches += 1
+            for candle, state, arrived, _ in batch:
+                # Candles seen before the statistics are warm are held
+                action = 0 if state is None else int(next(actions))
+                await orders_queue.put((candle, action, arrived))
+        await orders_queue.put(None)
+
+    async def _execute(self, orders_queue):
+        while (item := await orders_queue.get()) is not None:
+            candle, action, arrived = item
+            price = candle["priceClose"]
+            self.broker.mark(price)
+            start = time.perf_counter_ns()
+            _, depleted, trade_amount, units = money_management(
+                self.initial_cash, action, self.risk_level, price, self.broker.cash, self.broker.assets
+            )
+            routed = time.perf_counter_ns()
+            self.latency["money_management"].record(routed - start)
+            if action in (1, 2) and trade_amount > 0:
+                fill = self.broker.submit(ACTION_NAMES[action], units, price, trade_amount, candle["time"])
+                self.emit("note", f"{ACTION_NAMES[action]} {fill['units']:.4f} @ {price:.2f} ({fill['amount']:.2f})\n")
+            done = time.perf_counter_ns()
+            self.latency["broker"].record(done - routed)
+            self.latency["end_to_end"].record(done - arrived)
+            self.actions[ACTION_NAMES[action]] += 1
+            if depleted:
+                self.emit("lesson", "Paper trading stopped - portfolio depleted.\n")
+                self.token.cancel()
+
+    async def run(self, source):
+        features_queue = asyncio.Queue(maxsize=self.queue_size)
+        orders_queue = asyncio.Queue(maxsize=self.queue_size)
+        started = time.perf_counter()
+        await asyncio.gather(
+            self._ingest(source, features_queue),
+            self._decide(features_queue, orders_queue),
+            self._execute(orders_queue),
+        )
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed):
+        decisions = sum(self.actions.values())
+        return {
+            "decisions": decisions,
+            "batches": self.batches,
+            "mean_batch": decisions / self.batches if self.batches else 0.0,
+            "decisions_per_s": decisions / elapsed if elapsed > 0 else 0.0,
+            "elapsed_s": elapsed,
+            "actions": dict(self.actions),
+            "fills": len(self.broker.fills),
+            "cash": self.broker.cash,
+            "assets": self.broker.assets,
+            "equity": self.broker.equity,
+            "profit": self.broker.equity - self.initial_cash,
+            "latency": {stage: histogram.summary() for stage, histogram in self.latency.items()},
+        }
+
+
+def training_frame(model_meta):
+    """The candles a checkpoint was trained on, from its metadata, or None when they cannot be loaded."""
+    from strategy import load_data
+    from timeframes import NATIVE
+
+    if not model_meta.get("data_range"):
+        return None
+    start, end = model_meta["data_range"]
+    try:
+        df, _, _ = load_data(start, end, symbol=model_meta.get("symbol", "LTC"), timeframe=model_meta.get("timeframe", NATIVE))
+    except (OSError, KeyError, ValueError, IndexError):
+        return None
+    return df
+
+
+def build_trader(model_path, learning_settings, initial_cash=1000, risk_level="Medium Risk", warmup=None, **kwargs):
+    """PaperTrader for a saved checkpoint, its running statistics seeded from warmup (a history frame).
+
+    By default warmup is the range the checkpoint was trained on, so live candles are normalized as the
+    training data was. Without it the trader holds until it has seen min_rows candles.
+    """
+    registry = get_registry(learning_settings["model_cache_mb"])
+    model_meta = registry.metadata(model_path)
+    if model_meta.get("indicators"):
+        raise ValueError("Streaming features cover lagged windows only; this model was trained with indicators.")
+    window = int(model_meta.get("feature_window", 1))
+    engine = registry.get(
+        model_path, window * len(FEATURE_COLUMNS), backend=learning_settings["inference_backend"],
+        precision=learning_settings["inference_precision"], num_threads=learning_settings["inference_threads"]
+    )
+    stats = RunningStats(len(FEATURE_COLUMNS))
+    if warmup is None:
+        warmup = training_frame(model_meta)
+    if warmup is not None:
+        stats.update(warmup[FEATURE_COLUMNS].values)
+    return PaperTrader(engine, initial_cash, risk_level, window=window, stats=stats, **kwargs)
+
+
+def main():
+    from training import load_learning_settings
+
+    parser = argparse.ArgumentParser(description="Paper-trade a checkpoint against a streaming candle source.")
+    parser.add_argument("model")
+    parser.add_argument("--source", choices=["replay", "tail", "socket"], default="replay")
+    parser.add_argument("--file", default="litecoin.xlsx", help="Candles to replay, or the CSV to tail")
+    parser.add_argument("--speed", type=float, default=3600.0, help="Replay speed-up over the candle timestamps")
+    parser.add_argument("--interval", type=float, help="Fixed replay interval in seconds, overrides --speed")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--cash", type=float, default=1000)
+    parser.add_argument("--risk", default="Medium Risk")
+    parser.add_argument("--queue-size", type=int, default=256)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--min-rows", type=int, default=MIN_WARMUP_ROWS,
+                        help="Hold until the running statistics hold this many candles")
+    args = parser.parse_args()
+
+    if args.source == "replay":
+        source = replay_source(read_candles(args.file), speed=args.speed, interval=args.interval)
+    elif args.source == "tail":
+        source = file_tail_source(args.file)
+    else:
+        source = socket_source(args.host, args.port)
+
+    trader = build_trader(
+        args.model, load_learning_settings(), args.cash, args.risk,
+        queue_size=args.queue_size, max_batch=args.max_batch, min_rows=args.min_rows
+    )
+    print(f"Running statistics seeded with {trader.stats.count} candles.")
+    try:
+        report = asyncio.run(trader.run(source))
+    except KeyboardInterrupt:
+        report = trader.report(0)
+    folder = os.path.join("reports", f"paper_{int(time.time())}")
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, "report.json"), "w") as f:
+        json.dump(report, f, indent=4)
+    print(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    main()
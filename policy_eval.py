@@ -0,0 +1,123 @@
+import os
+import time
+import json
+import argparse
+import numpy as np
+from Q import NUM_ACTIONS
+from inference import InferenceEngine
+from execution import CancellationToken, null_emit
+from model_loader import backtest_worker, model_feature_settings
+from model_registry import read_metadata
+from strategy import build_features
+from training import load_learning_settings
+
+SUMMARY_METRICS = ("profit", "success", "portfolio", "buys", "sells", "holds", "successful_trades", "failed_trades")
+
+
+def greedy_actions(engine, states, batch_size=4096):
+    actions = np.empty(len(states), dtype=np.int64)
+    for start in range(0, len(states), batch_size):
+        actions[start:start + batch_size] = engine.predict(states[start:start + batch_size]).argmax(axis=1)
+    return actions
+
+
+def action_agreement(reference, candidate, states):
+    return float(np.mean(greedy_actions(reference, states) == greedy_actions(candidate, states)))
+
+
+def measure_latency(engine, states, decisions=200, batch_size=1024, batch_repeats=10):
+    rows = states[:max(1, min(len(states), decisions))]
+    engine.predict(rows[:1])  # warm-up
+    single = []
+    for row in rows:
+        start = time.perf_counter()
+        engine.predict(row)
+        single.append(time.perf_counter() - start)
+    batch = np.resize(states, (batch_size, states.shape[1]))
+    start = time.perf_counter()
+    for _ in range(batch_repeats):
+        engine.predict(batch)
+    elapsed = time.perf_counter() - start
+    single_us = np.array(single) * 1e6
+    return {
+        "single_p50_us": float(np.percentile(single_us, 50)),
+        "single_p99_us": float(np.percentile(single_us, 99)),
+        "batch_rows_per_s": batch_size * batch_repeats / elapsed,
+    }
+
+
+def run_backtest(model_path, df, X, Y, initial_cash, risk_level, folder, learning_settings):
+    return backtest_worker(
+        CancellationToken(), null_emit, model_path, df, X, Y,
+        float(initial_cash), risk_level, folder, learning_settings
+    )
+
+
+def compare_summaries(reference, candidate):
+    return {
+        key: {"reference": reference[key], "candidate": candidate[key], "delta": candidate[key] - reference[key]}
+        for key in SUMMARY_METRICS
+    }
+
+
+def write_report(report, folder):
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, "report.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=4)
+    return path
+
+
+def quantization_report(model_path, df, X, Y, initial_cash=1000, risk_level="Medium Risk", folder=None):
+    """Compare an fp32 checkpoint with its dynamically quantized int8 copy."""
+    settings = load_learning_settings()
+    folder = folder or os.path.join("reports", f"quantization_{int(time.time())}")
+    # States in the layout the checkpoint was trained on (lagged windows, indicators)
+    feature_settings = model_feature_settings(read_metadata(model_path), settings)
+    features = build_features(df, X, feature_settings["feature_window"], feature_settings["indicators"])
+    states = features.gather(np.arange(len(features)))
+
+    engines = {}
+    backtests = {}
+    for precision in ("fp32", "int8"):
+        engines[precision] = InferenceEngine.load(
+            model_path, features.state_dim, action_space=NUM_ACTIONS,
+            num_threads=settings["inference_threads"], precision=precision
+        )
+        run_settings = dict(settings, inference_backend="eager", inference_precision=precision)
+        backtests[precision] = run_backtest(
+            model_path, df, X, Y, initial_cash, risk_level, os.path.join(folder, precision), run_settings
+        )
+
+    latency = {precision: measure_latency(engine, states) for precision, engine in engines.items()}
+    report = {
+        "model": model_path,
+        "rows": len(states),
+        "action_agreement": action_agreement(engines["fp32"], engines["int8"], states),
+        "latency": latency,
+        "single_decision_speedup": latency["fp32"]["single_p50_us"] / latency["int8"]["single_p50_us"],
+        "batch_throughput_speedup": latency["int8"]["batch_rows_per_s"] / latency["fp32"]["batch_rows_per_s"],
+        "backtest": compare_summaries(backtests["fp32"], backtests["int8"]),
+    }
+    report["path"] = write_report(report, folder)
+    return report
+
+
+def main():
+    from strategy import load_data
+
+    parser = argparse.ArgumentParser(description="Accuracy-vs-speed report for an int8 quantized checkpoint.")
+    parser.add_argument("model")
+    parser.add_argument("--start", default="2024-01-01")
+    parser.add_argument("--end", default="2025-01-01")
+    parser.add_argument("--cash", type=float, default=1000)
+    parser.add_argument("--risk", default="Medium Risk")
+    args = parser.parse_args()
+
+    df, X, Y = load_data(args.start, args.end)
+    report = quantization_report(args.model, df, X, Y, args.cash, args.risk)
+    print(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import cProfile
+
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, time.perf_counter_ns() - self.start)
+        return False
+
+
+def format_snapshot(snapshot):
+    lines = [f"{'phase':<18}{'calls':>8}{'mean us':>11}{'max us':>11}{'% wall':>8}"]
+    for name, stats in snapshot["phases"].items():
+        lines.append(
+            f"{name:<18}{stats['calls']:>8}{stats['mean_us']:>11.1f}"
+            f"{stats['max_us']:>11.1f}{stats['share'] * 100:>7.1f}%"
+        )
+    for name, value in snapshot["counters"].items():
+        lines.append(f"{name:<18}{value:>8}")
+    return "\n".join(lines)
+
+
+class LatencyHistogram:
+    """Latency counts in power-of-two microsecond buckets, plus exact count, mean and max."""
+
+    def __init__(self, max_us=1 << 24):
+        self.buckets = [0] * (max_us.bit_length() + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, elapsed_ns):
+        # Bucket i holds [2**(i-1), 2**i) microseconds
+        index = min(int(elapsed_ns // 1000).bit_length(), len(self.buckets) - 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+
+    def percentile(self, q):
+        """Upper bound (us) of the bucket containing the q-th percentile."""
+        if not self.count:
+            return 0.0
+        target = q / 100 * self.count
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target and n:
+                return float(min(1 << index, self.max_ns / 1e3)) if index else 1.0
+        return self.max_ns / 1e3
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_us": self.total_ns / self.count / 1e3 if self.count else 0.0,
+            "p50_us": self.percentile(50),
+            "p90_us": self.percentile(90),
+            "p99_us": self.percentile(99),
+            "max_us": self.max_ns / 1e3,
+            "buckets": {f"<{1 << i}us": n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class Profiler:
+    """Toggleable per-phase timers and counters. When disabled, phase() returns a shared no-op."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._capture = None
+        self.reset()
+
+    def reset(self):
+        self.totals = {}
+        self.calls = {}
+        self.maxima = {}
+        self.counters = {}
+        self.started = time.perf_counter_ns()
+
+    def phase(self, name):
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def add(self, name, elapsed_ns):
+        self.totals[name] = self.totals.get(name, 0) + elapsed_ns
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if elapsed_ns > self.maxima.get(name, 0):
+            self.maxima[name] = elapsed_ns
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self):
+        wall_ns = max(time.perf_counter_ns() - self.started, 1)
+        phases = {}
+        for name, total in sorted(self.totals.items(), key=lambda item: -item[1]):
+            calls = self.calls[name]
+            phases[name] = {
+                "calls": calls,
+                "total_ms": total / 1e6,
+                "mean_us": total / calls / 1e3,
+                "max_us": self.maxima[name] / 1e3,
+                "share": total / wall_ns,
+            }
+        return {"wall_ms": wall_ns / 1e6, "phases": phases, "counters": dict(self.counters)}
+
+    def export_json(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=4)
+        return path
+
+    def start_capture(self):
+        """Start a cProfile capture; stop_capture() writes pstats output (snakeviz, pstats, speedscope)."""
+        if self._capture is None:
+            self._capture = cProfile.Profile()
+            self._capture.enable()
+
+    def stop_capture(self, path):
+        if self._capture is None:
+            return None
+        self._capture.disable()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._capture.dump_stats(path)
+        self._capture = None
+        return path
@@ -0,0 +1,167 @@
+import os
+import json
+import glob
+import time
+import uuid
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+TRAJECTORY_FORMATS = ("npz", "parquet")
+
+
+def trajectory_fields(num_actions=3):
+    return {
+        "step": (np.int64, ()),
+        "episode": (np.int32, ()),
+        "action": (np.int8, ()),
+        "price": (np.float32, ()),
+        "predicted_price": (np.float32, ()),
+        "portfolio": (np.float32, ()),
+        "assets": (np.float32, ()),
+        "reward": (np.float32, ()),
+        "q_values": (np.float32, (num_actions,)),
+    }
+
+
+def _missing_value(dtype):
+    return np.nan if np.issubdtype(dtype, np.floating) else -1
+
+
+def run_folder_name(prefix):
+    """Folder name unique to one run, even for runs started in the same second by parallel processes."""
+    return f"{prefix}_{int(time.time())}_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+
+
+def _chunk_files(folder):
+    files = glob.glob(os.path.join(folder, "chunk_*.npz")) + glob.glob(os.path.join(folder, "chunk_*.parquet"))
+    return sorted(files)
+
+
+class TrajectoryRecorder:
+    """Chunked columnar buffers that are flushed to disk while a run is in progress."""
+
+    def __init__(self, folder, chunk_size=4096, fmt="npz", num_actions=3, resume=False):
+        if fmt not in TRAJECTORY_FORMATS:
+            raise ValueError(f"Unknown trajectory format: {fmt}")
+        self.folder = folder
+        self.chunk_size = int(chunk_size)
+        self.fmt = fmt
+        self.fields = trajectory_fields(num_actions)
+        self.chunk_index = 0
+        self.rows = 0
+        os.makedirs(folder, exist_ok=True)
+
+        meta_path = os.path.join(folder, "meta.json")
+        if resume and os.path.exists(meta_path):
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            self.fmt = meta.get("format", fmt)
+            self.rows = meta.get("rows", 0)
+            self.chunk_index = len(_chunk_files(folder))
+        if self.fmt == "parquet" and pq is None:
+            raise ImportError("Parquet trajectories require pyarrow")
+
+        self._buffers = self._allocate()
+        self._prev = self._allocate()
+        self._fill = 0
+        self._prev_fill = 0
+        self._write_meta(complete=False)
+
+    def _allocate(self):
+        return {name: np.empty((self.chunk_size, *shape), dtype=dtype) for name, (dtype, shape) in self.fields.items()}
+
+    def record(self, **values):
+        i = self._fill
+        for name, buf in self._buffers.items():
+            value = values.get(name)
+            buf[i] = _missing_value(buf.dtype) if value is None else value
+        self._fill += 1
+        self.rows += 1
+        if self._fill == self.chunk_size:
+            self.flush()
+
+    def tail(self, name, n):
+        current = self._buffers[name][:self._fill]
+        if len(current) >= n or self._prev_fill == 0:
+            return current[-n:].copy()
+        need = n - len(current)
+        previous = self._prev[name][:self._prev_fill][-need:]
+        return np.concatenate([previous, current])
+
+    def flush(self):
+        if self._fill == 0:
+            return
+        data = {name: buf[:self._fill] for name, buf in self._buffers.items()}
+        path = os.path.join(self.folder, f"chunk_{self.chunk_index:06d}.{self.fmt}")
+        tmp_path = path + ".tmp"
+        if self.fmt == "npz":
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **data)
+        else:
+            columns = {}
+            for name, values in data.items():
+                if values.ndim == 1:
+                    columns[name] = values
+                else:
+                    for j in range(values.shape[1]):
+                        columns[f"{name}_{j}"] = values[:, j]
+            pq.write_table(pa.table(columns), tmp_path)
+        os.replace(tmp_path, path)
+
+        self.chunk_index += 1
+        self._buffers, self._prev = self._prev, self._buffers
+        self._prev_fill = self._fill
+        self._fill = 0
+        self._write_meta(complete=False)
+
+    def close(self):
+        self.flush()
+        self._write_meta(complete=True)
+
+    def _write_meta(self, complete):
+        meta = {
+            "format": self.fmt,
+            "chunk_size": self.chunk_size,
+            "rows": self.rows,
+            "chunks": self.chunk_index,
+            "complete": complete,
+            "fields": {name: [np.dtype(dtype).str, list(shape)] for name, (dtype, shape) in self.fields.items()},
+        }
+        tmp_path = os.path.join(self.folder, "meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f, indent=4)
+        os.replace(tmp_path, os.path.join(self.folder, "meta.json"))
+
+
+def load_trajectory(folder):
+    with open(os.path.join(folder, "meta.json"), "r") as f:
+        meta = json.load(f)
+    parts = {name: [] for name in meta["fields"]}
+    for path in _chunk_files(folder):
+        if path.endswith(".npz"):
+            with np.load(path) as chunk:
+                for name in parts:
+                    parts[name].append(chunk[name])
+        else:
+            if pq is None:
+                raise ImportError("Reading Parquet trajectories requires pyarrow")
+            table = pq.read_table(path)
+            for name, (dtype, shape) in meta["fields"].items():
+                if shape:
+                    cols = [table.column(f"{name}_{j}").to_numpy() for j in range(shape[0])]
+                    parts[name].append(np.stack(cols, axis=1).astype(dtype))
+                else:
+                    parts[name].append(table.column(name).to_numpy().astype(dtype))
+    result = {}
+    for name, (dtype, shape) in meta["fields"].items():
+        if parts[name]:
+            result[name] = np.concatenate(parts[name])
+        else:
+            result[name] = np.empty((0, *shape), dtype=dtype)
+    return result
@@ -0,0 +1,120 @@
+import random
+from collections import deque
+import numpy as np
+
+COMPACT_FIELDS = (
+    ("row", np.int32),
+    ("action", np.int8),
+    ("ret", np.float32),
+    ("next_row", np.int32),
+    ("done", np.bool_),
+    ("discount", np.float32),
+)
+
+
+class ReplayMemory:
+    """Bounded replay memory that stores n-step transitions.
+
+    Each stored item is (state, action, n-step return, bootstrap state, done, discount), where
+    discount is gamma**k for the k rewards folded into the return. Returns are accumulated on
+    insert from a pending window of the last n steps, so sampling needs no per-item work.
+
+    With compact=True states must be row indices into an observation source. Items then live in
+    preallocated per-field arrays (18 bytes per transition) instead of tuples holding state copies.
+    """
+
+    def __init__(self, capacity=10000, n_step=1, gamma=0.95, compact=False):
+        self.capacity = capacity
+        self.n_step = max(int(n_step), 1)
+        self.gamma = gamma
+        self.compact = compact
+        self.pending = deque()
+        if compact:
+            self.fields = {name: np.zeros(capacity, dtype=dtype) for name, dtype in COMPACT_FIELDS}
+            self.size = 0
+            self.cursor = 0
+        else:
+            self.items = deque(maxlen=capacity)
+
+    def __len__(self):
+        return self.size if self.compact else len(self.items)
+
+    def __iter__(self):
+        if not self.compact:
+            return iter(self.items)
+        columns = [self.fields[name][:self.size].tolist() for name, _ in COMPACT_FIELDS]
+        return zip(*columns)
+
+    @property
+    def nbytes(self):
+        if self.compact:
+            return sum(array.nbytes for array in self.fields.values())
+        return sum(np.asarray(item[0]).nbytes + np.asarray(item[3]).nbytes + 32 for item in self.items)
+
+    def clear(self):
+        self.pending.clear()
+        if self.compact:
+            self.size = 0
+            self.cursor = 0
+        else:
+            self.items.clear()
+
+    def push(self, state, action, reward, next_state, done):
+        self.pending.append((state, action, reward, next_state, done))
+        if done:
+            self.flush()
+        elif len(self.pending) >= self.n_step:
+            self._emit()
+
+    def flush(self):
+        """Emit pending steps with truncated returns; call at episode boundaries."""
+        while self.pending:
+            self._emit()
+
+    def _emit(self):
+        state, action = self.pending[0][0], self.pending[0][1]
+        ret, discount = 0.0, 1.0
+        for _, _, reward, next_state, done in self.pending:
+            ret += discount * reward
+            discount *= self.gamma
+            if done:
+                break
+        self._store((state, action, ret, next_state, done, discount))
+        self.pending.popleft()
+
+    def _store(self, item):
+        if not self.compact:
+            self.items.append(item)
+            return
+        for (name, _), value in zip(COMPACT_FIELDS, item):
+            self.fields[name][self.cursor] = value
+        self.cursor = (self.cursor + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size):
+        """Column-wise minibatch: (states, actions, returns, next_states, dones, discounts).
+
+        Non-compact states are returned as lists so the caller can stack them; compact states are
+        row-index arrays to gather from the observation source.
+        """
+        if self.compact:
+            indices = np.fromiter(random.sample(range(self.size), min(batch_size, self.size)), dtype=np.int64)
+            f = self.fields
+            return (
+                f["row"][indices],
+                f["action"][indices].astype(np.int64),
+                f["ret"][indices],
+                f["next_row"][indices],
+                f["done"][indices].astype(np.float32),
+                f["discount"][indices],
+            )
+        batch = random.sample(self.items, min(batch_size, len(self.items)))
+        states, actions, returns, next_states, dones, discounts = zip(*batch)
+        return (
+            list(states),
+            np.asarray(actions, dtype=np.int64),
+            np.asarray(returns, dtype=np.float32),
+            list(next_states),
+            np.asarray(dones, dtype=np.float32),
+            np.asarray(discounts, dtype=np.float32),
+        )
@@ -0,0 +1,225 @@
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from datastore import FEATURE_COLUMNS
+from strategy import money_management_batch
+
+PATH_METHODS = ("bootstrap", "noise", "regime")
+METRICS = ("profit", "max_drawdown", "financial_success")
+
+
+def candle_parts(df):
+    """Log returns of the close plus each candle's open/high/low relative to its close and its volume."""
+    values = df[FEATURE_COLUMNS].values.astype(np.float64)
+    close = values[:, 3]
+    log_returns = np.diff(np.log(close), prepend=np.log(close[0]))
+    ratios = values[:, :3] / close[:, None]
+    return close[0], log_returns, ratios, values[:, 4]
+
+
+def sample_indices(rng, length, n_paths, method="bootstrap", block=20):
+    """(n_paths, length) row indices into the history for each resampled path."""
+    if method == "noise":
+        return np.broadcast_to(np.arange(length), (n_paths, length))
+    if method == "bootstrap":
+        # Moving-block bootstrap: fixed-length blocks of `block` consecutive rows from uniform starts,
+        # the last possible start (length - block) included
+        starts = rng.integers(0, max(length - block + 1, 1), size=(n_paths, -(-length // block)))
+        indices = (starts[:, :, None] + np.arange(block)).reshape(n_paths, -1)[:, :length]
+        return np.minimum(indices, length - 1)
+    if method == "regime":
+        # Shuffle the order of contiguous regimes (blocks) while keeping each regime intact
+        blocks = np.array_split(np.arange(length), max(length // block, 1))
+        return np.stack([np.concatenate([blocks[i] for i in rng.permutation(len(blocks))]) for _ in range(n_paths)])
+    raise ValueError(f"Unknown path method: {method}")
+
+
+def generate_paths(df, n_paths=1000, method="bootstrap", block=20, noise=0.5, seed=0):
+    """(n_paths, T, 5) OHLCV paths resampled from df.
+
+    For the "noise" method, noise scales the Gaussian noise added to each return by the historical return std.
+    """
+    rng = np.random.default_rng(seed)
+    first_close, log_returns, ratios, volume = candle_parts(df)
+    indices = sample_indices(rng, len(df), n_paths, method, block)
+    returns = log_returns[indices]
+    returns[:, 0] = 0.0
+    if method == "noise":
+        returns = returns + rng.normal(0, noise * log_returns[1:].std(), returns.shape)
+        returns[:, 0] = 0.0
+    close = first_close * np.exp(np.cumsum(returns, axis=1))
+    paths = np.empty(indices.shape + (5,), dtype=np.float64)
+    paths[:, :, :3] = ratios[indices] * close[:, :, None]
+    paths[:, :, 1] = np.maximum(paths[:, :, 1], np.maximum(paths[:, :, 0], close))
+    paths[:, :, 2] = np.minimum(paths[:, :, 2], np.minimum(paths[:, :, 0], close))
+    paths[:, :, 3] = close
+    paths[:, :, 4] = volume[indices]
+    return paths
+
+
+def path_states(paths, window=1):
+    """Per-path z-scored OHLCV (as load_data normalizes), flattened into lagged windows: (P, T, window * 5)."""
+    mean = paths.mean(axis=1, keepdims=True)
+    std = paths.std(axis=1, keepdims=True) + 1e-5
+    states = ((paths - mean) / std).astype(np.float32)
+    if window > 1:
+        padded = np.concatenate([np.repeat(states[:, :1], window - 1, axis=1), states], axis=1)
+        states = sliding_window_view(padded, window, axis=1).transpose(0, 1, 3, 2)
+        states = states.reshape(paths.shape[0], paths.shape[1], -1)
+    return np.ascontiguousarray(states)
+
+
+def simulate(paths, actions, initial_cash=1000, risk_level="Medium Risk"):
+    """Run money management over all paths at once, one vectorized step per time index."""
+    n_paths, length = actions.shape
+    close = paths[:, :, 3]
+    cash = np.full(n_paths, float(initial_cash))
+    assets = np.zeros(n_paths)
+    active = np.ones(n_paths, dtype=bool)
+    peak = cash.copy()
+    max_drawdown = np.zeros(n_paths)
+    trades = np.zeros(n_paths, dtype=np.int64)
+    for t in range(length):
+        price = close[:, t]
+        action = np.where(active, actions[:, t], 0)
+        amount, units, depleted = money_management_batch(action, risk_level, price, cash, assets)
+        active &= ~depleted
+        buy = (action == 1) & (amount > 0) & active
+        sell = (action == 2) & (amount > 0) & active
+        cash = cash - np.where(buy, amount, 0) + np.where(sell, amount, 0)
+        assets = assets + np.where(buy, units, 0) - np.where(sell, units, 0)
+        trades += buy | sell
+        equity = cash + assets * price
+        peak = np.maximum(peak, equity)
+        max_drawdown = np.maximum(max_drawdown, (peak - equity) / peak)
+
+    equity = cash + assets * close[:, -1]
+    portfolio_return = (equity - initial_cash) / initial_cash * 100
+    market_return = (close[:, -1] - close[:, 0]) / close[:, 0] * 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        financial_success = np.where(market_return != 0, portfolio_return / market_return * 100, portfolio_return)
+    return {
+        "profit": equity - initial_cash,
+        "max_drawdown": max_drawdown * 100,
+        "financial_success": financial_success,
+        "trades": trades,
+        "depleted": ~active,
+    }
+
+
+def distribution(values):
+    values = np.asarray(values, dtype=np.float64)
+    percentiles = np.percentile(values, [5, 25, 50, 75, 95])
+    return {
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "p5": float(percentiles[0]),
+        "p25": float(percentiles[1]),
+        "median": float(percentiles[2]),
+        "p75": float(percentiles[3]),
+        "p95": float(percentiles[4]),
+    }
+
+
+def _evaluate_batch(model_path, learning_settings, df, n_paths, method, block, noise, seed,
+                    initial_cash, risk_level, window):
+    from model_registry import get_registry
+
+    engine = get_registry(learning_settings["model_cache_mb"]).get(
+        model_path, window * len(FEATURE_COLUMNS), backend=learning_settings["inference_backend"],
+        precision=learning_settings["inference_precision"], num_threads=learning_settings["inference_threads"]
+    )
+    paths = generate_paths(df, n_paths, method, block, noise, seed)
+    states = path_states(paths, window)
+    # The policy has no position inputs, so every action can be computed up front in large batches
+    flat = states.reshape(-1, states.shape[-1])
+    actions = np.concatenate([
+        engine.predict(flat[start:start + 65536]).argmax(axis=1) for start in range(0, len(flat), 65536)
+    ]).reshape(n_paths, -1)
+    return simulate(paths, actions, initial_cash, risk_level)
+
+
+def robustness_worker(token, emit, model_path, df, initial_cash, risk_level, learning_settings,
+                      n_paths=1000, method="bootstrap", block=20, noise=0.5, seed=0,
+                      batch_paths=256, max_workers=None):
+    """Evaluate a policy on n_paths resampled histories and summarize the outcome distributions."""
+    from model_registry import read_metadata
+
+    meta = read_metadata(model_path)
+    if meta.get("indicators"):
+        raise ValueError("Robustness paths cover lagged windows only; this model was trained with indicators.")
+    window = int(meta.get("feature_window", 1))
+    batches = [(min(batch_paths, n_paths - start), seed + i) for i, start in enumerate(range(0, n_paths, batch_paths))]
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers or min(len(batches), os.cpu_count() or 1)) as executor:
+        futures = [
+            executor.submit(
+                _evaluate_batch, model_path, learning_settings, df, size, method, block, noise, batch_seed,
+                float(initial_cash), risk_level, window
+            )
+            for size, batch_seed in batches
+        ]
+        for done, future in enumerate(futures, 1):
+            if token.cancelled:
+                for pending in futures:
+                    pending.cancel()
+                break
+            results.append(future.result())
+            emit("log", f"Robustness: {done}/{len(futures)} batches of paths evaluated.\n")
+
+    merged = {key: np.concatenate([r[key] for r in results]) for key in results[0]} if results else {}
+    report = {
+        "model": model_path,
+        "method": method,
+        "paths": int(len(merged.get("profit", []))),
+        "rows": len(df),
+        "block": block,
+        "noise": noise,
+        "probability_of_loss": float(np.mean(merged["profit"] < 0)) if merged else None,
+        "depleted_share": float(np.mean(merged["depleted"])) if merged else None,
+        "mean_trades": float(np.mean(merged["trades"])) if merged else None,
+    }
+    for key in METRICS:
+        if merged:
+            report[key] = distribution(merged[key])
+    return report
+
+
+def main():
+    from execution import CancellationToken, null_emit
+    from strategy import load_data
+    from training import load_learning_settings
+
+    parser = argparse.ArgumentParser(description="Monte Carlo robustness backtest over resampled price paths.")
+    parser.add_argument("model")
+    parser.add_argument("--paths", type=int, default=1000)
+    parser.add_argument("--method", choices=PATH_METHODS, default="bootstrap")
+    parser.add_argument("--block", type=int, default=20)
+    parser.add_argument("--noise", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--start", default="2024-01-01")
+    parser.add_argument("--end", default="2025-01-01")
+    parser.add_argument("--cash", type=float, default=1000)
+    parser.add_argument("--risk", default="Medium Risk")
+    args = parser.parse_args()
+
+    df, _, _ = load_data(args.start, args.end)
+    report = robustness_worker(
+        CancellationToken(), null_emit, args.model, df, args.cash, args.risk, load_learning_settings(),
+        n_paths=args.paths, method=args.method, block=args.block, noise=args.noise, seed=args.seed,
+        max_workers=args.workers
+    )
+    folder = os.path.join("reports", f"robustness_{int(time.time())}")
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, "report.json"), "w") as f:
+        json.dump(report, f, indent=4)
+    print(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+import os
+import glob
+import json
+import time
+import sqlite3
+import socket
+import hashlib
+import argparse
+from contextlib import contextmanager
+import numpy as np
+from execution import process_alive
+
+DEFAULT_DB = "runs.db"
+DEFAULT_ROOT = "runs"
+RUN_KINDS = ("train", "backtest")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'running',
+    started_at REAL,
+    finished_at REAL,
+    symbol TEXT,
+    timeframe TEXT,
+    data_start TEXT,
+    data_end TEXT,
+    rows INTEGER,
+    data_fingerprint TEXT,
+    model_path TEXT,
+    model_hash TEXT,
+    settings TEXT,
+    summary TEXT,
+    host TEXT,
+    pid INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_by_kind ON runs (kind, started_at);
+CREATE INDEX IF NOT EXISTS runs_by_symbol ON runs (symbol, started_at);
+CREATE INDEX IF NOT EXISTS runs_by_data ON runs (data_fingerprint);
+CREATE INDEX IF NOT EXISTS runs_by_model ON runs (model_hash);
+CREATE TABLE IF NOT EXISTS run_params (
+    run_id INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    text_value TEXT,
+    num_value REAL
+);
+CREATE INDEX IF NOT EXISTS params_by_value ON run_params (key, num_value, text_value);
+CREATE INDEX IF NOT EXISTS params_by_run ON run_params (run_id);
+CREATE TABLE IF NOT EXISTS run_metrics (
+    run_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    last REAL,
+    high REAL,
+    mean REAL,
+    count INTEGER,
+    PRIMARY KEY (run_id, name)
+);
+CREATE INDEX IF NOT EXISTS metrics_by_value ON run_metrics (name, last);
+CREATE TABLE IF NOT EXISTS artifacts (
+    run_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    content_hash TEXT,
+    episode INTEGER,
+    created_at REAL
+);
+CREATE INDEX IF NOT EXISTS artifacts_by_run ON artifacts (run_id);
+CREATE INDEX IF NOT EXISTS artifacts_by_hash ON artifacts (content_hash);
+"""
+
+
+def data_fingerprint(df):
+    """Hash of the candle timestamps and values, so runs on identical data can be matched."""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(df.index.values.astype("datetime64[ms]").astype(np.int64)).tobytes())
+    digest.update(np.ascontiguousarray(df.values, dtype=np.float64).tobytes())
+    return digest.hexdigest()[:32]
+
+
+def checkpoint_metadata(path):
+    # The sidecar written by save_model; read directly so the registry does not import torch
+    try:
+        with open(path + ".meta.json", "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+def _summarize(values):
+    """(last, high, mean) of a metric column over its logged values; NaN rows carry no value.
+
+    A column with no values at all (e.g. a loss before replay starts) gives NULLs.
+    """
+    present = values[~np.isnan(values)]
+    if not len(present):
+        return None, None, None
+    return float(present[-1]), float(present.max()), float(present.mean())
+
+
+def _parse_value(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+class MetricsStore:
+    """Per-run columnar metrics: runs/<id>/metrics/<name>.f8, one value per logged row.
+
+    Rows are buffered and appended in blocks; every column of a run has the same length, so a
+    metric is read back with one np.fromfile and aggregated without touching the other columns.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, flush_rows=256):
+        self.root = root
+        self.flush_rows = flush_rows
+        self._buffers = {}
+
+    def folder(self, run_id):
+        return os.path.join(self.root, str(run_id), "metrics")
+
+    def append(self, run_id, values):
+        buffer = self._buffers.setdefault(run_id, {})
+        for name, value in values.items():
+            buffer.setdefault(name, []).append(float(value))
+        if len(next(iter(buffer.values()))) >= self.flush_rows:
+            self.flush(run_id)
+
+    def flush(self, run_id):
+        buffer = self._buffers.pop(run_id, None)
+        if not buffer:
+            return
+        folder = self.folder(run_id)
+        os.makedirs(folder, exist_ok=True)
+        for name, values in buffer.items():
+            with open(os.path.join(folder, f"{name}.f8"), "ab") as f:
+                np.asarray(values, dtype=np.float64).tofile(f)
+
+    def names(self, run_id):
+        return sorted(os.path.splitext(os.path.basename(path))[0] for path in glob.glob(os.path.join(self.folder(run_id), "*.f8")))
+
+    def read(self, run_id, names=None):
+        names = names or self.names(run_id)
+        columns = {}
+        for name in names:
+            path = os.path.join(self.folder(run_id), f"{name}.f8")
+            if os.path.exists(path):
+                columns[name] = np.fromfile(path, dtype=np.float64)
+        return columns
+
+
+class RunRegistry:
+    """SQLite catalog of training and backtest runs with their settings, data, checkpoints and metrics.
+
+    Settings are also stored one row per key (run_params), so runs can be filtered by any setting with an
+    index lookup. Per-row metrics go to the columnar MetricsStore; their last/high/mean are kept in
+    run_metrics for sorting and comparison without reading the columns.
+    """
+
+    def __init__(self, path=DEFAULT_DB, root=DEFAULT_ROOT):
+        self.path = path
+        self.metrics_store = MetricsStore(root)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+            # Catalogs created before runs recorded the process that owns them
+            columns = {row["name"] for row in db.execute("PRAGMA table_info(runs)")}
+            for column, kind in (("host", "TEXT"), ("pid", "INTEGER")):
+                if column not in columns:
+                    db.execute(f"ALTER TABLE runs ADD COLUMN {column} {kind}")
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def start_run(self, kind, settings=None, df=None, symbol=None, model_path=None, started_at=None):
+        settings = dict(settings or {})
+        with self._connect() as db:
+            db.execute("BEGIN")
+            cursor = db.execute(
+                "INSERT INTO runs (kind, started_at, symbol, timeframe, data_start, data_end, rows, data_fingerprint, "
+                "model_path, settings, host, pid) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    kind, started_at or time.time(), symbol, settings.get("timeframe"),
+                    str(df.index[0]) if df is not None and len(df) else None,
+                    str(df.index[-1]) if df is not None and len(df) else None,
+                    len(df) if df is not None else None,
+                    data_fingerprint(df) if df is not None else None,
+                    model_path, json.dumps(settings, default=str), socket.gethostname(), os.getpid(),
+                )
+            )
+            run_id = cursor.lastrowid
+            db.executemany(
+                "INSERT INTO run_params (run_id, key, text_value, num_value) VALUES (?, ?, ?, ?)",
+                [(run_id, key, json.dumps(value, default=str), _number(value)) for key, value in settings.items()]
+            )
+            db.execute("COMMIT")
+        return run_id
+
+    def log_metrics(self, run_id, **values):
+        self.metrics_store.append(run_id, values)
+
+    def add_artifact(self, run_id, path, kind="artifact", episode=None, content_hash=None):
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO artifacts (run_id, kind, path, content_hash, episode, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, kind, path, content_hash, episode, time.time())
+            )
+
+    def add_checkpoint(self, run_id, path, episode=None):
+        meta = checkpoint_metadata(path)
+        self.add_artifact(run_id, path, "checkpoint", episode, meta.get("content_hash"))
+        with self._connect() as db:
+            db.execute("UPDATE runs SET model_path = ?, model_hash = ? WHERE id = ?", (path, meta.get("content_hash"), run_id))
+
+    def finish_run(self, run_id, status="done", summary=None):
+        """Flush the run's metrics, store their last/high/mean, and close the run."""
+        self.metrics_store.flush(run_id)
+        summary = dict(summary or {})
+        columns = self.metrics_store.read(run_id)
+        rows = [(run_id, name, *_summarize(values), len(values)) for name, values in columns.items() if len(values)]
+        # Scalar summary values without a metric column are recorded as single-row metrics
+        rows += [
+            (run_id, name, value, value, value, 1)
+            for name, value in ((name, _number(value)) for name, value in summary.items())
+            if value is not None and name not in columns
+        ]
+        with self._connect() as db:
+            db.execute("BEGIN")
+            db.execute(
+                "UPDATE runs SET status = ?, finished_at = ?, summary = ? WHERE id = ?",
+                (status, time.time(), json.dumps(summary, default=str), run_id)
+            )
+            db.execute("DELETE FROM run_metrics WHERE run_id = ?", (run_id,))
+            db.executemany("INSERT INTO run_metrics VALUES (?, ?, ?, ?, ?, ?)", rows)
+            db.execute("COMMIT")
+
+    def recover(self):
+        """Mark runs still open by processes on this host that no longer exist as failed."""
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT id, pid FROM runs WHERE status = 'running' AND host = ?", (socket.gethostname(),)
+            ).fetchall()
+        orphaned = [row["id"] for row in rows if row["pid"] is not None and not process_alive(row["pid"])]
+        for run_id in orphaned:
+            self.finish_run(run_id, "failed", {"error": "Process exited before the run finished"})
+        return orphaned
+
+    def get(self, run_id):
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+            if row is None:
+                return None
+            run = dict(row)
+            run["metrics"] = {
+                r["name"]: {"last": r["last"], "high": r["high"], "mean": r["mean"], "count": r["count"]}
+                for r in db.execute("SELECT * FROM run_metrics WHERE run_id = ?", (run_id,))
+            }
+            run["artifacts"] = [dict(r) for r in db.execute("SELECT * FROM artifacts WHERE run_id = ?", (run_id,))]
+        run["settings"] = json.loads(run["settings"] or "{}")
+        run["summary"] = json.loads(run["summary"] or "{}")
+        return run
+
+    def _filters(self, kind=None, symbol=None, status=None, since=None, where=None):
+        clauses, args = [], []
+        for column, value in (("kind", kind), ("symbol", symbol), ("status", status)):
+            if value is not None:
+                clauses.append(f"runs.{column} = ?")
+                args.append(value)
+        if since is not None:
+            clauses.append("runs.started_at >= ?")
+            args.append(since)
+        for key, value in (where or {}).items():
+            number = _number(value)
+            column, match = ("num_value", number) if number is not None else ("text_value", json.dumps(value))
+            clauses.append(f"runs.id IN (SELECT run_id FROM run_params WHERE key = ? AND {column} = ?)")
+            args += [key, match]
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def query(self, kind=None, symbol=None, status=None, since=None, where=None, order_by=None,
+              descending=True, limit=100):
+        """Runs matching the filters; where maps setting keys to values. order_by names a metric (its last value)."""
+        condition, args = self._filters(kind, symbol, status, since, where)
+        select = "SELECT runs.*, m.last AS sort_value FROM runs"
+        if order_by:
+            select += " LEFT JOIN run_metrics m ON m.run_id = runs.id AND m.name = ?"
+            args = [order_by] + args
+            order = f"m.last IS NULL, m.last {'DESC' if descending else 'ASC'}"
+        else:
+            select = "SELECT runs.*, NULL AS sort_value FROM runs"
+            order = "runs.started_at DESC"
+        with self._connect() as db:
+            rows = db.execute(f"{select}{condition} ORDER BY {order} LIMIT ?", args + [limit]).fetchall()
+        runs = []
+        for row in rows:
+            run = dict(row)
+            run["settings"] = json.loads(run["settings"] or "{}")
+            run["summary"] = json.loads(run["summary"] or "{}")
+            runs.append(run)
+        return runs
+
+    def aggregate(self, metric, group_by, kind=None, symbol=None, where=None):
+        """Count/mean/min/max of a metric's last value per value of the setting group_by."""
+        condition, args = self._filters(kind, symbol, "done", None, where)
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT p.text_value AS value, COUNT(*) AS runs, AVG(m.last) AS mean, MIN(m.last) AS min, MAX(m.last) AS max "
+                "FROM runs JOIN run_metrics m ON m.run_id = runs.id AND m.name = ? "
+                "JOIN run_params p ON p.run_id = runs.id AND p.key = ?"
+                f"{condition} GROUP BY p.text_value ORDER BY mean DESC",
+                [metric, group_by] + args
+            ).fetchall()
+        return [dict(row, value=_parse_value(row["value"])) for row in rows]
+
+    def compare(self, run_ids, metrics=None):
+        """Side-by-side summaries, plus the settings that differ between the runs."""
+        runs = [run for run in (self.get(run_id) for run_id in run_ids) if run is not None]
+        keys = set().union(*(run["settings"] for run in runs)) if runs else set()
+        differing = sorted(
+            key for key in keys
+            if len({json.dumps(run["settings"].get(key), default=str) for run in runs}) > 1
+        )
+        return {
+            "runs": [
+                {
+                    "id": run["id"], "kind": run["kind"], "symbol": run["symbol"],
+                    "data": [run["data_start"], run["data_end"]], "model": run["model_path"],
+                    "metrics": {name: values for name, values in run["metrics"].items() if not metrics or name in metrics},
+                    "settings": {key: run["settings"].get(key) for key in differing},
+                }
+                for run in runs
+            ],
+            "differing_settings": differing,
+            "same_data": len({run["data_fingerprint"] for run in runs}) <= 1,
+        }
+
+    def metrics(self, run_id, names=None):
+        return self.metrics_store.read(run_id, names)
+
+    def import_checkpoints(self, pattern="*.pt"):
+        """Register runs for checkpoints saved before the registry existed, from their metadata sidecars."""
+        with self._connect() as db:
+            known = {row[0] for row in db.execute("SELECT content_hash FROM artifacts WHERE kind = 'checkpoint'")}
+        imported = []
+        for path in sorted(glob.glob(pattern)):
+            meta = checkpoint_metadata(path)
+            if not meta or meta.get("content_hash") in known:
+                continue
+            saved_at = time.mktime(time.strptime(meta["saved_at"], "%Y-%m-%d %H:%M:%S")) if meta.get("saved_at") else None
+            run_id = self.start_run("train", meta.get("settings"), symbol=meta.get("symbol"), started_at=saved_at)
+            data_range = meta.get("data_range") or [None, None]
+            with self._connect() as db:
+                db.execute(
+                    "UPDATE runs SET data_start = ?, data_end = ?, rows = ? WHERE id = ?",
+                    (data_range[0], data_range[1], meta.get("rows"), run_id)
+                )
+            self.add_checkpoint(run_id, path, meta.get("episodes"))
+            if meta.get("trajectory"):
+                self.add_artifact(run_id, meta["trajectory"], "trajectory")
+            self.finish_run(run_id, summary={"episodes": meta.get("episodes")})
+            imported.append(run_id)
+        return imported
+
+
+def parse_where(items):
+    where = {}
+    for item in items or []:
+        key, _, value = item.partition("=")
+        where[key] = _parse_value(value)
+    return where
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query and compare recorded training and backtest runs.")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    listing = commands.add_parser("list", help="Filter runs")
+    listing.add_argument("--kind", choices=RUN_KINDS)
+    listing.add_argument("--symbol")
+    listing.add_argument("--status")
+    listing.add_argument("--where", nargs="*", help="Setting filters such as learning_rate=0.001")
+    listing.add_argument("--order", help="Sort by a metric, highest first")
+    listing.add_argument("--limit", type=int, default=50)
+
+    show = commands.add_parser("show", help="Show one run")
+    show.add_argument("run_id", type=int)
+
+    compare = commands.add_parser("compare", help="Compare runs side by side")
+    compare.add_argument("run_ids", type=int, nargs="+")
+    compare.add_argument("--metrics", nargs="*")
+
+    aggregate = commands.add_parser("aggregate", help="Summarize a metric per value of a setting")
+    aggregate.add_argument("metric")
+    aggregate.add_argument("--by", required=True, help="Setting to group by")
+    aggregate.add_argument("--kind", choices=RUN_KINDS)
+    aggregate.add_argument("--symbol")
+    aggregate.add_argument("--where", nargs="*")
+
+    backfill = commands.add_parser("import", help="Register existing checkpoints from their metadata")
+    backfill.add_argument("pattern", nargs="?", default="*.pt")
+    args = parser.parse_args()
+
+    registry = RunRegistry(args.db)
+    if args.command == "list":
+        runs = registry.query(args.kind, args.symbol, args.status, where=parse_where(args.where),
+                              order_by=args.order, limit=args.limit)
+        for run in runs:
+            started = time.strftime("%Y-%m-%d %H:%M", time.localtime(run["started_at"])) if run["started_at"] else "?"
+            value = f"  {args.order}={run['sort_value']:.4f}" if args.order and run["sort_value"] is not None else ""
+            print(f"{run['id']:>5}  {run['kind']:<8} {run['status']:<8} {started}  {run['symbol'] or '-':<6} "
+                  f"{run['data_start'] or '?'} -> {run['data_end'] or '?'}  {run['model_path'] or ''}{value}")
+    elif args.command == "show":
+        print(json.dumps(registry.get(args.run_id), indent=4, default=str))
+    elif args.command == "compare":
+        print(json.dumps(registry.compare(args.run_ids, args.metrics), indent=4, default=str))
+    elif args.command == "aggregate":
+        rows = registry.aggregate(args.metric, args.by, args.kind, args.symbol, parse_where(args.where))
+        for row in rows:
+            print(f"{args.by}={row['value']}: runs={row['runs']} mean={row['mean']:.4f} "
+                  f"min={row['min']:.4f} max={row['max']:.4f}")
+    else:
+        imported = registry.import_checkpoints(args.pattern)
+        print(f"Imported {len(imported)} checkpoints.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import flet as ft
+import json
+import time
+from run_registry import RUN_KINDS, RunRegistry, parse_where
+
+def create_runs_page(page):
+    registry = RunRegistry()
+    log_text = page.controls_dict["log_text"]
+    selected = set()
+
+    kind_dropdown = ft.Dropdown(
+        label="Run Type", width=150, value="all",
+        options=[ft.dropdown.Option("all")] + [ft.dropdown.Option(kind) for kind in RUN_KINDS]
+    )
+    symbol_field = ft.TextField(label="Symbol", width=120)
+    where_field = ft.TextField(label="Settings Filter", width=300, hint_text="learning_rate=0.001 gamma=0.99")
+    order_field = ft.TextField(label="Sort by Metric", value="profit", width=150)
+    compare_text = ft.TextField(label="Comparison", multiline=True, read_only=True, min_lines=6, max_lines=20, expand=True)
+    runs_table = ft.DataTable(columns=[
+        ft.DataColumn(ft.Text(name)) for name in ("ID", "Type", "Status", "Started", "Symbol", "Data", "Model", "Metric")
+    ])
+
+    def select_run(e, run_id):
+        if e.data == "true":
+            selected.add(run_id)
+        else:
+            selected.discard(run_id)
+
+    def search(e=None):
+        try:
+            runs = registry.query(
+                kind=None if kind_dropdown.value == "all" else kind_dropdown.value,
+                symbol=symbol_field.value or None,
+                where=parse_where((where_field.value or "").split()),
+                order_by=order_field.value or None,
+            )
+        except Exception as ex:
+            log_text.value += f"Error querying runs: {ex}\n"
+            page.update()
+            return
+        selected.clear()
+        runs_table.rows = [
+            ft.DataRow(
+                cells=[
+                    ft.DataCell(ft.Text(str(run["id"]))),
+                    ft.DataCell(ft.Text(run["kind"])),
+                    ft.DataCell(ft.Text(run["status"])),
+                    ft.DataCell(ft.Text(time.strftime("%Y-%m-%d %H:%M", time.localtime(run["started_at"])) if run["started_at"] else "?")),
+                    ft.DataCell(ft.Text(run["symbol"] or "-")),
+                    ft.DataCell(ft.Text(f"{(run['data_start'] or '?')[:10]} - {(run['data_end'] or '?')[:10]}")),
+                    ft.DataCell(ft.Text(run["model_path"] or "")),
+                    ft.DataCell(ft.Text("" if run["sort_value"] is None else f"{run['sort_value']:.4f}")),
+                ],
+                on_select_changed=lambda e, run_id=run["id"]: select_run(e, run_id),
+            )
+            for run in runs
+        ]
+        page.update()
+
+    def compare_runs(e):
+        if len(selected) < 2:
+            compare_text.value = "Select at least two runs to compare."
+        else:
+            compare_text.value = json.dumps(registry.compare(sorted(selected)), indent=2, default=str)
+        compare_text.update()
+
+    def import_checkpoints(e):
+        imported = registry.import_checkpoints()
+        log_text.value += f"Imported {len(imported)} existing checkpoints into the run registry.\n"
+        search()
+
+    def close_runs(e):
+        page.views.pop()
+        page.update()
+
+    search_btn = ft.ElevatedButton("Search", width=120, on_click=search)
+    compare_btn = ft.ElevatedButton("Compare Selected", width=170, on_click=compare_runs)
+    import_btn = ft.ElevatedButton("Import Checkpoints", width=170, on_click=import_checkpoints)
+    back_btn = ft.ElevatedButton("<", width=150, on_click=close_runs)
+
+    search()
+    return ft.View(
+        route="/runs",
+        controls=[
+            ft.AppBar(title=ft.Text("Run History"), leading=back_btn, bgcolor=ft.Colors.BLUE_200,),
+            ft.Column([
+                ft.Row([kind_dropdown, symbol_field, where_field, order_field]),
+                ft.Row([search_btn, compare_btn, import_btn]),
+                runs_table,
+                ft.Row([compare_text]),
+            ], scroll="auto", expand=True),
+        ],
+        padding=20
+    )
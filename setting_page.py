@@ -52,8 +52,9 @@ def create_settings_page(page):
                 "forecast_steps": int(forecast_steps_field.value) if forecast_steps_field.value.strip() else settings["forecast_steps"],
                 "strategy_description": strategy_field.value or settings["strategy_description"]
             }
+            settings.update(new_settings)
             with open(settings_file, "w") as f:
-                json.dump(new_settings, f, indent=4)
+                json.dump(settings, f, indent=4)
             page.controls_dict["log_text"].value += "Settings saved to learning_settings.json\n"
             page.views.pop()
             page.controls_dict["log_text"].value += "Returned to main page.\n"
@@ -2,19 +2,40 @@ import pandas as pd
 import numpy as np
 import os
 import json
-import matplotlib.pyplot as plt
 import flet as ft
+from artifacts import get_pipeline
+from features import FeatureSet
+from datastore import read_candles, ingest_file, symbol_source, symbol_store
+from timeframes import NATIVE, resample_frame
 
-def load_data(start_date="2024-01-01", end_date="2025-01-01"):
-    df = pd.read_excel("litecoin.xlsx", engine="openpyxl")
-    df["timeClose"] = pd.to_datetime(df["timeClose"], unit="ms")
-    df.set_index("timeClose", inplace=True)
-    df.sort_index(inplace=True)
+def load_data(start_date="2024-01-01", end_date="2025-01-01", normalization="global", symbol="LTC", timeframe=NATIVE):
+    try:
+        source = symbol_source(symbol)
+    except FileNotFoundError:
+        # Generated symbols (synthetic_data.py) live only in the column store
+        if not symbol_store(symbol).rows:
+            raise
+        source = None
+    if normalization == "online":
+        if timeframe != NATIVE:
+            raise ValueError("Online normalization is only available at the native timeframe")
+        # Causal running statistics from the append-only cache; only rows not yet cached are processed
+        store = symbol_store(symbol)
+        if source is not None:
+            ingest_file(source, store)
+        df, X, Y = store.frame(start_date, end_date)
+        return df, X, Y.rename(columns={"LTC": symbol})
+    if source is None:
+        # Only the requested range is read from the memory-mapped columns unless it has to be resampled
+        bounds = (start_date, end_date) if timeframe == NATIVE else (None, None)
+        df = resample_frame(symbol_store(symbol).frame(*bounds)[0], timeframe, symbol)
+    else:
+        df = resample_frame(read_candles(source), timeframe, symbol)
     if start_date not in df.index or end_date not in df.index:
         start_date = df.index[df.index >= start_date][0]
         end_date = df.index[df.index <= end_date][-1]
     df = df.loc[start_date:end_date]
-    Y = df[["priceClose"]].rename(columns={"priceClose": "LTC"})
+    Y = df[["priceClose"]].rename(columns={"priceClose": symbol})
     X_raw = df[["priceOpen", "priceHigh", "priceLow", "priceClose", "volume"]].values
     mean, std = X_raw.mean(0), X_raw.std(0) + 1e-5
     X = (X_raw - mean) / std
@@ -22,6 +43,18 @@ def load_data(start_date="2024-01-01", end_date="2025-01-01"):
                      columns=["priceOpen", "priceHigh", "priceLow", "priceClose", "volume"])
     return df, X, Y
 
+def build_features(df, X, window=1, indicators=False):
+    """Lagged windows and rolling indicators, computed once for the whole range."""
+    return FeatureSet.from_frame(df, X, window=window, indicators=indicators)
+
+def uses_feature_pipeline(settings):
+    # Compact replay references rows of a FeatureSet, so it needs one even for single-row states
+    return (
+        int(settings.get("feature_window", 1)) > 1
+        or bool(settings.get("indicators", False))
+        or bool(settings.get("compact_replay", False))
+    )
+
 def calculate_ideal_profit(df, initial_cash):
     min_p, max_p = df["priceClose"].min(), df["priceClose"].max()
     ideal = (max_p - min_p) * (initial_cash / min_p)
@@ -49,23 +82,29 @@ def calculate_success_percentage(portfolio, initial_cash, df):
     success = (actual_profit / ideal_profit) * 100
     return min(max(success, 0), 100)
 
-def save_period_results(period_start, period_end, x_prog, y_prog, actual_prices, log_data, ax_zoom, plot_number, df):
+def save_period_results(period_start, period_end, x_prog, y_prog, actual_prices, log_data, ax_zoom, plot_number, df, callback=None):
     folder_name = f"plot{plot_number}_{period_start[:4]}_{period_end[:4]}"
-    os.makedirs(folder_name, exist_ok=True)
-    
-    plt.figure(figsize=(16, 9))
-    plt.plot(df.index[:len(actual_prices)], actual_prices, label="Actual Price", color="green")
-    plt.plot(df.index[:len(y_prog)], y_prog, label="Predicted Price", color="blue")
-    plt.title(f"Actual vs Predicted Prices ({period_start[:4]}-{period_end[:4]})")
-    plt.xlabel("Time")
-    plt.ylabel("Price")
-    plt.legend()
-    plt.grid(True)
-    plt.savefig(os.path.join(folder_name, "price_comparison.png"), dpi=400)
-    plt.close()
-    
-    with open(os.path.join(folder_name, "debug_log.json"), "w") as f:
-        json.dump(log_data, f, indent=4)
+    pipeline = get_pipeline()
+    pipeline.render_series(
+        os.path.join(folder_name, "price_comparison"),
+        [
+            (df.index[:len(actual_prices)], actual_prices, "Actual Price", "green"),
+            (df.index[:len(y_prog)], y_prog, "Predicted Price", "blue"),
+        ],
+        title=f"Actual vs Predicted Prices ({period_start[:4]}-{period_end[:4]})",
+        xlabel="Time", ylabel="Price", callback=callback
+    )
+    pipeline.write_json(os.path.join(folder_name, "debug_log.json"), log_data, callback=callback)
+
+RISK_PERCENTAGES = {
+    "Very High Risk": 0.80,
+    "High Risk": 0.65,
+    "Medium Risk": 0.50,
+    "Low Risk": 0.35,
+    "Very Low Risk": 0.20
+}
+FIXED_COST = 0.01
+COST_RATE = 0.0001 + 0.002 + 0.0001
 
 def money_management(initial_cash, action_idx, risk_level, current_price, portfolio, current_assets, log_text=None, predicted_price=None):
     reward_modifier = 0
@@ -85,14 +124,7 @@ def money_management(initial_cash, action_idx, risk_level, current_price, portfo
             log_text.update()
         return reward_modifier, force_done, trade_amount, units_traded
 
-    risk_percentages = {
-        "Very High Risk": 0.80,
-        "High Risk": 0.65,
-        "Medium Risk": 0.50,
-        "Low Risk": 0.35,
-        "Very Low Risk": 0.20
-    }
-    max_trade_percentage = risk_percentages.get(risk_level, 0.50)
+    max_trade_percentage = RISK_PERCENTAGES.get(risk_level, 0.50)
 
     if portfolio <= 0:
         reward_modifier = -100
@@ -104,7 +136,7 @@ def money_management(initial_cash, action_idx, risk_level, current_price, portfo
 
     if action_idx == 1:  # Buy
         max_trade_amount = portfolio * max_trade_percentage
-        transaction_cost = 0.01 + (current_price * (0.0001 + 0.002 + 0.0001))
+        transaction_cost = FIXED_COST + current_price * COST_RATE
 
         if max_trade_amount < transaction_cost:
             reward_modifier = -10
@@ -133,7 +165,7 @@ def money_management(initial_cash, action_idx, risk_level, current_price, portfo
     elif action_idx == 2:  # Sell
         if current_assets > 0:
             units_traded = min(current_assets * max_trade_percentage, current_assets)
-            transaction_cost = 0.01 + (current_price * units_traded * (0.0001 + 0.002 + 0.0001))
+            transaction_cost = FIXED_COST + current_price * units_traded * COST_RATE
             trade_amount = units_traded * current_price - transaction_cost
 
             if trade_amount <= 0:
@@ -161,4 +193,31 @@ def money_management(initial_cash, action_idx, risk_level, current_price, portfo
             log_text.value += "Hold: No trade.\n"
             log_text.update()
 
-    return reward_modifier, force_done, trade_amount, units_traded
\ No newline at end of file
+    return reward_modifier, force_done, trade_amount, units_traded
+
+def money_management_batch(action_idx, risk_level, current_price, portfolio, current_assets):
+    """money_management's trade sizing for arrays of independent portfolios (one element per path).
+
+    Returns (trade_amount, units_traded, depleted); rejected trades have zero amount and units.
+    """
+    pct = RISK_PERCENTAGES.get(risk_level, 0.50)
+    trade_amount = np.zeros_like(portfolio)
+    units_traded = np.zeros_like(portfolio)
+    depleted = portfolio <= 0
+
+    buy = (action_idx == 1) & ~depleted
+    max_trade = portfolio * pct
+    cost = FIXED_COST + current_price * COST_RATE
+    units = np.maximum((max_trade - cost) / current_price, 0)
+    amount = units * current_price + cost
+    buy &= (max_trade >= cost) & (units > 0) & (amount <= portfolio)
+    trade_amount[buy] = amount[buy]
+    units_traded[buy] = units[buy]
+
+    sell = (action_idx == 2) & ~depleted & (current_assets > 0)
+    units = current_assets * pct
+    amount = units * current_price - (FIXED_COST + current_price * units * COST_RATE)
+    sell &= amount > 0
+    trade_amount[sell] = amount[sell]
+    units_traded[sell] = units[sell]
+    return trade_amount, units_traded, depleted
@@ -0,0 +1,143 @@
+import os
+import glob
+import queue
+import argparse
+import threading
+import pandas as pd
+from datastore import FEATURE_COLUMNS, RunningStats, read_candles
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+_END = object()
+
+
+def _normalize_time(df):
+    if pd.api.types.is_numeric_dtype(df["timeClose"]):
+        df["timeClose"] = pd.to_datetime(df["timeClose"], unit="ms")
+    else:
+        df["timeClose"] = pd.to_datetime(df["timeClose"])
+    return df.set_index("timeClose")
+
+
+def iter_file(path, block_rows):
+    """Blocks of at most block_rows candles from one file, without reading the whole file where the format allows."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        for block in pd.read_csv(path, chunksize=block_rows):
+            yield _normalize_time(block)
+    elif ext == ".parquet" and pq is not None:
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=block_rows):
+            yield _normalize_time(batch.to_pandas())
+    else:
+        df = read_candles(path)
+        for start in range(0, len(df), block_rows):
+            yield df.iloc[start:start + block_rows]
+
+
+class ChunkedHistory:
+    """Iterate a history split across files as fixed-size (df, X, Y) chunks, shaped like load_data().
+
+    A background thread reads up to `prefetch` chunks ahead. X is normalized with running statistics
+    carried from chunk to chunk, so each row only sees the rows before it and the full history is
+    never resident. Files are read in the order given and are expected to be time-ordered.
+    """
+
+    def __init__(self, paths, chunk_rows=100_000, prefetch=2, symbol="LTC", stats=None):
+        if isinstance(paths, str):
+            paths = sorted(glob.glob(paths))
+        self.paths = list(paths)
+        self.chunk_rows = chunk_rows
+        self.prefetch = max(int(prefetch), 1)
+        self.symbol = symbol
+        self.stats = stats or RunningStats(len(FEATURE_COLUMNS))
+        self.last_time = None
+
+    def _chunks(self):
+        pending = []
+        rows = 0
+        self.last_time = None
+        for path in self.paths:
+            for block in iter_file(path, self.chunk_rows):
+                if self.last_time is not None:
+                    block = block[block.index > self.last_time]
+                if not len(block):
+                    continue
+                self.last_time = block.index[-1]
+                pending.append(block)
+                rows += len(block)
+                while rows >= self.chunk_rows:
+                    merged = pd.concat(pending)
+                    yield merged.iloc[:self.chunk_rows]
+                    rest = merged.iloc[self.chunk_rows:]
+                    pending, rows = ([rest] if len(rest) else []), len(rest)
+        if pending:
+            yield pd.concat(pending)
+
+    def _frame(self, chunk):
+        df = chunk[FEATURE_COLUMNS].astype("float64")
+        X = pd.DataFrame(self.stats.update(df.values), index=df.index, columns=FEATURE_COLUMNS)
+        Y = df[["priceClose"]].rename(columns={"priceClose": self.symbol})
+        return df, X, Y
+
+    def _produce(self, out, stop):
+        try:
+            for chunk in self._chunks():
+                item = self._frame(chunk)
+                while not stop.is_set():
+                    try:
+                        out.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            out.put(_END)
+        except Exception as e:
+            out.put(e)
+
+    def __iter__(self):
+        out = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        reader = threading.Thread(target=self._produce, args=(out, stop), daemon=True)
+        reader.start()
+        try:
+            while True:
+                item = out.get()
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+
+def main():
+    from execution import CancellationToken, null_emit
+    from training import load_learning_settings, stream_training_worker
+
+    parser = argparse.ArgumentParser(description="Train over a multi-file history without loading it all at once.")
+    parser.add_argument("files", nargs="+", help="Time-ordered CSV/Parquet/Excel files (globs allowed)")
+    parser.add_argument("--symbol", default="LTC")
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--prefetch", type=int, default=2)
+    parser.add_argument("--episodes-per-chunk", type=int, default=1)
+    parser.add_argument("--cash", type=float, default=1000)
+    parser.add_argument("--risk", default="Medium Risk")
+    parser.add_argument("--model", default="dqn_model_stream.pt")
+    args = parser.parse_args()
+
+    paths = [path for pattern in args.files for path in sorted(glob.glob(pattern)) or [pattern]]
+    history = ChunkedHistory(paths, args.chunk_rows, args.prefetch, args.symbol)
+    summary = stream_training_worker(
+        CancellationToken(), null_emit, history, args.cash, args.risk, load_learning_settings(),
+        episodes_per_chunk=args.episodes_per_chunk, model_path=args.model
+    )
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from datastore import FEATURE_COLUMNS, symbol_store
+from timeframes import TIMEFRAMES, timeframe_name
+
+YEAR_MS = 365 * 86_400_000
+
+# Annualized (log drift, volatility) per regime. Regimes take up time in proportion to their weights, so
+# with DEFAULT_WEIGHTS the expected log drift is zero (0.35*0.60 - 0.25*0.36 - 0.05*2.40)
+REGIMES = {
+    "bull": (0.60, 0.55),
+    "bear": (-0.36, 0.75),
+    "sideways": (0.00, 0.35),
+    "crash": (-2.40, 1.60),
+}
+# Mean regime length in candles and the probability of moving to each regime on a switch
+DEFAULT_MEAN_DURATION = 500
+DEFAULT_WEIGHTS = {"bull": 0.35, "bear": 0.25, "sideways": 0.35, "crash": 0.05}
+# Annual rate at which the log price is pulled back to the start price. Zero drift alone still lets a
+# random walk spread over orders of magnitude across centuries of 1m candles
+DEFAULT_REVERSION = 0.5
+
+
+class MarketGenerator:
+    """Regime-switching GBM candles, generated in chunks with the state carried between them.
+
+    Regimes last a geometric number of candles (mean `mean_duration`); within a regime log returns
+    are Gaussian with that regime's log drift and volatility scaled to the candle interval. The log
+    price also reverts to the start price at `reversion` per year (Ornstein-Uhlenbeck); 0 gives plain GBM.
+    """
+
+    def __init__(self, interval="1h", start_price=80.0, start_time="2015-01-01", regimes=None,
+                 weights=None, mean_duration=DEFAULT_MEAN_DURATION, seed=0, reversion=DEFAULT_REVERSION):
+        self.interval_ms = TIMEFRAMES[interval] if isinstance(interval, str) else int(interval)
+        dt = self.interval_ms / YEAR_MS
+        regimes = regimes or REGIMES
+        weights = weights or {name: DEFAULT_WEIGHTS.get(name, 1.0) for name in regimes}
+        self.names = list(regimes)
+        self.drift = np.array([mu * dt for mu, _ in regimes.values()])
+        self.vol = np.array([sigma * np.sqrt(dt) for _, sigma in regimes.values()])
+        self.weights = np.array([weights[name] for name in self.names], dtype=np.float64)
+        self.weights /= self.weights.sum()
+        self.mean_duration = mean_duration
+        self.decay = np.exp(-reversion * dt)
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.close = float(start_price)
+        self.anchor = float(start_price)
+        self.next_time = pd.Timestamp(start_time).value // 10**6
+        self.regime = int(self.rng.choice(len(self.names), p=self.weights))
+        self.remaining = int(self.rng.geometric(1 / mean_duration))
+
+    def resume_from(self, last_time_ms, last_close, state=None, rows=0):
+        """Continue after the last stored candle without replaying the shocks that produced the stored rows.
+
+        state (from state()) restores the random stream, the current regime and the reversion anchor;
+        without it the stream is reseeded from the seed and the number of stored rows.
+        """
+        self.next_time = int(last_time_ms) + self.interval_ms
+        self.close = float(last_close)
+        if state is not None:
+            self.rng.bit_generator.state = state["rng"]
+            self.regime = int(state["regime"])
+            self.remaining = int(state["remaining"])
+            self.anchor = float(state.get("anchor", self.anchor))
+        elif self.seed is not None:
+            self.rng = np.random.default_rng([self.seed, rows])
+        return self
+
+    def state(self):
+        return {"rng": self.rng.bit_generator.state, "regime": self.regime, "remaining": self.remaining,
+                "anchor": self.anchor}
+
+    def _regime_labels(self, rows):
+        labels = np.empty(rows, dtype=np.int8)
+        filled = 0
+        while filled < rows:
+            take = min(self.remaining, rows - filled)
+            labels[filled:filled + take] = self.regime
+            filled += take
+            self.remaining -= take
+            if self.remaining == 0:
+                self.regime = int(self.rng.choice(len(self.names), p=self.weights))
+                self.remaining = int(self.rng.geometric(1 / self.mean_duration))
+        return labels
+
+    def _log_path(self, log_returns):
+        """Log price relative to the anchor after each return: y_t = decay * y_{t-1} + r_t."""
+        start = np.log(self.close / self.anchor)
+        if self.decay == 1.0:
+            return start + np.cumsum(log_returns)
+        # y_t = decay^t * (y_0 + sum_s decay^-s * r_s), in blocks short enough that decay^-s stays finite
+        block = max(int(20 / -np.log(self.decay)), 1)
+        path = np.empty(len(log_returns))
+        for lo in range(0, len(log_returns), block):
+            returns = log_returns[lo:lo + block]
+            powers = self.decay ** np.arange(1, len(returns) + 1)
+            path[lo:lo + len(returns)] = powers * (start + np.cumsum(returns / powers))
+            start = path[lo + len(returns) - 1]
+        return path
+
+    def chunk(self, rows):
+        """(times_ms, values) for the next `rows` candles, values in FEATURE_COLUMNS order."""
+        labels = self._regime_labels(rows)
+        vol = self.vol[labels]
+        shocks = self.rng.standard_normal(rows)
+        log_returns = self.drift[labels] + vol * shocks
+        close = self.anchor * np.exp(self._log_path(log_returns))
+        open_ = np.concatenate([[self.close], close[:-1]])
+        wick = np.abs(self.rng.standard_normal((2, rows))) * vol * 0.5
+        high = np.maximum(open_, close) * np.exp(wick[0])
+        low = np.minimum(open_, close) * np.exp(-wick[1])
+        # Volume rises with the size of the move relative to the regime's volatility
+        volume = self.rng.lognormal(15, 0.4, rows) * (1 + np.abs(shocks))
+        times = self.next_time + np.arange(rows, dtype=np.int64) * self.interval_ms
+
+        self.close = float(close[-1])
+        self.next_time = int(times[-1]) + self.interval_ms
+        return times, np.column_stack([open_, high, low, close, volume]), labels
+
+
+def generate_to_store(symbol, rows, chunk_rows=1_000_000, generator=None, emit=None):
+    """Append `rows` synthetic candles to the symbol's column store, one chunk at a time.
+
+    An existing store is extended from its last candle, so repeated runs grow the same history. The
+    generator state is saved in the store's meta with every chunk, and an extension continues it. The
+    generator's interval must match the spacing of the stored candles.
+    """
+    store = symbol_store(symbol)
+    generator = generator or MarketGenerator()
+    period = int(np.diff(store.times()[-2:]).sum())
+    if store.rows > 1 and period != generator.interval_ms:
+        raise ValueError(
+            f"Store '{store.folder}' holds {timeframe_name(period)} candles ({period} ms); "
+            f"it cannot be extended with {timeframe_name(generator.interval_ms)} candles ({generator.interval_ms} ms)."
+        )
+    if store.rows:
+        generator.resume_from(store.meta["last_time"], store.raw("priceClose")[-1], store.meta.get("generator"), store.rows)
+    written = 0
+    started = time.perf_counter()
+    while written < rows:
+        size = min(chunk_rows, rows - written)
+        times, values, _ = generator.chunk(size)
+        index = pd.DatetimeIndex(times.astype("datetime64[ms]"), name="timeClose")
+        # Written atomically with the chunk's rows by append()
+        store.meta["generator"] = generator.state()
+        written += store.append(pd.DataFrame(values, index=index, columns=FEATURE_COLUMNS))
+        if emit:
+            elapsed = time.perf_counter() - started
+            emit(f"{written}/{rows} rows written ({written / elapsed:,.0f} rows/s)")
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate regime-switching GBM candles into the binary column store.")
+    parser.add_argument("--symbol", default="SYN")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000)
+    parser.add_argument("--interval", choices=list(TIMEFRAMES), default="1m")
+    parser.add_argument("--start-price", type=float, default=80.0)
+    parser.add_argument("--start-time", default="2015-01-01")
+    parser.add_argument("--mean-duration", type=int, default=DEFAULT_MEAN_DURATION, help="Mean regime length in candles")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reversion", type=float, default=DEFAULT_REVERSION,
+                        help="Annual pull of the log price back to the start price (0 for plain GBM)")
+    args = parser.parse_args()
+
+    generator = MarketGenerator(
+        args.interval, args.start_price, args.start_time, mean_duration=args.mean_duration, seed=args.seed,
+        reversion=args.reversion
+    )
+    store = generate_to_store(args.symbol, args.rows, args.chunk_rows, generator, emit=print)
+    print(f"Store '{store.folder}' now holds {store.rows} rows.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import os
+import time
+import socket
+import sqlite3
+import pytest
+from jobs import HEARTBEAT_TIMEOUT, JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.db"))
+
+
+def owner_id(pid=None, host=None):
+    return f"{host or socket.gethostname()}:{pid or os.getpid()}:test"
+
+
+def set_heartbeat(queue, job_id, heartbeat):
+    with sqlite3.connect(queue.path) as db:
+        db.execute("UPDATE jobs SET heartbeat = ? WHERE id = ?", (heartbeat, job_id))
+
+
+def test_claim_takes_highest_priority_then_oldest(queue):
+    low = queue.submit("train", priority=0)
+    first = queue.submit("train", priority=5)
+    second = queue.submit("train", priority=5)
+    owner = owner_id()
+    assert [queue.claim(owner, 8, 8192)["id"] for _ in range(3)] == [first, second, low]
+    assert queue.claim(owner, 8, 8192) is None
+
+
+def test_claim_skips_jobs_that_do_not_fit(queue):
+    big = queue.submit("train", priority=5, cores=4, memory_mb=1024)
+    small = queue.submit("train", priority=0, cores=1, memory_mb=512)
+    owner = owner_id()
+    assert queue.claim(owner, 2, 8192)["id"] == small
+    assert queue.claim(owner, 2, 8192) is None
+    # Larger than the whole pool: only started when nothing else runs
+    assert queue.claim(owner, 2, 8192, idle=True)["id"] == big
+
+
+def test_claim_records_owner_and_attempt(queue):
+    job_id = queue.submit("train")
+    owner = owner_id()
+    claimed = queue.claim(owner, 1, 1024)
+    job = queue.get(job_id)
+    assert claimed["owner"] == job["owner"] == owner
+    assert job["status"] == "running"
+    assert job["attempts"] == 1
+    assert job["heartbeat"] is not None
+
+
+def test_fail_retries_until_attempts_exceed_max_retries(queue):
+    job_id = queue.submit("train", max_retries=1)
+    owner = owner_id()
+    queue.claim(owner, 1, 1024)
+    queue.fail(job_id, owner, "boom")
+    job = queue.get(job_id)
+    assert (job["status"], job["attempts"], job["error"]) == ("queued", 1, "boom")
+
+    queue.claim(owner, 1, 1024)
+    queue.fail(job_id, owner, "boom again")
+    job = queue.get(job_id)
+    assert (job["status"], job["attempts"]) == ("failed", 2)
+    assert queue.claim(owner, 1, 1024) is None
+
+
+def test_fail_after_cancel_request_cancels(queue):
+    job_id = queue.submit("train", max_retries=3)
+    owner = owner_id()
+    queue.claim(owner, 1, 1024)
+    assert queue.cancel(job_id)
+    assert queue.cancel_requests() == [job_id]
+    queue.fail(job_id, owner, "terminated")
+    assert queue.get(job_id)["status"] == "cancelled"
+
+
+def test_cancel_queued_job_is_immediate(queue):
+    job_id = queue.submit("train")
+    assert queue.cancel(job_id)
+    assert queue.get(job_id)["status"] == "cancelled"
+    assert queue.claim(owner_id(), 1, 1024) is None
+
+
+def test_requeue_does_not_count_the_attempt(queue):
+    job_id = queue.submit("train")
+    owner = owner_id()
+    queue.claim(owner, 1, 1024)
+    queue.requeue(job_id, owner)
+    job = queue.get(job_id)
+    assert (job["status"], job["attempts"]) == ("queued", 0)
+
+
+def test_outcomes_only_apply_to_the_owner(queue):
+    job_id = queue.submit("train", max_retries=1)
+    owner, other = owner_id(), owner_id(host="other-host")
+    queue.claim(owner, 1, 1024)
+
+    queue.finish(job_id, other, {"profit": 1})
+    queue.fail(job_id, other, "not mine")
+    queue.requeue(job_id, other)
+    job = queue.get(job_id)
+    assert (job["status"], job["attempts"], job["error"]) == ("running", 1, None)
+
+    queue.finish(job_id, owner, {"profit": 2})
+    job = queue.get(job_id)
+    assert job["status"] == "done"
+    assert job["result"] == {"profit": 2}
+
+
+def test_heartbeat_is_scoped_to_owner(queue):
+    mine, theirs = queue.submit("train"), queue.submit("train")
+    owner, other = owner_id(), owner_id(host="other-host")
+    queue.claim(owner, 1, 1024)
+    queue.claim(other, 1, 1024)
+    set_heartbeat(queue, mine, 0)
+    set_heartbeat(queue, theirs, 0)
+    queue.heartbeat(owner)
+    assert queue.get(mine)["heartbeat"] > 0
+    assert queue.get(theirs)["heartbeat"] == 0
+
+
+def test_recover_requeues_jobs_of_dead_owner(queue, dead_pid):
+    job_id = queue.submit("train")
+    queue.claim(owner_id(dead_pid), 1, 1024)
+    assert queue.recover() == [job_id]
+    job = queue.get(job_id)
+    assert (job["status"], job["attempts"]) == ("queued", 0)
+
+
+def test_recover_keeps_jobs_of_live_owners(queue):
+    local, remote = queue.submit("train"), queue.submit("train")
+    queue.claim(owner_id(), 1, 1024)
+    # Another host's pid cannot be checked here; a fresh heartbeat is enough
+    queue.claim(owner_id(1, host="other-host"), 1, 1024)
+    assert queue.recover() == []
+    assert queue.get(local)["status"] == queue.get(remote)["status"] == "running"
+
+
+def test_recover_requeues_jobs_with_stale_heartbeat(queue):
+    job_id = queue.submit("train")
+    queue.claim(owner_id(1, host="other-host"), 1, 1024)
+    set_heartbeat(queue, job_id, time.time() - HEARTBEAT_TIMEOUT - 1)
+    assert queue.recover() == [job_id]
+    assert queue.get(job_id)["status"] == "queued"
+
+
+def test_recover_cancels_orphans_with_cancel_request(queue, dead_pid):
+    job_id = queue.submit("train")
+    queue.claim(owner_id(dead_pid), 1, 1024)
+    queue.cancel(job_id)
+    queue.recover()
+    assert queue.get(job_id)["status"] == "cancelled"
+
+
+def test_reclaimed_job_ignores_the_previous_owner(queue, dead_pid):
+    job_id = queue.submit("train")
+    stale, fresh = owner_id(dead_pid), owner_id()
+    queue.claim(stale, 1, 1024)
+    queue.recover()
+    queue.claim(fresh, 1, 1024)
+    queue.fail(job_id, stale, "late report from the old scheduler")
+    job = queue.get(job_id)
+    assert (job["status"], job["owner"], job["error"]) == ("running", fresh, None)
+
+
+def test_old_queue_gains_owner_columns(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    with sqlite3.connect(path) as db:
+        db.execute(
+            "CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, params TEXT NOT NULL, "
+            "priority INTEGER NOT NULL DEFAULT 0, cores INTEGER NOT NULL DEFAULT 1, "
+            "memory_mb INTEGER NOT NULL DEFAULT 1024, status TEXT NOT NULL DEFAULT 'queued', "
+            "attempts INTEGER NOT NULL DEFAULT 0, max_retries INTEGER NOT NULL DEFAULT 0, "
+            "cancel_requested INTEGER NOT NULL DEFAULT 0, parent INTEGER, submitted_at REAL, started_at REAL, "
+            "finished_at REAL, result TEXT, error TEXT)"
+        )
+    queue = JobQueue(path)
+    job_id = queue.submit("train")
+    assert queue.claim(owner_id(), 1, 1024)["id"] == job_id
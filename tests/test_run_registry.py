@@ -0,0 +1,102 @@
+import socket
+import warnings
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+from run_registry import RunRegistry, parse_where
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return RunRegistry(str(tmp_path / "runs.db"), str(tmp_path / "runs"))
+
+
+def candles(rows=5, start="2024-01-01"):
+    index = pd.date_range(start, periods=rows, freq="1D", name="timeClose")
+    return pd.DataFrame({"priceClose": np.arange(rows, dtype=np.float64) + 1}, index=index)
+
+
+def set_owner(registry, run_id, host, pid):
+    with sqlite3.connect(registry.path) as db:
+        db.execute("UPDATE runs SET host = ?, pid = ? WHERE id = ?", (host, pid, run_id))
+
+
+def test_finish_run_summarizes_metric_columns(registry):
+    run_id = registry.start_run("train", {"gamma": 0.99}, candles(), "LTC")
+    for step in range(4):
+        registry.log_metrics(run_id, reward=float(step), loss=float("nan") if step < 2 else 0.5 * step)
+    registry.finish_run(run_id, "done", {"profit": 12.5, "note": "text is not a metric"})
+
+    run = registry.get(run_id)
+    assert run["status"] == "done"
+    assert run["finished_at"] is not None
+    assert run["metrics"]["reward"] == {"last": 3.0, "high": 3.0, "mean": 1.5, "count": 4}
+    # NaN rows are rows where the metric was not logged
+    assert run["metrics"]["loss"] == {"last": 1.5, "high": 1.5, "mean": 1.25, "count": 4}
+    assert run["metrics"]["profit"]["last"] == 12.5
+    assert "note" not in run["metrics"]
+    assert registry.metrics(run_id, ["reward"])["reward"].tolist() == [0.0, 1.0, 2.0, 3.0]
+
+
+def test_all_nan_metric_is_stored_as_null(registry):
+    run_id = registry.start_run("train")
+    registry.log_metrics(run_id, loss=float("nan"))
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        registry.finish_run(run_id)
+    assert registry.get(run_id)["metrics"]["loss"] == {"last": None, "high": None, "mean": None, "count": 1}
+
+
+def test_query_filters_by_setting_and_orders_by_metric(registry):
+    for rate, profit in ((0.001, 5.0), (0.01, 9.0), (0.001, 7.0)):
+        run_id = registry.start_run("train", {"learning_rate": rate, "risk": "Medium Risk"}, candles(), "LTC")
+        registry.finish_run(run_id, "done", {"profit": profit})
+
+    found = registry.query(where=parse_where(["learning_rate=0.001"]), order_by="profit")
+    assert [run["sort_value"] for run in found] == [7.0, 5.0]
+    assert registry.query(where={"risk": "Medium Risk"}, symbol="BTC") == []
+    assert {row["value"]: row["runs"] for row in registry.aggregate("profit", "learning_rate")} == {0.001: 2, 0.01: 1}
+
+
+def test_compare_reports_differing_settings_and_data(registry):
+    first = registry.start_run("train", {"gamma": 0.95, "batch_size": 32}, candles())
+    second = registry.start_run("train", {"gamma": 0.99, "batch_size": 32}, candles(start="2024-02-01"))
+    comparison = registry.compare([first, second])
+    assert comparison["differing_settings"] == ["gamma"]
+    assert comparison["same_data"] is False
+
+
+def test_recover_fails_runs_whose_process_is_gone(registry, dead_pid):
+    orphan = registry.start_run("train")
+    set_owner(registry, orphan, socket.gethostname(), dead_pid)
+    alive = registry.start_run("train")
+    remote = registry.start_run("backtest")
+    set_owner(registry, remote, "other-host", dead_pid)
+
+    assert registry.recover() == [orphan]
+    assert registry.get(orphan)["status"] == "failed"
+    assert "error" in registry.get(orphan)["summary"]
+    assert registry.get(alive)["status"] == "running"
+    # Another host's pids cannot be checked from here
+    assert registry.get(remote)["status"] == "running"
+
+
+def test_recover_leaves_finished_runs_alone(registry, dead_pid):
+    run_id = registry.start_run("train")
+    registry.finish_run(run_id, "done")
+    set_owner(registry, run_id, socket.gethostname(), dead_pid)
+    assert registry.recover() == []
+    assert registry.get(run_id)["status"] == "done"
+
+
+def test_old_catalog_gains_owner_columns(tmp_path):
+    path = str(tmp_path / "runs.db")
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE runs (id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, "
+                   "status TEXT NOT NULL DEFAULT 'running', started_at REAL, finished_at REAL, symbol TEXT, "
+                   "timeframe TEXT, data_start TEXT, data_end TEXT, rows INTEGER, data_fingerprint TEXT, "
+                   "model_path TEXT, model_hash TEXT, settings TEXT, summary TEXT)")
+    registry = RunRegistry(path, str(tmp_path / "runs"))
+    run_id = registry.start_run("train")
+    assert registry.get(run_id)["host"] == socket.gethostname()
@@ -0,0 +1,137 @@
+import os
+import numpy as np
+import pandas as pd
+from datastore import DEFAULT_STORE, FEATURE_COLUMNS
+
+TIMEFRAMES = {
+    "1m": 60_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "1h": 3_600_000,
+    "4h": 14_400_000,
+    "1d": 86_400_000,
+    "1w": 604_800_000,
+}
+NATIVE = "native"
+# The Unix epoch fell on a Thursday; weeks are counted from the following Monday (1970-01-05)
+WEEK_ORIGIN_MS = 4 * 86_400_000
+
+
+def period_origin(period_ms):
+    """Offset from the epoch at which periods of period_ms start: Mondays for weeks, else the epoch."""
+    return WEEK_ORIGIN_MS if period_ms % TIMEFRAMES["1w"] == 0 else 0
+
+
+def aggregate(times, values, period_ms):
+    """OHLCV candles of period_ms from finer, time-sorted candles (columns as FEATURE_COLUMNS).
+
+    Candles are grouped by the period their close time falls in; the aggregate keeps the last close time.
+    Periods are aligned to the epoch, except weeks, which run Monday to Sunday as on exchanges.
+    """
+    if not len(times):
+        return times, values
+    # A candle closing exactly on a boundary closes the period before it
+    keys = (times - 1 - period_origin(period_ms)) // period_ms
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(keys)) + 1])
+    ends = np.concatenate([starts[1:], [len(times)]]) - 1
+    out = np.empty((len(starts), values.shape[1]), dtype=values.dtype)
+    out[:, 0] = values[starts, 0]
+    out[:, 1] = np.maximum.reduceat(values[:, 1], starts)
+    out[:, 2] = np.minimum.reduceat(values[:, 2], starts)
+    out[:, 3] = values[ends, 3]
+    out[:, 4] = np.add.reduceat(values[:, 4], starts)
+    return times[ends], out
+
+
+def native_period(times):
+    return int(np.median(np.diff(times))) if len(times) > 1 else 0
+
+
+def frame_period(df):
+    """Candle spacing of a frame indexed by timeClose, in ms (0 when it has fewer than two rows)."""
+    return native_period(df.index.values.astype("datetime64[ms]").astype(np.int64))
+
+
+def timeframe_name(period_ms):
+    """The named timeframe with this period, or NATIVE when the spacing matches none of them."""
+    for name, period in TIMEFRAMES.items():
+        if period == period_ms:
+            return name
+    return NATIVE
+
+
+class CandlePyramid:
+    """Cached OHLCV levels for one symbol. Each level is derived from the coarsest cached level that
+    divides it (1m -> 5m -> 1h -> 1d), and from the raw rows only when no such level is cached."""
+
+    def __init__(self, df, symbol="LTC", folder=None):
+        self.folder = folder or os.path.join(DEFAULT_STORE, symbol, "timeframes")
+        os.makedirs(self.folder, exist_ok=True)
+        self.times = df.index.values.astype("datetime64[ms]").astype(np.int64)
+        self.values = df[FEATURE_COLUMNS].values.astype(np.float64)
+        self.period = native_period(self.times)
+        # Cached levels are only valid for the raw rows they were built from
+        self.signature = np.array([len(self.times), self.times[0] if len(self.times) else 0,
+                                   self.times[-1] if len(self.times) else 0], dtype=np.int64)
+        self.levels = {}
+
+    def _path(self, name):
+        return os.path.join(self.folder, f"{name}.npz")
+
+    def _load(self, name):
+        if name in self.levels:
+            return self.levels[name]
+        path = self._path(name)
+        if os.path.exists(path):
+            with np.load(path) as cached:
+                # Weekly levels cached before weeks started on Monday have no origin and are rebuilt
+                origin = int(cached["origin"]) if "origin" in cached.files else 0
+                if np.array_equal(cached["signature"], self.signature) and origin == period_origin(TIMEFRAMES[name]):
+                    self.levels[name] = (cached["times"], cached["values"])
+                    return self.levels[name]
+        return None
+
+    def _source(self, period_ms):
+        """Coarsest cached level whose period divides period_ms (fewest rows to aggregate), else the raw rows."""
+        best = (self.period, self.times, self.values)
+        for name, period in sorted(TIMEFRAMES.items(), key=lambda item: item[1]):
+            if self.period < period < period_ms and period_ms % period == 0:
+                level = self._load(name)
+                if level is not None:
+                    best = (period, *level)
+        return best[1], best[2]
+
+    def level(self, name):
+        """(times, values) at a named timeframe, building and caching it if needed."""
+        if name == NATIVE:
+            return self.times, self.values
+        if name not in TIMEFRAMES:
+            raise ValueError(f"Unknown timeframe: {name} (expected one of {', '.join(TIMEFRAMES)})")
+        period_ms = TIMEFRAMES[name]
+        if period_ms <= self.period:
+            return self.times, self.values
+        level = self._load(name)
+        if level is None:
+            level = aggregate(*self._source(period_ms), period_ms)
+            np.savez(self._path(name), times=level[0], values=level[1], signature=self.signature,
+                     origin=period_origin(period_ms))
+            self.levels[name] = level
+        return level
+
+    def build(self, names=None):
+        """Build levels finest first, so each one derives from the previous."""
+        names = names or list(TIMEFRAMES)
+        for name in sorted(names, key=lambda n: TIMEFRAMES[n]):
+            self.level(name)
+        return self
+
+    def frame(self, name):
+        times, values = self.level(name)
+        index = pd.DatetimeIndex(times.astype("datetime64[ms]"), name="timeClose")
+        return pd.DataFrame(values, index=index, columns=FEATURE_COLUMNS)
+
+
+def resample_frame(df, timeframe, symbol="LTC"):
+    if not timeframe or timeframe == NATIVE:
+        return df
+    return CandlePyramid(df, symbol).frame(timeframe)
@@ -1,18 +1,57 @@
 import asyncio
 import torch
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 import time
+from concurrent.futures import ProcessPoolExecutor
 from Q import QNetwork, DISCRETE_ACTIONS, NUM_ACTIONS, DQNAgent
 from tradingenv.env import TradingEnvXY
-from strategy import money_management, calculate_success_percentage, calculate_financial_success
+from strategy import money_management, calculate_success_percentage, calculate_financial_success, build_features, uses_feature_pipeline
+from recorder import TrajectoryRecorder, run_folder_name
+from inference import set_inference_threads
+from profiling import Profiler, format_snapshot
+from execution import BackgroundTask, CancellationToken, LogChannel, null_emit
+from marketstore import MarketStore
+from run_registry import RunRegistry
+from timeframes import frame_period, timeframe_name
+from components import append_text
 import flet as ft
 from flet import Colors
 import json
 
 ACTION_NAMES = {0: "Hold", 1: "Buy", 2: "Sell"}
 
+LEARNING_SETTINGS = {
+    "gamma": 0.95,
+    "epsilon": 1.0,
+    "epsilon_min": 0.05,
+    "epsilon_decay": 0.995,
+    "learning_rate": 0.001,
+    "batch_size": 32,
+    "forecast_steps": 1,
+    "trajectory_chunk_size": 4096,
+    "trajectory_format": "npz",
+    "inference_backend": "eager",
+    "inference_threads": 0,
+    "inference_precision": "fp32",
+    "model_cache_mb": 256,
+    "profiling": False,
+    "profile_interval": 50,
+    "profile_episode": -1,
+    "feature_window": 1,
+    "indicators": False,
+    "normalization": "global",
+    "n_step": 1,
+    "train_backend": "eager",
+    "train_precision": "fp32",
+    "fused_adam": False,
+    "compact_replay": True,
+    "replay_capacity": 10000,
+    "ensemble_policy": "mean_q",
+    "timeframe": "native",
+    "run_registry": True
+}
+
 def highlight_metric(field, color, duration=1.0):
     field.border_color = color
     field.border_width = 2
@@ -36,57 +75,69 @@ def predict_future_price(df, step, forecast_steps):
         return df["priceClose"].iloc[step]
     return future_prices.mean()
 
-async def run_training(
-    page, status, log_text, ai_notes_text, lessons_text, metrics,
-    chart_all, chart_dynamic, chart_pred, ax_all, ax_dynamic, ax_pred,
-    count, delay, training_manager, df, X, Y, initial_cash, risk_level,
-    set_agent=None
-):
-    from strategy import money_management, calculate_success_percentage, calculate_financial_success
-    from Q import DQNAgent, NUM_ACTIONS
-    from tradingenv.env import TradingEnvXY
-    import numpy as np
-
-    ACTION_NAMES = {0: "Hold", 1: "Buy", 2: "Sell"}
-
-    try:
-        initial_cash = float(initial_cash)
-    except ValueError:
-        initial_cash = 1000
-        log_text.value += "Invalid portfolio amount. Using default (1000).\n"
-        log_text.update()
-
-    # Load learning settings from JSON
-    settings_file = "learning_settings.json"
-    learning_settings = {
-        "gamma": 0.95,
-        "epsilon": 1.0,
-        "epsilon_min": 0.05,
-        "epsilon_decay": 0.995,
-        "learning_rate": 0.001,
-        "batch_size": 32,
-        "forecast_steps": 1
-    }
+def load_learning_settings(log_text=None, settings_file="learning_settings.json"):
+    learning_settings = dict(LEARNING_SETTINGS)
     if os.path.exists(settings_file):
         try:
             with open(settings_file, "r") as f:
                 learning_settings.update(json.load(f))
-            log_text.value += "Loaded learning settings from learning_settings.json\n"
+            if log_text:
+                log_text.value += "Loaded learning settings from learning_settings.json\n"
         except Exception as e:
-            log_text.value += f"Error loading learning settings: {e}\n"
+            if log_text:
+                log_text.value += f"Error loading learning settings: {e}\n"
+        if log_text:
+            log_text.update()
+    return learning_settings
+
+def training_worker(token, emit, count, delay, df, X, Y, initial_cash, risk_level, learning_settings,
+                    max_episodes=None, model_path="dqn_model_final.pt", agent=None):
+    if not learning_settings["run_registry"]:
+        return _training_worker(token, emit, count, delay, df, X, Y, initial_cash, risk_level, learning_settings,
+                                max_episodes, model_path, agent)
+    runs = RunRegistry()
+    run_id = runs.start_run("train", learning_settings, df, Y.columns[0], model_path)
+    try:
+        return _training_worker(token, emit, count, delay, df, X, Y, initial_cash, risk_level, learning_settings,
+                                max_episodes, model_path, agent, runs, run_id)
+    except BaseException as e:
+        # Also reached when a job process is terminated, so its buffered metrics are kept
+        status = "cancelled" if isinstance(e, (SystemExit, KeyboardInterrupt)) else "failed"
+        runs.finish_run(run_id, status, {"error": f"{type(e).__name__}: {e}"})
+        raise
+
+def _training_worker(token, emit, count, delay, df, X, Y, initial_cash, risk_level, learning_settings,
+                     max_episodes, model_path, agent, runs=None, run_id=None):
+    log_text = LogChannel(emit)
+
+    features = None
+    if uses_feature_pipeline(learning_settings):
+        features = build_features(df, X, learning_settings["feature_window"], learning_settings["indicators"])
+        log_text.value += f"Feature pipeline: window={features.window}, features per row={features.num_features}.\n"
         log_text.update()
 
-    agent = DQNAgent(
-        input_shape=(X.shape[1],),
-        action_space=NUM_ACTIONS,
-        gamma=learning_settings["gamma"],
-        epsilon=learning_settings["epsilon"],
-        epsilon_min=learning_settings["epsilon_min"],
-        epsilon_decay=learning_settings["epsilon_decay"],
-        learning_rate=learning_settings["learning_rate"]
-    )
-    if set_agent:
-        set_agent(agent)
+    if agent is not None:
+        # Continue training an existing agent on new data (streamed chunks)
+        agent.set_observations(features)
+    else:
+        agent = DQNAgent(
+            input_shape=(features.state_dim if features is not None else X.shape[1],),
+            action_space=NUM_ACTIONS,
+            gamma=learning_settings["gamma"],
+            epsilon=learning_settings["epsilon"],
+            epsilon_min=learning_settings["epsilon_min"],
+            epsilon_decay=learning_settings["epsilon_decay"],
+            learning_rate=learning_settings["learning_rate"],
+            inference_precision=learning_settings["inference_precision"],
+            observations=features,
+            n_step=learning_settings["n_step"],
+            train_backend=learning_settings["train_backend"],
+            train_precision=learning_settings["train_precision"],
+            fused_adam=learning_settings["fused_adam"],
+            memory_size=learning_settings["replay_capacity"]
+        )
+    set_inference_threads(learning_settings["inference_threads"])
+    emit("agent", agent)
 
     env = TradingEnvXY(X=X, Y=Y, transformer="z-score", reward="logret",
                        cash=initial_cash, spread=0.0001, markup=0.002,
@@ -95,83 +146,71 @@ async def run_training(
     # Initialize
     portfolio = initial_cash
     current_assets = 0
-    x_prog, y_prog, actual_prices = [], [], []
+    recorder = TrajectoryRecorder(
+        os.path.join("trajectories", run_folder_name(f"train_{os.path.splitext(os.path.basename(model_path))[0]}")),
+        chunk_size=learning_settings["trajectory_chunk_size"],
+        fmt=learning_settings["trajectory_format"],
+        num_actions=NUM_ACTIONS
+    )
+    predicted_line = np.full(len(df), np.nan, dtype=np.float32)
     step, episode = 0, 0
     buys = sells = holds = 0
     window_size = 50
     prev_portfolio = initial_cash
     successful_trades = failed_trades = 0
-    financial_successes = []
-
-    # Initial chart drawing
-    ax_all.clear()
-    ax_all.plot(df.index, df["priceClose"], color="gray", label="Actual Price")
-    ax_all.set_title("Actual Price")
-    ax_all.legend()
-    chart_all.update()
-
-    ax_dynamic.clear()
-    ax_dynamic.set_title("Dynamic Predicted vs Actual Price")
-    ax_dynamic.set_xlabel("Steps")
-    ax_dynamic.set_ylabel("Price")
-    ax_dynamic.grid(True)
-    chart_dynamic.update()
-
-    ax_pred.clear()
-    ax_pred.plot(df.index, df["priceClose"], color="gray", alpha=0.5)
-    ax_pred.set_title("Predicted Price (Full Timeline)")
-    chart_pred.update()
-
-    # Status update
-    status.value = "Training Started"
-    status.color = Colors.GREEN
-    status.update()
+    profiler = Profiler(enabled=bool(learning_settings["profiling"]))
+    profile_interval = max(int(learning_settings["profile_interval"]), 1)
+    while not token.cancelled and (max_episodes is None or episode < max_episodes):
+        if episode == learning_settings["profile_episode"]:
+            profiler.start_capture()
+            log_text.value += f"Capturing cProfile for episode {episode} (pid {os.getpid()}).\n"
+            log_text.update()
 
-    while training_manager["training_active"]:
         state = env.reset()
         state = np.reshape(state, (1, -1))
+        # The env starts past the first row; t follows the row it is observing
+        t = X.index.get_loc(env.now())
+        if features is not None:
+            state = features.state(t)
         done = False
 
         for _ in range(count):
-            if not training_manager["training_active"]:
+            if not token.wait_if_paused():
                 log_text.value += f"Training stopped at step {step}.\n"
                 log_text.update()
                 break
 
-            if training_manager["pause_requested"]:
-                while training_manager["pause_requested"] and training_manager["training_active"]:
-                    await asyncio.sleep(0.1)
-                    page.update()
-
             if step >= len(df):
                 done = True
                 log_text.value += f"Episode {episode}: Reached end of data at step {step}.\n"
                 log_text.update()
                 break
 
-            action_idx, act = agent.act(state)
-            next_state, reward, done, info = env.step(act)
+            with profiler.phase("act"):
+                action_idx, act = agent.act(state)
+            with profiler.phase("env_step"):
+                next_state, reward, done, info = env.step(act)
             reward /= 100
             current_price = df["priceClose"].iloc[min(step, len(df)-1)]
 
             # Price prediction using multiple steps
-            predicted_price = predict_future_price(df, step, learning_settings["forecast_steps"])
+            with profiler.phase("predict_price"):
+                predicted_price = predict_future_price(df, step, learning_settings["forecast_steps"])
             if action_idx == 1:  # Buy
                 predicted_price *= 1.01
             elif action_idx == 2:  # Sell
                 predicted_price *= 0.99
 
             # Money management
-            mm_reward, mm_done, trade_amount, units_traded = money_management(
-                initial_cash, action_idx, risk_level, current_price, portfolio, current_assets, log_text,
-                predicted_price=predicted_price
-            )
+            with profiler.phase("money_management"):
+                mm_reward, mm_done, trade_amount, units_traded = money_management(
+                    initial_cash, action_idx, risk_level, current_price, portfolio, current_assets, log_text,
+                    predicted_price=predicted_price
+                )
             reward += mm_reward
             if mm_done:
                 done = True
-                lesson = f"Episode {episode}: Training stopped - portfolio depleted."
-                lessons_text.value += f"{lesson}\n"
-                lessons_text.update()
+                emit("lesson", f"Episode {episode}: Training stopped - portfolio depleted.\n")
 
             # Apply trade
             if action_idx == 1 and trade_amount > 0:
@@ -182,81 +221,75 @@ async def run_training(
                 current_assets -= units_traded
 
             # Save state
-            agent.remember(state, action_idx, reward, next_state, done)
-            state = np.reshape(next_state, (1, -1))
+            with profiler.phase("remember"):
+                if features is not None:
+                    agent.remember(t, action_idx, reward, t + 1, done)
+                else:
+                    agent.remember(state, action_idx, reward, next_state, done)
+            t += 1
+            state = features.state(t) if features is not None else np.reshape(next_state, (1, -1))
 
             # Metrics logic
             profit_delta = portfolio - prev_portfolio
             if trade_amount > 0:
+                profiler.count("trades")
                 if profit_delta > 0:
                     successful_trades += 1
                 else:
                     failed_trades += 1
 
-            x_prog.append(step)
-            y_prog.append(predicted_price)
-            actual_prices.append(current_price)
+            profiler.count("steps")
+            with profiler.phase("record"):
+                recorder.record(
+                    step=step, episode=episode, action=action_idx, price=current_price,
+                    predicted_price=predicted_price, portfolio=portfolio, assets=current_assets,
+                    reward=reward, q_values=agent.last_q_values
+                )
+            predicted_line[min(step, len(df)-1)] = predicted_price
 
             if action_idx == 0:
                 holds += 1
-                highlight_metric(metrics["Hold"], Colors.GREY)
             elif action_idx == 1:
                 buys += 1
-                highlight_metric(metrics["Buys"], Colors.GREEN)
             elif action_idx == 2:
                 sells += 1
-                highlight_metric(metrics["Sells"], Colors.RED)
-
-            # Update metrics
-            metrics_values = {
-                "Buys": str(buys),
-                "Sells": str(sells),
-                "Hold": str(holds),
-                "Profit": f"{portfolio - initial_cash:.2f}",
-                "% Success": f"{calculate_success_percentage(portfolio, initial_cash, df):.1f}%",
-                "% Financial Success": f"{calculate_financial_success(portfolio, initial_cash, df):.1f}%",
-                "Current Money in Wallet": f"{portfolio:.2f}",
-                "Assets": f"{current_assets:.4f}",
-                "Steps": str(step),
-                "Epsilon": f"{agent.epsilon:.3f}",
-                "Successful Trades": str(successful_trades),
-                "Failed Trades": str(failed_trades),
-            }
-
-            for key, value in metrics_values.items():
-                metrics[key].value = value
-                metrics[key].update()
+
+            with profiler.phase("metrics"):
+                emit("metrics", {
+                    "action": action_idx,
+                    "values": {
+                        "Buys": str(buys),
+                        "Sells": str(sells),
+                        "Hold": str(holds),
+                        "Profit": f"{portfolio - initial_cash:.2f}",
+                        "% Success": f"{calculate_success_percentage(portfolio, initial_cash, df):.1f}%",
+                        "% Financial Success": f"{calculate_financial_success(portfolio, initial_cash, df):.1f}%",
+                        "Current Money in Wallet": f"{portfolio:.2f}",
+                        "Assets": f"{current_assets:.4f}",
+                        "Steps": str(step),
+                        "Epsilon": f"{agent.epsilon:.3f}",
+                        "Successful Trades": str(successful_trades),
+                        "Failed Trades": str(failed_trades),
+                    }
+                })
 
             # Update charts every 10 steps
             if step % 10 == 0:
-                # Chart Dynamic
-                start = max(0, len(x_prog) - window_size)
-                ax_dynamic.clear()
-                ax_dynamic.plot(x_prog[start:], y_prog[start:], label="Predicted")
-                ax_dynamic.plot(x_prog[start:], actual_prices[start:], label="Actual", linestyle="--")
-                ax_dynamic.legend()
-                ax_dynamic.grid(True)
-                chart_dynamic.update()
-
-                # Chart Pred
-                ax_pred.clear()
-                ax_pred.plot(df.index, df["priceClose"], color="gray", alpha=0.5)
-                plot_length = min(len(y_prog), len(df.index))
-                ax_pred.plot(df.index[:plot_length], y_prog[:plot_length], label="Predicted Price")
-                ax_pred.legend()
-                chart_pred.update()
-
-                # Chart All with span
-                ax_all.clear()
-                ax_all.plot(df.index, df["priceClose"], color="gray")
-                span_start = df.index[max(0, step - window_size)]
-                span_end = df.index[min(step, len(df)-1)]
-                ax_all.axvspan(span_start, span_end, color="red", alpha=0.3)
-                ax_all.set_title("Actual Price with Training Span")
-                chart_all.update()
-
-            await asyncio.sleep(delay)
-            page.update()
+                with profiler.phase("chart_data"):
+                    emit("chart", {
+                        "step": step,
+                        "window_steps": recorder.tail("step", window_size),
+                        "window_predicted": recorder.tail("predicted_price", window_size),
+                        "window_actual": recorder.tail("price", window_size),
+                        "predicted_line": predicted_line.copy(),
+                        "window_size": window_size,
+                    })
+
+            if profiler.enabled and step % profile_interval == 0:
+                emit("profile", profiler.snapshot())
+
+            with profiler.phase("sleep"):
+                token.sleep(delay)
 
             if done:
                 break
@@ -264,17 +297,214 @@ async def run_training(
             prev_portfolio = portfolio
             step += 1
 
-        if training_manager["training_active"]:
-            agent.replay(batch_size=learning_settings["batch_size"])
+        agent.end_episode()
+        if not token.cancelled:
+            with profiler.phase("replay"):
+                loss = agent.replay(batch_size=learning_settings["batch_size"])
+            if runs:
+                runs.log_metrics(
+                    run_id, episode=episode, steps=step, portfolio=portfolio, profit=portfolio - initial_cash,
+                    epsilon=agent.epsilon, buys=buys, sells=sells, holds=holds,
+                    successful_trades=successful_trades, failed_trades=failed_trades,
+                    loss=np.nan if loss is None else loss
+                )
+            if episode == learning_settings["profile_episode"]:
+                path = profiler.stop_capture(os.path.join(recorder.folder, f"episode_{episode}.prof"))
+                log_text.value += f"cProfile capture written to '{path}'.\n"
             episode += 1
             log_text.value += f"Episode {episode} completed.\n"
             log_text.update()
 
-    if training_manager["training_active"]:
-        agent.save_model("dqn_model_final.pt")
-        log_text.value += "Model saved as 'dqn_model_final.pt'.\n"
+    recorder.close()
+    log_text.value += f"Trajectory saved to '{recorder.folder}' ({recorder.rows} steps).\n"
+    profiler.stop_capture(os.path.join(recorder.folder, f"episode_{episode}.prof"))
+    if profiler.enabled:
+        emit("profile", profiler.snapshot())
+        profiler.export_json(os.path.join(recorder.folder, "profile.json"))
+        log_text.value += f"Phase timings saved to '{os.path.join(recorder.folder, 'profile.json')}'.\n"
+    agent.save_model(model_path, metadata={
+        "settings": learning_settings,
+        "symbol": Y.columns[0],
+        "data_range": [str(df.index[0]), str(df.index[-1])],
+        "rows": len(df),
+        # The resolution of the rows actually trained on, not the configured timeframe
+        "timeframe": timeframe_name(frame_period(df)),
+        "period_ms": frame_period(df),
+        "feature_window": learning_settings["feature_window"],
+        "indicators": learning_settings["indicators"],
+        "compact_replay": learning_settings["compact_replay"],
+        "episodes": episode,
+        "trajectory": recorder.folder,
+    })
+    log_text.value += f"Model saved as '{model_path}'.\n"
+    if runs:
+        runs.add_checkpoint(run_id, model_path, episode)
+        runs.add_artifact(run_id, recorder.folder, "trajectory")
+        runs.finish_run(run_id, "cancelled" if token.cancelled else "done", summary={
+            "steps": step, "episodes": episode, "portfolio": portfolio, "profit": portfolio - initial_cash,
+        })
+        log_text.value += f"Recorded as run {run_id} in the run registry.\n"
+    log_text.update()
+    return {
+        "steps": step, "episodes": episode, "portfolio": portfolio,
+        "trajectory": recorder.folder, "model": model_path, "agent": agent,
+    }
+
+def stream_training_worker(token, emit, history, initial_cash, risk_level, learning_settings,
+                           episodes_per_chunk=1, count=None, model_path="dqn_model_stream.pt"):
+    """Train one agent over (df, X, Y) chunks from a ChunkedHistory, holding one chunk at a time.
+
+    The model is saved after every chunk, so an interrupted run keeps its progress.
+    """
+    log_text = LogChannel(emit)
+    agent = None
+    chunks = rows = steps = 0
+    for df, X, Y in history:
+        if token.cancelled:
+            break
+        log_text.value += f"Chunk {chunks}: {len(df)} rows from {df.index[0]} to {df.index[-1]}.\n"
+        log_text.update()
+        summary = training_worker(
+            token, emit, count or len(df), 0, df, X, Y, initial_cash, risk_level, learning_settings,
+            max_episodes=episodes_per_chunk, model_path=model_path, agent=agent
+        )
+        agent = summary["agent"]
+        chunks += 1
+        rows += len(df)
+        steps += summary["steps"]
+    return {"chunks": chunks, "rows": rows, "steps": steps, "model": model_path}
+
+def _train_symbol(handle, symbol, episodes, count, initial_cash, risk_level, learning_settings, model_path, start_date, end_date):
+    market = MarketStore.attach(handle)
+    try:
+        df, X, Y = market.frame(symbol, start_date, end_date)
+        summary = training_worker(
+            CancellationToken(), null_emit, count, 0, df, X, Y, initial_cash, risk_level,
+            learning_settings, max_episodes=episodes, model_path=model_path.format(symbol=symbol)
+        )
+        # The agent stays in the worker process; only the summary is sent back
+        summary.pop("agent")
+        return summary
+    finally:
+        market.close()
+
+def train_symbols(market, symbols, episodes, count=1000, initial_cash=1000, risk_level="Medium Risk",
+                  learning_settings=None, model_path="dqn_model_{symbol}.pt", start_date=None, end_date=None,
+                  max_workers=None):
+    """Train one agent per symbol in worker processes that attach to the shared market store."""
+    learning_settings = learning_settings or load_learning_settings()
+    with ProcessPoolExecutor(max_workers=max_workers or min(len(symbols), os.cpu_count() or 1)) as executor:
+        futures = {
+            symbol: executor.submit(
+                _train_symbol, market.handle, symbol, episodes, count, float(initial_cash), risk_level,
+                learning_settings, model_path, start_date, end_date
+            )
+            for symbol in symbols
+        }
+        return {symbol: future.result() for symbol, future in futures.items()}
+
+async def run_training(
+    page, status, log_text, ai_notes_text, lessons_text, metrics,
+    chart_all, chart_dynamic, chart_pred, ax_all, ax_dynamic, ax_pred,
+    count, delay, training_manager, df, X, Y, initial_cash, risk_level,
+    set_agent=None, profile_text=None
+):
+    try:
+        initial_cash = float(initial_cash)
+    except ValueError:
+        initial_cash = 1000
+        log_text.value += "Invalid portfolio amount. Using default (1000).\n"
         log_text.update()
 
+    learning_settings = load_learning_settings(log_text)
+
+    # Initial chart drawing
+    ax_all.clear()
+    ax_all.plot(df.index, df["priceClose"], color="gray", label="Actual Price")
+    ax_all.set_title("Actual Price")
+    ax_all.legend()
+    chart_all.update()
+
+    ax_dynamic.clear()
+    ax_dynamic.set_title("Dynamic Predicted vs Actual Price")
+    ax_dynamic.set_xlabel("Steps")
+    ax_dynamic.set_ylabel("Price")
+    ax_dynamic.grid(True)
+    chart_dynamic.update()
+
+    ax_pred.clear()
+    ax_pred.plot(df.index, df["priceClose"], color="gray", alpha=0.5)
+    ax_pred.set_title("Predicted Price (Full Timeline)")
+    chart_pred.update()
+
+    # Status update
+    status.value = "Training Started"
+    status.color = Colors.GREEN
+    status.update()
+
+    def handle_event(kind, payload):
+        if kind == "log":
+            append_text(log_text, payload)
+        elif kind == "lesson":
+            append_text(lessons_text, payload)
+        elif kind == "agent":
+            if set_agent:
+                set_agent(payload)
+        elif kind == "metrics":
+            highlight = {0: ("Hold", Colors.GREY), 1: ("Buys", Colors.GREEN), 2: ("Sells", Colors.RED)}
+            key, color = highlight[payload["action"]]
+            highlight_metric(metrics[key], color)
+            for key, value in payload["values"].items():
+                metrics[key].value = value
+                metrics[key].update()
+        elif kind == "chart":
+            step = payload["step"]
+            window_size = payload["window_size"]
+
+            # Chart Dynamic
+            ax_dynamic.clear()
+            ax_dynamic.plot(payload["window_steps"], payload["window_predicted"], label="Predicted")
+            ax_dynamic.plot(payload["window_steps"], payload["window_actual"], label="Actual", linestyle="--")
+            ax_dynamic.legend()
+            ax_dynamic.grid(True)
+            chart_dynamic.update()
+
+            # Chart Pred
+            ax_pred.clear()
+            ax_pred.plot(df.index, df["priceClose"], color="gray", alpha=0.5)
+            ax_pred.plot(df.index, payload["predicted_line"], label="Predicted Price")
+            ax_pred.legend()
+            chart_pred.update()
+
+            # Chart All with span
+            ax_all.clear()
+            ax_all.plot(df.index, df["priceClose"], color="gray")
+            span_start = df.index[max(0, step - window_size)]
+            span_end = df.index[min(step, len(df)-1)]
+            ax_all.axvspan(span_start, span_end, color="red", alpha=0.3)
+            ax_all.set_title("Actual Price with Training Span")
+            chart_all.update()
+        elif kind == "profile":
+            if profile_text is not None:
+                profile_text.value = format_snapshot(payload)
+                profile_text.update()
+        elif kind == "error":
+            append_text(log_text, f"Training error: {payload}\n")
+            status.value = "Training Failed"
+            status.color = Colors.RED
+            status.update()
+        page.update()
+
+    token = training_manager.get("token") or CancellationToken()
+    training_manager["token"] = token
+    task = BackgroundTask(
+        training_worker, count, delay, df, X, Y, initial_cash, risk_level, learning_settings,
+        token=token
+    ).start()
+    # Kept so closing the window can wait for the worker before touching the agent
+    training_manager["task"] = task
+    await task.consume(handle_event)
+
     # Define return functions
     def update_mode(mode): log_text.value += f"Mode updated to {mode}\n"; log_text.update()
     def update_initial_cash(cash): log_text.value += f"Initial portfolio updated to {cash}\n"; log_text.update()
@@ -282,4 +512,4 @@ async def run_training(
     def clear_ai_notes(): ai_notes_text.value = ""; ai_notes_text.update()
     def clear_lessons(): lessons_text.value = ""; lessons_text.update()
 
-    return update_mode, update_initial_cash, update_risk_level, clear_ai_notes, clear_lessons
\ No newline at end of file
+    return update_mode, update_initial_cash, update_risk_level, clear_ai_notes, clear_lessons